@@ -0,0 +1,397 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+from datetime import date
+import numpy as np
+import pandas as pd
+from PCNet import PCNet_graph as pcg
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+# Number of nodes or links formatted and written at a time
+EXPORT_CHUNK = 100000
+
+# Buffer of the exported files
+WRITE_BUFFER = 1024 * 1024
+
+# Escape of the text in the xml attributes, as in the files of networkx
+ESCAPE_ATTRIBUTE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;',
+                                  '\n': '&#10;', '\r': '&#13;', '\t': '&#09;'})
+
+# Escape of the text in the xml elements
+ESCAPE_TEXT = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+GEXF_HEADER = ("<?xml version='1.0' encoding='utf-8'?>\n"
+               '<gexf xmlns="http://www.gexf.net/1.2draft" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+               'xsi:schemaLocation="http://www.gexf.net/1.2draft http://www.gexf.net/1.2draft/gexf.xsd" version="1.2">\n'
+               '  <meta lastmodifieddate="{date}">\n'
+               '    <creator>PCNet</creator>\n'
+               '  </meta>\n'
+               '  <graph defaultedgetype="directed" mode="static" name="">\n')
+
+# Arrays of the CitationGraph saved in a snapshot, each in its own .npy file
+SNAPSHOT_ARRAYS = ['pmids', 'indptr', 'indices', 'reverse_indptr', 'reverse_indices']
+
+# Version of the snapshot format, written in its snapshot.json file
+SNAPSHOT_FORMAT = 1
+
+GRAPHML_HEADER = ("<?xml version='1.0' encoding='utf-8'?>\n"
+                  '<graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" '
+                  'xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+
+
+def attribute_type(dtype):
+    """
+    Return the type of an attribute in the GEXF and GraphML files from the type of its column,
+    with the names used by networkx.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        dtype = dtype.categories.dtype
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(dtype):
+        return 'long'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'double'
+    return 'string'
+
+def format_values(values, kind, escape):
+    """
+    Format the values of an attribute as escaped strings.
+    """
+    if kind == 'boolean':
+        return np.where(values.to_numpy(dtype=bool), 'true', 'false').tolist()
+    if kind != 'string':
+        return values.astype(str).tolist()
+    return [value.translate(escape) for value in values.astype(str).tolist()]
+
+def graph_nodes(df_links, df_nodes=None):
+    """
+    Return the pmids of the nodes of the links and their attributes.
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+    df_nodes : pandas dataframe
+        Dataframe with the nodes (default: None, i.e. no attributes)
+
+    Returns
+    -------
+    pmids : numpy array
+        Sorted pmids of the nodes
+    attributes : pandas dataframe
+        Attributes of the nodes with a row in df_nodes, one row per pmid sorted as pmids
+    """
+    pmids, source, target, first = pcg.encode_links(df_links['source'].to_numpy(dtype=np.int64),
+                                                    df_links['target'].to_numpy(dtype=np.int64))
+    if df_nodes is None:
+        return pmids, pd.DataFrame({'pmid': np.array([], dtype=np.int64)})
+
+    attributes = df_nodes[df_nodes['pmid'].isin(pmids)]
+    attributes = attributes.drop_duplicates(subset='pmid', keep='last').sort_values('pmid').reset_index(drop=True)
+
+    return pmids, attributes
+
+def write_nodes(file, pmids, attributes, node, element, escape, chunk_size):
+    """
+    Write the elements of the nodes, a chunk at a time: node formats the element of a node without attributes
+    and element the element of a node with the values of its attributes, escaped with the escape table.
+    """
+    columns = [column for column in attributes.columns if column != 'pmid']
+    kinds = [attribute_type(attributes[column].dtype) for column in columns]
+    position = np.searchsorted(pmids, attributes['pmid'].to_numpy(dtype=np.int64))
+    row = np.full(len(pmids), -1, dtype=np.int64)
+    row[position] = np.arange(len(position))
+
+    for start in range(0, len(pmids), chunk_size):
+        ids = pmids[start:start + chunk_size].tolist()
+        rows = row[start:start + chunk_size]
+        known = rows[rows >= 0]
+
+        values = [format_values(attributes[column].iloc[known], kind, escape) for column, kind in zip(columns, kinds)]
+        values = iter(zip(*values)) if len(columns) > 0 else iter([()] * len(known))
+
+        file.write("".join(element(pmid, next(values)) if r >= 0 else node(pmid)
+                           for pmid, r in zip(ids, rows.tolist())))
+
+def gexf_node(pmid):
+    return f'      <node id="{pmid}" label="{pmid}" />\n'
+
+def write_gexf(df_links, df_nodes, path_gexf, chunk_size=EXPORT_CHUNK):
+    """
+    Write the graph of the links in a GEXF file, readable by Gephi and by networkx.read_gexf, with the
+    same structure of the files of networkx.write_gexf. The file is written a chunk of nodes and links
+    at a time from the dataframes, without building the graph: the links are written as they are,
+    so they should be the links of the graph (e.g. CitationGraph.edges, without self loops and repeated links).
+    The nodes are the pmids of the links, sorted, with the attributes of their row in df_nodes.
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+    df_nodes : pandas dataframe
+        Dataframe with the nodes, whose columns are the attributes (default: None, i.e. no attributes)
+    path_gexf : str
+        Path of the GEXF file
+    chunk_size : int
+        Number of nodes or links written at a time (default: EXPORT_CHUNK)
+    """
+    pmids, attributes = graph_nodes(df_links, df_nodes)
+    columns = [column for column in attributes.columns if column != 'pmid']
+
+    def element(pmid, values):
+        return (f'      <node id="{pmid}" label="{pmid}">\n        <attvalues>\n'
+                + "".join(f'          <attvalue for="{k}" value="{value}" />\n' for k, value in enumerate(values))
+                + '        </attvalues>\n      </node>\n')
+
+    with open(path_gexf, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as file:
+        file.write(GEXF_HEADER.replace('{date}', date.today().isoformat()))
+        if len(columns) > 0:
+            file.write('    <attributes mode="static" class="node">\n')
+            for k, column in enumerate(columns):
+                title = str(column).translate(ESCAPE_ATTRIBUTE)
+                file.write(f'      <attribute id="{k}" title="{title}" type="{attribute_type(attributes[column].dtype)}" />\n')
+            file.write('    </attributes>\n')
+
+        file.write('    <nodes>\n')
+        write_nodes(file, pmids, attributes, gexf_node, element, ESCAPE_ATTRIBUTE, chunk_size)
+        file.write('    </nodes>\n    <edges>\n')
+
+        source, target = df_links['source'].to_numpy(), df_links['target'].to_numpy()
+        for start in range(0, len(source), chunk_size):
+            file.write("".join(f'      <edge source="{s}" target="{t}" id="{k}" />\n' for k, s, t in
+                               zip(range(start, start + chunk_size), source[start:start + chunk_size].tolist(),
+                                   target[start:start + chunk_size].tolist())))
+
+        file.write('    </edges>\n  </graph>\n</gexf>\n')
+
+def graphml_node(pmid):
+    return f'    <node id="{pmid}" />\n'
+
+def write_graphml(df_links, df_nodes, path_graphml, chunk_size=EXPORT_CHUNK):
+    """
+    Write the graph of the links in a GraphML file, readable by networkx.read_graphml and by most graph tools,
+    with the same structure of the files of networkx.write_graphml. As write_gexf, it is written a chunk at
+    a time from the dataframes, without building the graph.
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+    df_nodes : pandas dataframe
+        Dataframe with the nodes, whose columns are the attributes (default: None, i.e. no attributes)
+    path_graphml : str
+        Path of the GraphML file
+    chunk_size : int
+        Number of nodes or links written at a time (default: EXPORT_CHUNK)
+    """
+    pmids, attributes = graph_nodes(df_links, df_nodes)
+    columns = [column for column in attributes.columns if column != 'pmid']
+
+    def element(pmid, values):
+        return (f'    <node id="{pmid}">\n'
+                + "".join(f'      <data key="d{k}">{value}</data>\n' for k, value in enumerate(values))
+                + '    </node>\n')
+
+    with open(path_graphml, 'w', encoding='utf-8', buffering=WRITE_BUFFER) as file:
+        file.write(GRAPHML_HEADER)
+        for k, column in enumerate(columns):
+            name = str(column).translate(ESCAPE_ATTRIBUTE)
+            file.write(f'  <key id="d{k}" for="node" attr.name="{name}" attr.type="{attribute_type(attributes[column].dtype)}" />\n')
+
+        file.write('  <graph edgedefault="directed">\n')
+        write_nodes(file, pmids, attributes, graphml_node, element, ESCAPE_TEXT, chunk_size)
+
+        source, target = df_links['source'].to_numpy(), df_links['target'].to_numpy()
+        for start in range(0, len(source), chunk_size):
+            file.write("".join(f'    <edge source="{s}" target="{t}" />\n' for s, t in
+                               zip(source[start:start + chunk_size].tolist(), target[start:start + chunk_size].tolist())))
+
+        file.write('  </graph>\n</graphml>\n')
+
+def write_edgelist(df_links, path_edgelist, dtype=np.int32, chunk_size=EXPORT_CHUNK):
+    """
+    Write the links in a binary file, as consecutive pairs of source and target pmids with the given type.
+    The pmids are at most 1e8 (see PCNet_utils.MAX_PMID), so they fit in int32 and a link takes 8 bytes.
+    The file is read back by read_edgelist, or by any tool as a raw array of shape (links, 2).
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+    path_edgelist : str
+        Path of the binary file
+    dtype : numpy dtype
+        Type of the pmids in the file (default: int32)
+    chunk_size : int
+        Number of links written at a time (default: EXPORT_CHUNK)
+    """
+    source, target = df_links['source'].to_numpy(), df_links['target'].to_numpy()
+
+    with open(path_edgelist, 'wb') as file:
+        for start in range(0, len(source), chunk_size):
+            pairs = np.empty((len(source[start:start + chunk_size]), 2), dtype=dtype)
+            pairs[:, 0] = source[start:start + chunk_size]
+            pairs[:, 1] = target[start:start + chunk_size]
+            pairs.tofile(file)
+
+def read_edgelist(path_edgelist, dtype=np.int32):
+    """
+    Read the links of a binary file written by write_edgelist.
+
+    Parameters
+    ----------
+    path_edgelist : str
+        Path of the binary file
+    dtype : numpy dtype
+        Type of the pmids in the file (default: int32)
+
+    Returns
+    -------
+    df_links : pandas dataframe
+        Dataframe with the links
+    """
+    pairs = np.fromfile(path_edgelist, dtype=dtype).reshape(-1, 2)
+
+    return pd.DataFrame({'source': pairs[:, 0].astype(np.int64), 'target': pairs[:, 1].astype(np.int64)})
+
+
+# Writers of the graph for each export format, with the extension of their files
+EXPORTERS = {'gexf': ('.gexf', write_gexf), 'graphml': ('.graphml', write_graphml), 'edgelist': ('.bin', write_edgelist)}
+
+def export_graph(G, path_graph, export_format='gexf', chunk_size=EXPORT_CHUNK):
+    """
+    Write a CitationGraph (see df_to_graph with backend='csr') in a file of the export format,
+    without converting it into a networkx graph.
+
+    Parameters
+    ----------
+    G : CitationGraph
+        Graph to export
+    path_graph : str
+        Path of the file, without extension: the extension of the format is added
+    export_format : str
+        'gexf', 'graphml' or 'edgelist' (default: 'gexf')
+    chunk_size : int
+        Number of nodes or links written at a time (default: EXPORT_CHUNK)
+
+    Returns
+    -------
+    path : str
+        Path of the file created
+    """
+    if export_format not in EXPORTERS:
+        print(f"Error: export_format must be {' or '.join(repr(name) for name in EXPORTERS)}")
+        return None
+    if not isinstance(G, pcg.CitationGraph):
+        print("Error: the graph must be a CitationGraph, networkx graphs are written by networkx")
+        return None
+
+    extension, writer = EXPORTERS[export_format]
+    path = path_graph + extension
+    if export_format == 'edgelist':
+        writer(G.edges(), path, chunk_size=chunk_size)
+    else:
+        writer(G.edges(), G.nodes, path, chunk_size=chunk_size)
+
+    return path
+
+def save_snapshot(G, path_snapshot):
+    """
+    Save a CitationGraph in a snapshot folder, which is loaded back almost at once by load_snapshot.
+    The arrays of the graph are saved as .npy files, the attributes of the nodes as a Parquet file
+    (it needs the pyarrow package) and the size of the graph in the snapshot.json file.
+
+    Parameters
+    ----------
+    G : CitationGraph
+        Graph to save, e.g. created by df_to_graph with backend='csr'
+    path_snapshot : str
+        Path of the snapshot folder, created if it does not exist
+
+    Returns
+    -------
+    path_snapshot : str
+        Path of the snapshot folder
+    """
+    if not isinstance(G, pcg.CitationGraph):
+        print("Error: the graph must be a CitationGraph")
+        return None
+    if G.nodes is not None and pa is None:
+        print("Error: the attributes of the nodes are saved in Parquet, which needs the pyarrow package")
+        return None
+
+    os.makedirs(path_snapshot, exist_ok=True)
+    if G.reverse_indptr is None:
+        G.build_reverse()
+
+    for name in SNAPSHOT_ARRAYS:
+        np.save(os.path.join(path_snapshot, name + '.npy'), np.asarray(getattr(G, name)))
+
+    columns = None
+    if G.nodes is not None:
+        pq.write_table(pa.Table.from_pandas(G.nodes, preserve_index=False), os.path.join(path_snapshot, 'nodes.parquet'))
+        columns = [str(column) for column in G.nodes.columns]
+
+    with open(os.path.join(path_snapshot, 'snapshot.json'), 'w', encoding='utf-8') as file:
+        json.dump({'format': SNAPSHOT_FORMAT, 'nodes': G.number_of_nodes(), 'edges': G.number_of_edges(),
+                   'columns': columns}, file, indent=1)
+
+    return path_snapshot
+
+def load_snapshot(path_snapshot, mmap=True, frames=False):
+    """
+    Load a graph saved by save_snapshot. The arrays are memory mapped, so the graph is ready at once
+    and its links are read from the disk only when they are used.
+
+    Parameters
+    ----------
+    path_snapshot : str
+        Path of the snapshot folder
+    mmap : boolean
+        If True, the arrays are memory mapped in read only mode, otherwise they are read in memory (default: True)
+    frames : boolean
+        If True, the links and the nodes dataframes are returned instead of the graph (default: False)
+
+    Returns
+    -------
+    G : CitationGraph
+        Graph of the snapshot.
+        If frames is True, the dataframes with the links and with the nodes (None if the graph has no attributes).
+    """
+    try:
+        with open(os.path.join(path_snapshot, 'snapshot.json'), 'r', encoding='utf-8') as file:
+            info = json.load(file)
+    except FileNotFoundError:
+        print(f"Error: {path_snapshot} is not a snapshot")
+        return None
+    if info['format'] != SNAPSHOT_FORMAT:
+        print(f"Error: the snapshot has format {info['format']}, not {SNAPSHOT_FORMAT}")
+        return None
+
+    arrays = {name: np.load(os.path.join(path_snapshot, name + '.npy'), mmap_mode='r' if mmap == True else None)
+              for name in SNAPSHOT_ARRAYS}
+
+    nodes = None
+    if info['columns'] is not None:
+        if pa is None:
+            print("Error: the attributes of the nodes are saved in Parquet, which needs the pyarrow package")
+            return None
+        nodes = pq.read_table(os.path.join(path_snapshot, 'nodes.parquet')).to_pandas()
+
+    G = pcg.CitationGraph(arrays['pmids'], arrays['indptr'], arrays['indices'], nodes=nodes, reverse=False)
+    G.reverse_indptr, G.reverse_indices = arrays['reverse_indptr'], arrays['reverse_indices']
+
+    if frames == True:
+        return G.edges(), nodes
+    return G
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+
+def weakly_connected_labels(n_nodes, source, target, parent=None):
+    """
+    Label the weakly connected components of a graph given as arrays of edges between integer nodes.
+    The components are found by hooking the root of each edge endpoint to the smaller root and
+    then compressing the trees with pointer jumping, until no edge joins two different roots.
+    The label of each node is the smallest node of its component.
+    The edges can be given a part at a time, passing the labels of the previous parts as parent:
+    the edges already joined stay joined, so one call per part is enough.
+
+    Parameters
+    ----------
+    n_nodes : int
+        Number of nodes, numbered from 0 to n_nodes-1
+    source : numpy array
+        Sources of the edges
+    target : numpy array
+        Targets of the edges
+    parent : numpy array
+        Labels returned for the previous edges, to which these edges are added (default: None, i.e. no previous edges)
+
+    Returns
+    -------
+    labels : numpy array
+        Label of the component of each node
+    """
+    if parent is None:
+        parent = np.arange(n_nodes, dtype=np.int64)
+
+    while True:
+        root_source, root_target = parent[source], parent[target]
+        low, high = np.minimum(root_source, root_target), np.maximum(root_source, root_target)
+        joined = low != high
+        if not joined.any():
+            break
+
+        # Hook the larger roots to the smaller ones, so that the trees never contain cycles
+        np.minimum.at(parent, high[joined], low[joined])
+
+        # Point every node directly to its root
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+    return parent
+
+
+def encode_links(source, target):
+    """
+    Map the pmids of the links to the integers 0, ..., n-1, in the order of the sorted pmids.
+
+    Parameters
+    ----------
+    source : numpy array
+        Pmids of the sources of the links
+    target : numpy array
+        Pmids of the targets of the links
+
+    Returns
+    -------
+    pmids : numpy array
+        Sorted pmids of the nodes
+    source : numpy array
+        Sources of the links, as positions in pmids
+    target : numpy array
+        Targets of the links, as positions in pmids
+    first : numpy array
+        Position of the first appearance of each node in the links, sources before targets
+    """
+    pmids, first, inverse = np.unique(np.column_stack((source, target)).ravel(), return_index=True,
+                                      return_inverse=True)
+    inverse = inverse.reshape(-1, 2)
+
+    return pmids, inverse[:, 0], inverse[:, 1], first
+
+def largest_component(labels, first):
+    """
+    Return the label of the largest weakly connected component.
+    As for networkx, ties go to the component that appears first, i.e. the one with the smallest first node.
+
+    Parameters
+    ----------
+    labels : numpy array
+        Label of the component of each node, as returned by weakly_connected_labels
+    first : numpy array
+        Order of appearance of each node
+
+    Returns
+    -------
+    largest : int
+        Label of the largest component
+    """
+    sizes = np.bincount(labels, minlength=len(labels))
+    component_first = np.full(len(labels), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(component_first, labels, first)
+
+    candidates = np.flatnonzero(sizes == sizes.max())
+    return candidates[np.argmin(component_first[candidates])]
+
+
+class CitationGraph:
+    """
+    Directed citation graph stored as compressed sparse rows (CSR) of integer nodes.
+    The pmids of the nodes are sorted and node i is the pmid pmids[i]: the articles cited by
+    node i are indices[indptr[i]:indptr[i+1]] and, if the reverse CSR is built, the articles
+    citing node i are reverse_indices[reverse_indptr[i]:reverse_indptr[i+1]].
+    Self loops and repeated links are removed.
+    """
+
+    def __init__(self, pmids, indptr, indices, nodes=None, reverse=True):
+        """
+        Parameters
+        ----------
+        pmids : numpy array
+            Sorted pmids of the nodes
+        indptr : numpy array
+            Offsets of the cited articles of each node in indices
+        indices : numpy array
+            Cited articles of the nodes, as positions in pmids
+        nodes : pandas dataframe
+            Dataframe with the attributes of the nodes, one row per pmid (default: None)
+        reverse : boolean
+            If True, the reverse CSR of the citing articles is built (default: True)
+        """
+        self.pmids = pmids
+        self.indptr = indptr
+        self.indices = indices
+        self.nodes = nodes
+        self.reverse_indptr, self.reverse_indices = None, None
+
+        if reverse == True:
+            self.build_reverse()
+
+    @classmethod
+    def from_links(cls, df_links, df_nodes=None, connected_graph=True, unknown_nodes=False, reverse=True):
+        """
+        Create the graph from the links and the nodes dataframes, with the same options of df_to_graph.
+
+        Parameters
+        ----------
+        df_links : pandas dataframe
+            Dataframe with the links
+        df_nodes : pandas dataframe
+            Dataframe with the nodes (default: None)
+        connected_graph : boolean
+            If True, the graph will be connected (default: True)
+        unknown_nodes : boolean
+            If True, the graph will keep the nodes whose informations are not known (default: False)
+        reverse : boolean
+            If True, the reverse CSR of the citing articles is built (default: True)
+
+        Returns
+        -------
+        G : CitationGraph
+            Graph created from the links and the nodes dataframes
+        """
+        source = df_links['source'].to_numpy(dtype=np.int64)
+        target = df_links['target'].to_numpy(dtype=np.int64)
+
+        if unknown_nodes == False and df_nodes is not None:
+            known = np.isin(target, df_nodes['pmid'].to_numpy(dtype=np.int64))
+            source, target = source[known], target[known]
+
+        pmids, source, target, first = encode_links(source, target)
+
+        # Remove self loops and repeated links: the links are left sorted by source and target
+        loop = source == target
+        keys = np.unique(source[~loop] * len(pmids) + target[~loop])
+        source, target = keys // len(pmids), keys % len(pmids)
+
+        if connected_graph == True and len(pmids) > 0:
+            labels = weakly_connected_labels(len(pmids), source, target)
+            keep = labels == largest_component(labels, first)
+            position = np.cumsum(keep) - 1
+            edges = keep[source]
+            pmids, source, target = pmids[keep], position[source[edges]], position[target[edges]]
+
+        index_dtype = np.int32 if len(pmids) < np.iinfo(np.int32).max else np.int64
+        indptr = np.zeros(len(pmids) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(source, minlength=len(pmids)))
+
+        nodes = None
+        if df_nodes is not None:
+            nodes = df_nodes[df_nodes['pmid'].isin(pmids)]
+            nodes = nodes.drop_duplicates(subset='pmid', keep='last').sort_values('pmid').reset_index(drop=True)
+
+        return cls(pmids, indptr, target.astype(index_dtype), nodes=nodes, reverse=reverse)
+
+    def build_reverse(self):
+        """
+        Build the reverse CSR of the citing articles of each node.
+        """
+        source = np.repeat(np.arange(len(self.pmids), dtype=self.indices.dtype), np.diff(self.indptr))
+        order = np.argsort(self.indices, kind='stable')
+
+        self.reverse_indptr = np.zeros(len(self.pmids) + 1, dtype=np.int64)
+        self.reverse_indptr[1:] = np.cumsum(np.bincount(self.indices, minlength=len(self.pmids)))
+        self.reverse_indices = source[order]
+
+    def number_of_nodes(self):
+        return len(self.pmids)
+
+    def number_of_edges(self):
+        return len(self.indices)
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def __contains__(self, pmid):
+        i = np.searchsorted(self.pmids, pmid)
+        return bool(i < len(self.pmids) and self.pmids[i] == pmid)
+
+    def index(self, pmids):
+        """
+        Return the positions of the pmids in the graph, -1 for the pmids that are not nodes of the graph.
+
+        Parameters
+        ----------
+        pmids : int or array-like
+            Pmids to search
+
+        Returns
+        -------
+        index : int or numpy array
+            Positions of the pmids
+        """
+        scalar = np.ndim(pmids) == 0
+        pmids = np.atleast_1d(np.asarray(pmids, dtype=np.int64))
+        i = np.searchsorted(self.pmids, pmids)
+        found = i < len(self.pmids)
+        found[found] = self.pmids[i[found]] == pmids[found]
+        index = np.where(found, i, -1)
+        return int(index[0]) if scalar else index
+
+    def successors(self, pmid):
+        """
+        Return the pmids of the articles cited by the input article.
+        """
+        i = self.index(pmid)
+        if i < 0:
+            print("Error: the pmid " + str(pmid) + " is not in the graph")
+            return None
+        return self.pmids[self.indices[self.indptr[i]:self.indptr[i+1]]]
+
+    def predecessors(self, pmid):
+        """
+        Return the pmids of the articles citing the input article.
+        """
+        i = self.index(pmid)
+        if i < 0:
+            print("Error: the pmid " + str(pmid) + " is not in the graph")
+            return None
+        if self.reverse_indptr is None:
+            self.build_reverse()
+        return self.pmids[self.reverse_indices[self.reverse_indptr[i]:self.reverse_indptr[i+1]]]
+
+    def out_degree(self):
+        """
+        Return the number of articles cited by each node, in the order of pmids.
+        """
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        """
+        Return the number of articles citing each node, in the order of pmids.
+        """
+        if self.reverse_indptr is not None:
+            return np.diff(self.reverse_indptr)
+        return np.bincount(self.indices, minlength=len(self.pmids))
+
+    def edges(self):
+        """
+        Return the links of the graph as a dataframe with the pmids of source and target.
+        """
+        source = np.repeat(self.pmids, np.diff(self.indptr))
+        return pd.DataFrame({'source': source, 'target': self.pmids[self.indices]})
+
+    def to_networkx(self, pmids=None):
+        """
+        Convert the graph, or the subgraph of the input pmids, into a networkx graph with the attributes of the nodes.
+
+        Parameters
+        ----------
+        pmids : array-like
+            Pmids of the nodes of the subgraph, all the nodes if None (default: None)
+
+        Returns
+        -------
+        G : networkx graph
+            Networkx graph
+        """
+        if pmids is None:
+            keep = np.ones(len(self.pmids), dtype=bool)
+        else:
+            index = self.index(np.atleast_1d(pmids))
+            keep = np.zeros(len(self.pmids), dtype=bool)
+            keep[index[index >= 0]] = True
+
+        source = np.repeat(np.arange(len(self.pmids)), np.diff(self.indptr))
+        edges = keep[source] & keep[self.indices]
+
+        G = nx.DiGraph()
+        G.add_nodes_from(self.pmids[keep].tolist())
+        G.add_edges_from(zip(self.pmids[source[edges]].tolist(), self.pmids[self.indices[edges]].tolist()))
+
+        if self.nodes is not None:
+            nodes = self.nodes[keep[np.searchsorted(self.pmids, self.nodes['pmid'].to_numpy(dtype=np.int64))]]
+            pmid_list = nodes['pmid'].tolist()
+            for col in nodes.columns:
+                if col != 'pmid':
+                    nx.set_node_attributes(G, dict(zip(pmid_list, nodes[col].tolist())), col)
+
+        return G
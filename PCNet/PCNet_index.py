@@ -0,0 +1,276 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from PCNet import PCNet_network as pcn
+from PCNet import PCNet_utils as utils
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+
+def build_mesh_index(mesh_files, path_index, deleted_files=None):
+    """
+    Build the inverted index between the pmids and the MeSH of the parsed articles and save it in a .npz file.
+    The mesh files are the ones created by the xml_parser function with mesh_index=True: each row contains
+    the pmid of an article and the unique identifiers of its MeSH separated by spaces.
+    Only the latest version of each article is indexed (see PCNet_network.resolve_versions), so an article
+    revised in a following file has only its new MeSH, and the deleted articles are not indexed.
+    The index stores, as sorted arrays:
+    - uis, ui_ptr, ui_pmids: for each MeSH, the sorted pmids of its articles (ui_pmids[ui_ptr[i]:ui_ptr[i+1]])
+    - pmids, pmid_ptr, pmid_uis: for each pmid, the MeSH of the article (positions in uis)
+    - sources, pmid_source: the names of the parsed files and, for each pmid, the file with its latest version
+
+    Parameters
+    ----------
+    mesh_files : list
+        List of the mesh csv files, in the order of the parse
+    path_index : str
+        Path of the .npz file of the index
+    deleted_files : list
+        List of the deleted csv files of the parse with update=True (default: None). If a file has several
+        deleted csv files, e.g. one for each query, only the pmids in all of them are deleted
+
+    Returns
+    -------
+    index : dict
+        Dictionary with the arrays of the index
+    """
+    frames = []
+    for file in tqdm(mesh_files, desc='- Building the MeSH index ...'):
+        if os.path.getsize(file) == 0:
+            frames.append(None)
+            continue
+        frames.append(pd.read_csv(file, sep='\t', header=None, names=['pmid', 'mesh'], dtype={'pmid': np.int64, 'mesh': str},
+                                  keep_default_na=False))
+
+    # The pmids deleted in each file, in all its deleted csv files
+    ordinal = {utils.source_name(file): k for k, file in enumerate(mesh_files)}
+    deleted = [None] * len(mesh_files)
+    for file in deleted_files if deleted_files is not None else []:
+        k = ordinal.get(utils.source_name(file))
+        if k is None:
+            continue
+        if pcn.is_empty_file(file) == True:
+            file_pmids = np.empty(0, dtype=np.int64)
+        else:
+            file_pmids = pd.read_csv(file, sep='\t', header=None, usecols=[0])[0].to_numpy(dtype=np.int64)
+        deleted[k] = file_pmids if deleted[k] is None else np.intersect1d(deleted[k], file_pmids)
+
+    # Only the rows of the latest version of each article are indexed
+    versions = pcn.resolve_versions([None if df is None else df['pmid'].to_numpy() for df in frames], deleted)
+
+    ui_codes = {}
+    pmids, codes, sources = [], [], []
+
+    for source, df in enumerate(frames):
+        if source not in versions:
+            continue
+
+        df = df.iloc[versions[source]['row'].to_numpy()]
+        df = df.assign(mesh=df['mesh'].str.split(' ')).explode('mesh')
+        df = df[df['mesh'] != '']
+
+        # Map the identifiers of the file to the codes shared by all the files
+        file_codes, uniques = pd.factorize(df['mesh'])
+        mapping = np.array([ui_codes.setdefault(ui, len(ui_codes)) for ui in uniques], dtype=np.int32)
+
+        pmids.append(df['pmid'].to_numpy(dtype=np.int32))
+        codes.append(mapping[file_codes] if len(file_codes) > 0 else np.empty(0, dtype=np.int32))
+        sources.append(np.full(len(df), source, dtype=np.int32))
+
+    pmid = np.concatenate(pmids) if len(pmids) > 0 else np.empty(0, dtype=np.int32)
+    code = np.concatenate(codes) if len(codes) > 0 else np.empty(0, dtype=np.int32)
+    source = np.concatenate(sources) if len(sources) > 0 else np.empty(0, dtype=np.int32)
+
+    # Sort the identifiers of the MeSH, so that they can be searched with a binary search
+    uis = np.array(sorted(ui_codes), dtype=str)
+    rank = np.empty(len(ui_codes), dtype=np.int32)
+    rank[[ui_codes[ui] for ui in uis]] = np.arange(len(uis), dtype=np.int32)
+    code = rank[code] if len(code) > 0 else code
+
+    # MeSH -> pmids
+    order = np.lexsort((pmid, code))
+    ui_code, ui_pmids = code[order], pmid[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (ui_code[1:] != ui_code[:-1]) | (ui_pmids[1:] != ui_pmids[:-1])
+    ui_code, ui_pmids = ui_code[keep], ui_pmids[keep]
+    ui_ptr = np.zeros(len(uis) + 1, dtype=np.int64)
+    ui_ptr[1:] = np.cumsum(np.bincount(ui_code, minlength=len(uis)))
+
+    # pmid -> MeSH, with the last file in which each pmid was found
+    order = np.lexsort((code, pmid))
+    pmid_sorted, pmid_uis, pmid_sources = pmid[order], code[order], source[order]
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (pmid_sorted[1:] != pmid_sorted[:-1]) | (pmid_uis[1:] != pmid_uis[:-1])
+    pmid_sorted, pmid_uis, pmid_sources = pmid_sorted[keep], pmid_uis[keep], pmid_sources[keep]
+    pmids, starts, counts = np.unique(pmid_sorted, return_index=True, return_counts=True)
+    pmid_ptr = np.zeros(len(pmids) + 1, dtype=np.int64)
+    pmid_ptr[1:] = np.cumsum(counts)
+    pmid_source = np.maximum.reduceat(pmid_sources, starts) if len(starts) > 0 else np.empty(0, dtype=np.int32)
+
+    index = {'uis': uis,
+             'ui_ptr': ui_ptr,
+             'ui_pmids': ui_pmids,
+             'pmids': pmids,
+             'pmid_ptr': pmid_ptr,
+             'pmid_uis': pmid_uis,
+             'sources': np.array([utils.source_name(file) for file in mesh_files], dtype=str),
+             'pmid_source': pmid_source,
+             }
+
+    np.savez(path_index, **index)
+
+    return index
+
+def load_mesh_index(path_index):
+    """
+    Load the inverted index between the pmids and the MeSH saved by the build_mesh_index function.
+
+    Parameters
+    ----------
+    path_index : str
+        Path of the .npz file of the index
+
+    Returns
+    -------
+    index : dict
+        Dictionary with the arrays of the index
+    """
+    with np.load(path_index) as data:
+        index = {key: data[key] for key in data.files}
+
+    return index
+
+def mesh_pmids(index, ui):
+    """
+    Return the pmids of the articles indexed with the MeSH.
+
+    Parameters
+    ----------
+    index : dict
+        Inverted index between the pmids and the MeSH
+    ui : str or list
+        Unique identifier of the MeSH, or list of them
+
+    Returns
+    -------
+    pmids : numpy array
+        Sorted pmids of the articles with at least one of the MeSH
+    """
+    if isinstance(ui, str):
+        ui = [ui]
+
+    positions = np.searchsorted(index['uis'], ui)
+    pmids = []
+    for position, key in zip(positions, ui):
+        if position < len(index['uis']) and index['uis'][position] == key:
+            pmids.append(index['ui_pmids'][index['ui_ptr'][position]:index['ui_ptr'][position + 1]])
+
+    if len(pmids) == 0:
+        return np.empty(0, dtype=index['ui_pmids'].dtype)
+
+    return np.unique(np.concatenate(pmids))
+
+def mesh_bitmap(index, ui):
+    """
+    Return the bitmap of the pmids of the articles indexed with the MeSH (see PCNet_utils.pmid_bitmap),
+    to be passed as known_pmids to the xml_parser and the csv_to_dataframe functions.
+
+    Parameters
+    ----------
+    index : dict or str
+        Inverted index between the pmids and the MeSH, or path of its .npz file
+    ui : str or list
+        Unique identifier of the MeSH, or list of them
+
+    Returns
+    -------
+    bitmap : numpy array
+        Bitmap of the pmids of the articles with at least one of the MeSH
+    """
+    if isinstance(index, str):
+        index = load_mesh_index(index)
+
+    return utils.pmid_bitmap(mesh_pmids(index, ui))
+
+def pmid_mesh(index, pmid):
+    """
+    Return the MeSH of the article corresponding to the pmid.
+
+    Parameters
+    ----------
+    index : dict
+        Inverted index between the pmids and the MeSH
+    pmid : int
+        pmid of the article
+
+    Returns
+    -------
+    uis : list
+        Unique identifiers of the MeSH of the article, empty if the pmid is not in the index
+    """
+    position = np.searchsorted(index['pmids'], pmid)
+    if position == len(index['pmids']) or index['pmids'][position] != pmid:
+        return []
+
+    codes = index['pmid_uis'][index['pmid_ptr'][position]:index['pmid_ptr'][position + 1]]
+    return list(index['uis'][codes])
+
+def select_by_mesh(index, ui, csv_list, columns=['title', 
+                                                 'abstract', 
+                                                 'date', 
+                                                 'authors', 
+                                                 'journal',
+                                                 'keywords',
+                                                 ]):
+    """
+    Select the links and the nodes of the articles indexed with the MeSH from the csv files of a previous parse,
+    without parsing the xml files again. Only the csv files that contain articles with the MeSH are read:
+    the index has only the latest version of each article, so the articles revised without the MeSH,
+    or deleted, also in the other files are not selected.
+
+    Parameters
+    ----------
+    index : dict or str
+        Inverted index between the pmids and the MeSH, or path of its .npz file
+    ui : str or list
+        Unique identifier of the MeSH, or list of them
+    csv_list : list
+        List of the csv files created by the xml_parser function
+    columns : list
+        List of the informations in the nodes csv files (see csv_to_dataframe)
+
+    Returns
+    -------
+    df_links : pandas dataframe
+        Dataframe with the links of the articles with the MeSH
+    df_nodes : pandas dataframe
+        Dataframe with the nodes of the articles with the MeSH
+    """
+    if isinstance(index, str):
+        index = load_mesh_index(index)
+
+    pmids = mesh_pmids(index, ui)
+
+    # Keep only the csv files of the sources that contain at least one of the articles
+    positions = np.searchsorted(index['pmids'], pmids)
+    sources = set(index['sources'][np.unique(index['pmid_source'][positions])]) if len(pmids) > 0 else set()
+    selected = [file for file in csv_list if utils.source_name(file) in sources]
+
+    if len(selected) == 0:
+        print('Error: no articles found with these settings.')
+        return None, None
+
+    df_links = pcn.csv_to_dataframe(selected, type_of_df='links')
+    df_nodes = pcn.csv_to_dataframe(selected, type_of_df='nodes', columns=columns)
+
+    if df_links is not None:
+        df_links = df_links[df_links['source'].isin(pmids)].reset_index(drop=True)
+    if df_nodes is not None:
+        df_nodes = df_nodes[df_nodes['pmid'].isin(pmids)].reset_index(drop=True)
+
+    return df_links, df_nodes
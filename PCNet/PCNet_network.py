@@ -6,11 +6,278 @@ from tqdm import tqdm
 import pandas as pd
 import networkx as nx
 import csv
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PCNet import PCNet_utils as utils
+from PCNet import PCNet_graph as pcg
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
 
 __author__ = "Alessandro Lapi"
 __email__ = "alessandro.lapi@studio.unibo.it"
 
+# Compact types of the columns for csv_to_dataframe: the pmids are at most 1e8, so they fit in 32 bits,
+# the journals repeat over many articles and the text is kept in Arrow buffers when pyarrow is available
+TEXT_DTYPE = 'string[pyarrow]' if pa is not None else 'string'
+COMPACT_DTYPES = {'source': 'int32',
+                  'target': 'int32',
+                  'pmid': 'int32',
+                  'title': TEXT_DTYPE,
+                  'abstract': TEXT_DTYPE,
+                  'date': TEXT_DTYPE,
+                  'authors': TEXT_DTYPE,
+                  'journal': 'category',
+                  'keywords': TEXT_DTYPE,
+                  'references': TEXT_DTYPE,
+                  }
+
+
+def latest_versions(csv_list, pmids=None):
+    """
+    Find the latest version of each article among the csv files created by a parse: the same pmid can be in
+    several baseline files, and in the update files with its revised versions or its deleted citation.
+    The files are ordered as in csv_list, i.e. according to the name of the xml files, and in the same file
+    the last row wins. The articles whose latest version is followed by a deleted citation are dropped.
+
+    Parameters
+    ----------
+    csv_list : list
+        List of the csv files created by the xml_parser function, with the deleted csv files if any
+    pmids : dict
+        Pmids of the nodes files already read, with the name of the xml file as key: only the other files
+        are read (default: None, i.e. the pmids of all the nodes files are read)
+
+    Returns
+    -------
+    versions : dict
+        Dictionary with the name of each xml file as key and, as value, the dataframe with the pmid
+        and the row in the nodes csv file of the articles whose latest version is in that file
+    """
+    sources = list(dict.fromkeys(utils.source_name(file) for file in csv_list))
+    ordinal = {source: k for k, source in enumerate(sources)}
+
+    nodes, deleted = [None] * len(sources), [None] * len(sources)
+    for file in csv_list:
+        name = os.path.basename(file)
+        if not (name.startswith('nodes_') or name.startswith('deleted_')) or is_empty_file(file) == True:
+            continue
+
+        if name.startswith('nodes_') and pmids is not None and utils.source_name(file) in pmids:
+            nodes[ordinal[utils.source_name(file)]] = pmids[utils.source_name(file)]
+            continue
+
+        if file.endswith('.parquet'):
+            file_pmids = pq.read_table(file, columns=['pmid'])['pmid'].to_numpy()
+        else:
+            file_pmids = pd.read_csv(file, sep='\t', header=None, usecols=[0], quoting=csv.QUOTE_NONE)[0].to_numpy(dtype=np.int64)
+        if name.startswith('nodes_'):
+            nodes[ordinal[utils.source_name(file)]] = file_pmids
+        else:
+            deleted[ordinal[utils.source_name(file)]] = file_pmids
+
+    return {sources[source]: df for source, df in resolve_versions(nodes, deleted).items()}
+
+def resolve_versions(nodes, deleted):
+    """
+    Find the latest version of each article among the nodes of a sequence of sources (e.g. the xml files
+    of a parse, in order): it is the last row of the last source that contains the article, unless
+    the article is deleted in the same source or in a following one.
+
+    Parameters
+    ----------
+    nodes : list
+        Pmids of the nodes of each source, in order (None for a source without nodes)
+    deleted : list
+        Pmids of the deleted citations of each source (None for a source without deleted citations)
+
+    Returns
+    -------
+    versions : dict
+        Dictionary with the position of each source as key and, as value, the dataframe with the pmid
+        and the row in the nodes of the source of the articles whose latest version is in that source
+    """
+    # The sources are swept from the last one with the bitmap of the pmids already seen, so that the memory
+    # is the bitmap and the rows kept, in 32-bit integers, without sorting all the pmids together
+    largest = max([utils.MAX_PMID] + [int(np.max(pmids)) for pmids in nodes + deleted if pmids is not None and len(pmids) > 0])
+    seen = utils.pmid_bitmap(max_pmid=largest)
+    dtype = np.int32 if largest < 2**31 else np.int64
+
+    versions = {}
+    for k in reversed(range(max(len(nodes), len(deleted)))):
+
+        # The articles deleted in a source hide their versions in the same source and in the previous ones
+        if k < len(deleted) and deleted[k] is not None:
+            utils.add_pmids(seen, deleted[k])
+
+        if k >= len(nodes) or nodes[k] is None or len(nodes[k]) == 0:
+            continue
+        pmids = np.asarray(nodes[k], dtype=np.int64)
+
+        # The last row of each pmid of the source, if the pmid is not in the following ones
+        unique, first = np.unique(pmids[::-1], return_index=True)
+        rows = len(pmids) - 1 - first[~utils.in_bitmap(seen, unique)]
+        rows.sort()
+        utils.add_pmids(seen, unique)
+
+        if len(rows) > 0:
+            versions[k] = pd.DataFrame({'pmid': pmids[rows].astype(dtype), 'row': rows.astype(np.int32)})
+
+    return versions
+
+def parquet_to_dataframe(file, type_of_df, columns=['title', 
+                                                    'abstract', 
+                                                    'date', 
+                                                    'authors', 
+                                                    'journal',
+                                                    'keywords',
+                                                    ],
+                                                    usecols=None):
+    """
+    Create a dataframe from a Parquet file created by the xml_parser function with output_format='parquet'.
+    Only the columns selected are read from the file: for the nodes, the pmid and the references are always read
+    and the informations are the ones in the columns parameter that are in the file.
+    If usecols is given, only its columns are read, also among the pmid and the references.
+    The references are returned as a string of pmids separated by commas, as in the csv files.
+
+    Parameters
+    ----------
+    file : str
+        Path of the Parquet file
+    type_of_df : str
+        'links' or 'nodes' according to the type of the file
+    columns : list
+        List of the informations to read
+    usecols : list
+        List of the columns to read (default: None, i.e. all the columns)
+
+    Returns
+    -------
+    df : pandas dataframe
+        Dataframe with the links or the nodes
+    """
+    if pa is None:
+        raise ImportError("Reading Parquet files needs the pyarrow package")
+
+    if type_of_df == 'links':
+        names = ['source', 'target']
+    else:
+        schema = pq.read_schema(file)
+        names = ['pmid'] + [column for column in columns if column in schema.names] + ['references']
+
+    if usecols is not None:
+        names = [name for name in names if name in usecols]
+    table = pq.read_table(file, columns=names)
+
+    if 'references' in names and type_of_df == 'nodes':
+        references = pc.binary_join(pc.cast(table['references'], pa.list_(pa.string())), ', ')
+        table = table.set_column(names.index('references'), 'references', references)
+
+    return table.to_pandas()
+
+def is_empty_file(file):
+    """
+    Check if a csv or a Parquet file of the parse is empty
+    """
+    if file.endswith('.parquet'):
+        return pq.read_metadata(file).num_rows == 0
+    return utils.is_empty_csv(file)
+
+def known_pmids(csv_list):
+    """
+    Build the bitmap of the pmids of the articles in the nodes files of a parse (see PCNet_utils.pmid_bitmap).
+    Only the pmid column is read and, for the parse of update files, the deleted articles are not known.
+    It can be passed as known_pmids to the xml_parser and the csv_to_dataframe functions.
+
+    Parameters
+    ----------
+    csv_list : list
+        List of the csv files created by the xml_parser function
+
+    Returns
+    -------
+    bitmap : numpy array
+        Bitmap of the pmids of the articles
+    """
+    bitmap = utils.pmid_bitmap()
+
+    if any(os.path.basename(file).startswith('deleted_') for file in csv_list):
+        for df in latest_versions(csv_list).values():
+            utils.add_pmids(bitmap, df['pmid'].to_numpy())
+        return bitmap
+
+    for file in csv_list:
+        if not os.path.basename(file).startswith('nodes_') or is_empty_file(file) == True:
+            continue
+        if file.endswith('.parquet'):
+            pmids = pq.read_table(file, columns=['pmid'])['pmid'].to_numpy()
+        else:
+            pmids = pd.read_csv(file, sep='\t', header=None, usecols=[0], quoting=csv.QUOTE_NONE)[0].to_numpy(dtype=np.int64)
+        utils.add_pmids(bitmap, pmids)
+
+    return bitmap
+
+def concat_frames(frames):
+    """
+    Concatenate dataframes with the same columns, as pd.concat with ignore_index=True, without doubling the memory.
+    The numeric columns are allocated once with their final size and each dataframe is released as soon as it is
+    copied; the categorical columns share the union of the categories and the other columns (e.g. text) are joined
+    without copying their values.
+
+    Parameters
+    ----------
+    frames : list
+        List of the dataframes, emptied while they are concatenated
+
+    Returns
+    -------
+    df : pandas dataframe
+        Concatenated dataframe
+    """
+    n_rows = sum(len(df) for df in frames)
+    columns = list(frames[0].columns)
+
+    data = {}
+    for column in columns:
+        dtypes = [df[column].dtype for df in frames]
+        if isinstance(dtypes[0], np.dtype) and dtypes[0] != object and all(dtype == dtypes[0] for dtype in dtypes):
+            data[column] = np.empty(n_rows, dtype=dtypes[0])
+        elif all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+            categories = pd.Index(pd.unique(np.concatenate([dtype.categories.to_numpy() for dtype in dtypes])))
+            data[column] = (np.empty(n_rows, dtype=np.int32), categories)
+        else:
+            data[column] = []
+
+    position = 0
+    for i in range(len(frames)):
+        df = frames[i]
+        end = position + len(df)
+        for column in columns:
+            target = data[column]
+            if isinstance(target, np.ndarray):
+                target[position:end] = df[column].to_numpy()
+            elif isinstance(target, tuple):
+                codes, categories = target
+                values = df[column].cat
+                mapping = categories.get_indexer(values.categories)
+                codes[position:end] = np.where(values.codes >= 0, mapping[values.codes], -1)
+            else:
+                target.append(df[column])
+        frames[i] = None
+        position = end
+
+    for column in columns:
+        target = data[column]
+        if isinstance(target, tuple):
+            data[column] = pd.Categorical.from_codes(target[0], categories=target[1])
+        elif isinstance(target, list):
+            data[column] = pd.concat(target, ignore_index=True).array
+
+    return pd.DataFrame(data, columns=columns, copy=False)
 
 def csv_to_dataframe(csv_list, type_of_df, columns=['title', 
                                                     'abstract', 
@@ -18,7 +285,13 @@ def csv_to_dataframe(csv_list, type_of_df, columns=['title',
                                                     'authors', 
                                                     'journal',
                                                     'keywords',
-                                                    ]):
+                                                    ],
+                                                    known_pmids=None,
+                                                    report=None,
+                                                    usecols=None,
+                                                    dtypes=None,
+                                                    threads=1,
+                                                    dedup=True):
     """
     Create a dataframe from the csv files. 
     Specify if you want the links or the nodes, with the type_of_df parameter.
@@ -28,6 +301,20 @@ def csv_to_dataframe(csv_list, type_of_df, columns=['title',
     If you created the csv files with less informations, you can specify the columns you want
     in the columns parameter. For example, if you created the csv files with only the title 
     and the abstract, you can write: columns=['title', 'abstract'].
+    If the files are Parquet files (xml_parser with output_format='parquet'), only the columns
+    selected are read (see parquet_to_dataframe).
+    The same pmid can be in several files (e.g. revised articles in the baseline, or the update files):
+    only the latest version of each article is kept, with its links, and the deleted articles of the update
+    files are dropped (see latest_versions). A file has a single version of each article (see
+    PCNet_parser.parse_xml_file), so the links of the version kept are the ones of its file with its pmid as source.
+    For the links, the versions are found from the nodes files in csv_list, so the links are not deduplicated
+    if csv_list has only links files.
+    If the bitmap of the known pmids is given, the links to unknown articles are dropped file by file,
+    before the dataframes are concatenated.
+    To save memory on large parses, the usecols parameter loads only some of the columns (e.g. only the
+    pmid and the title of the nodes, without the abstracts), the dtypes parameter gives the types of the
+    columns (dtypes='compact' for COMPACT_DTYPES) and the threads parameter reads the files in parallel.
+    The dataframes of the files are concatenated without doubling the memory (see concat_frames).
 
 
     Parameters
@@ -38,43 +325,193 @@ def csv_to_dataframe(csv_list, type_of_df, columns=['title',
         'links' or 'nodes' according to the type of dataframe the user wants
     columns : list
         List of the columns of the dataframe. 
+    known_pmids : numpy array
+        Bitmap of the known pmids, e.g. built with the known_pmids function (default: None, i.e. all the links)
+    report : PCNet_utils.RunReport
+        Report of the run: if given, the record of the stage is added to it (default: None)
+    usecols : list
+        List of the columns to load, e.g. ['pmid', 'title'] (default: None, i.e. all the columns)
+    dtypes : dict or str
+        Types of the columns, e.g. {'pmid': 'int32', 'journal': 'category'}, or 'compact' for COMPACT_DTYPES
+        (default: None, i.e. the types are inferred from the files)
+    threads : int
+        Number of threads reading the files (default: 1)
+    dedup : bool
+        True to keep only the latest version of each article, False to keep all the rows of the files (default: True)
 
     Returns
     -------
     df : pandas dataframe
         Dataframe with the links or the nodes
     """
+    # Name the columns of the dataframe according to the type of dataframe
+    if type_of_df == 'links':
+        names = ['source', 'target']
+    elif type_of_df == 'nodes':
+        names = ['pmid'] + columns + ['references']
+    else:
+        print("Error: type_of_df must be 'links' or 'nodes'")
+        return None
+
+    if dtypes == 'compact':
+        dtypes = COMPACT_DTYPES
+
+    stage = report.begin('csv_to_dataframe ' + type_of_df) if report is not None else None
     l = []
-    
-    csv_files = [file for file in csv_list if type_of_df in file]
-    for file in tqdm(csv_files, desc='- Processing csv files ...'):
-        
+
+    # The links are selected by the latest versions of the nodes files, read before the links; the nodes
+    # are selected once read, with the pmids already in their dataframes
+    versions = None
+    if dedup == True and type_of_df == 'links' and any(os.path.basename(file).startswith('nodes_') for file in csv_list):
+        versions = latest_versions(csv_list)
+
+    # Read also the columns needed to select the rows, dropped once the rows are selected
+    selected = [name for name in names if usecols is None or name in usecols]
+    needed = set(selected)
+    if type_of_df == 'links' and versions is not None:
+        needed.add('source')
+    if type_of_df == 'nodes' and dedup == True:
+        needed.add('pmid')
+    if type_of_df == 'links' and known_pmids is not None:
+        needed.add('target')
+    read_columns = [name for name in names if name in needed]
+
+    def read(file):
+        """
+        Read a file and select its rows.
+        """
+        if file.endswith('.parquet'):
+            df = parquet_to_dataframe(file, type_of_df, columns, usecols=read_columns)
+            if dtypes is not None:
+                df = df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+        else:
+            df = pd.read_csv(file, sep='\t', header=None, names=names, usecols=read_columns, quoting=csv.QUOTE_NONE,
+                             dtype={column: dtype for column, dtype in dtypes.items() if column in read_columns} if dtypes is not None else None)
+
+        if versions is not None:
+            latest = versions.get(utils.source_name(file), pd.DataFrame({'pmid': [], 'row': []}, dtype=np.int64))
+            df = df[df['source'].isin(latest['pmid'])]
+
+        if known_pmids is not None and type_of_df == 'links':
+            df = df[utils.in_bitmap(known_pmids, df['target'].to_numpy())]
+
+        if len(read_columns) > len(selected) and type_of_df == 'links':
+            df = df[selected]
+        return df
+
+    csv_files = []
+    for file in [file for file in csv_list if os.path.basename(file).startswith(type_of_df + '_')]:
+
         # Skip the file if it is empty
-        if utils.is_empty_csv(file) == True:
+        if is_empty_file(file) == True:
             print(f"{file}  is empty")
             continue
+        csv_files.append(file)
 
-        df = pd.read_csv(file, sep='\t', header=None, quoting=csv.QUOTE_NONE)
-        l.append(df)
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            l = list(tqdm(executor.map(read, csv_files), total=len(csv_files), desc='- Processing csv files ...'))
+    else:
+        l = [read(file) for file in tqdm(csv_files, desc='- Processing csv files ...')]
+
+    # Keep the latest version of each article: the rows of a file are copied only if some of them are dropped
+    if type_of_df == 'nodes' and dedup == True:
+        versions = latest_versions(csv_list, pmids={utils.source_name(file): df['pmid'].to_numpy() for file, df in zip(csv_files, l)})
+        empty = pd.DataFrame({'pmid': [], 'row': []}, dtype=np.int32)
+        for k, file in enumerate(csv_files):
+            rows = versions.get(utils.source_name(file), empty)['row'].to_numpy()
+            if len(rows) < len(l[k]):
+                l[k] = l[k].iloc[rows]
+        l = [df for df in l if len(df) > 0]
+
+    if type_of_df == 'nodes' and len(read_columns) > len(selected):
+        l = [df[selected] for df in l]
 
     if len(l) == 0:
         print('Error: no articles found with these settings.')
         return None
     
-    df = pd.concat(l, axis=0, ignore_index=True)
+    df = concat_frames(l)
 
-    # Rename the columns of the dataframe according to the type of dataframe
-    if type_of_df == 'links':
-        df.columns = ['source', 'target']
-    elif type_of_df == 'nodes':
-        df.columns = ['pmid'] + columns + ['references']
+    if type_of_df == 'nodes':
+        # The empty categories of the categorical columns become empty strings too
+        for column in df.columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype) and df[column].isna().any():
+                df[column] = df[column].cat.add_categories([''])
         df = df.fillna('') # Replace NaN values by empty strings
-    else:
-        print("Error: type_of_df must be 'links' or 'nodes'")
-        return None
+
+    if report is not None:
+        stage['files'] = len(csv_files)
+        stage['compressed_bytes'] = sum(os.path.getsize(file) for file in csv_files)
+        stage['rows'] = len(df)
+        report.end(stage)
     return df
 
 
+def component_labels(df_links):
+    """
+    Label the weakly connected components of the graph of the links.
+    The components are computed on the arrays of the links, without building the graph:
+    the label of each component is its smallest pmid.
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+
+    Returns
+    -------
+    df : pandas dataframe
+        Dataframe with the pmid of each node and the label of its component
+    """
+    pmids, source, target, first = pcg.encode_links(df_links['source'].to_numpy(dtype=np.int64),
+                                                    df_links['target'].to_numpy(dtype=np.int64))
+    labels = pcg.weakly_connected_labels(len(pmids), source, target)
+
+    return pd.DataFrame({'pmid': pmids, 'component': pmids[labels]})
+
+def component_sizes(df_links):
+    """
+    Return the sizes of the weakly connected components of the graph of the links, from the largest.
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+
+    Returns
+    -------
+    sizes : pandas series
+        Number of nodes of each component, indexed by the label of the component
+    """
+    sizes = component_labels(df_links)['component'].value_counts()
+
+    return sizes.rename('size')
+
+def largest_component_links(df_links):
+    """
+    Return the links of the largest weakly connected component of the graph of the links.
+    The order of the links is preserved.
+
+    Parameters
+    ----------
+    df_links : pandas dataframe
+        Dataframe with the links
+
+    Returns
+    -------
+    df_links : pandas dataframe
+        Dataframe with the links of the largest component
+    """
+    if len(df_links) == 0:
+        return df_links
+
+    pmids, source, target, first = pcg.encode_links(df_links['source'].to_numpy(dtype=np.int64),
+                                                    df_links['target'].to_numpy(dtype=np.int64))
+    labels = pcg.weakly_connected_labels(len(pmids), source, target)
+
+    return df_links[labels[source] == pcg.largest_component(labels, first)]
+
 def connect_graph(G):
     """
     Return a connected graph from the input graph.
@@ -91,8 +528,15 @@ def connect_graph(G):
     G : networkx graph
         Connected graph  
     """
+    if G.number_of_nodes() == 0:
+        return G.copy()
+
+    index = {node: i for i, node in enumerate(G)}
+    edges = np.array([(index[u], index[v]) for u, v in G.edges()], dtype=np.int64).reshape(-1, 2)
+    labels = pcg.weakly_connected_labels(len(index), edges[:, 0], edges[:, 1])
+    keep = labels == pcg.largest_component(labels, np.arange(len(index)))
 
-    G = G.subgraph(max(nx.weakly_connected_components(G), key=len))
+    G = G.subgraph([node for node, i in index.items() if keep[i]]).copy()
 
     return G
 
@@ -114,21 +558,26 @@ def add_attributes(G, df_nodes):
         Graph with the attributes added to the nodes
     """
 
-    # Add the attributes to the nodes
-    for index, row in df_nodes.iterrows():
-        if row['pmid'] in G.nodes:
-            for col in df_nodes.columns:
-                if col != 'pmid':
-                    G.nodes[row['pmid']].update({col: row[col]})
+    # Keep the rows of the nodes of the graph: if a node has more rows, the last one wins
+    df_nodes = df_nodes[df_nodes['pmid'].isin(list(G.nodes))]
+    df_nodes = df_nodes.drop_duplicates(subset='pmid', keep='last')
+
+    # Add the attributes to the nodes, a whole column at a time
+    pmids = df_nodes['pmid'].tolist()
+    for col in df_nodes.columns:
+        if col != 'pmid':
+            nx.set_node_attributes(G, dict(zip(pmids, df_nodes[col].tolist())), col)
 
     return G
 
-def df_to_graph(df_links, df_nodes, connected_graph=True, unknown_nodes=False):
+def df_to_graph(df_links, df_nodes, connected_graph=True, unknown_nodes=False, backend='networkx', report=None):
     """
     Create a graph from the links and the nodes dataframes.
     Each nodes of the graph has its attributes, if known. 
     The attributes are the informations extracted with the parse_xml function.
     Self loops are removed from the graph.
+    With backend='csr' the graph is a CitationGraph, which stores the links as integer
+    arrays and takes much less memory than a networkx graph.
     
     Parameters
     ----------
@@ -140,21 +589,50 @@ def df_to_graph(df_links, df_nodes, connected_graph=True, unknown_nodes=False):
         If True, the graph will be connected (default: True)
     keep_unkown_nodes : boolean
         If True, the graph will keep the nodes whose informations are not known (default: False)
+    backend : str
+        Type of the graph: 'networkx' or 'csr' (default: 'networkx')
+    report : PCNet_utils.RunReport
+        Report of the run: if given, the record of the stage is added to it (default: None)
         
     Returns
     -------
-    G : networkx graph
+    G : networkx graph or CitationGraph
         Graph created from the links and the nodes dataframes
     """
+    if backend not in ['networkx', 'csr']:
+        print("Error: backend must be 'networkx' or 'csr'")
+        return None
+
+    stage = report.begin('df_to_graph') if report is not None else None
+
+    if backend == 'csr':
+        G = pcg.CitationGraph.from_links(df_links, df_nodes, connected_graph=connected_graph,
+                                         unknown_nodes=unknown_nodes)
+    else:
+        G = build_graph(df_links, df_nodes, connected_graph, unknown_nodes)
+
+    if report is not None:
+        stage['rows'] = len(df_links)
+        stage['nodes'] = G.number_of_nodes()
+        stage['links'] = G.number_of_edges()
+        report.end(stage)
+
+    return G
+
+def build_graph(df_links, df_nodes, connected_graph, unknown_nodes):
+    """
+    Create the networkx graph of df_to_graph from the links and the nodes dataframes.
+    """
     if unknown_nodes == False:
         df_links = df_links[df_links['target'].isin(df_nodes['pmid'])]
+
+    # Select the largest component on the links, so that only its graph is built
+    if connected_graph == True:
+        df_links = largest_component_links(df_links)
         
     G = nx.from_pandas_edgelist(df_links, source='source', target='target', create_using=nx.DiGraph())
     G.remove_edges_from(nx.selfloop_edges(G))
 
-    if connected_graph == True:
-        G = connect_graph(G)
-
     nodes = list(G.nodes())
     df_nodes = df_nodes[df_nodes['pmid'].isin(nodes)]
 
@@ -167,10 +645,11 @@ def df_to_graph(df_links, df_nodes, connected_graph=True, unknown_nodes=False):
 def nodes_to_df(G):
     """
     Return a dataframe of nodes from the attributes of the input .gexf graph  
+    If the graph is a CitationGraph, the dataframe of its nodes is returned without walking the graph.
 
     Parameters
     ----------
-    G : networkx graph
+    G : networkx graph or CitationGraph
         Graph from which extract the nodes
 
     Returns
@@ -178,6 +657,9 @@ def nodes_to_df(G):
     df : pandas dataframe
         Dataframe of nodes 
     """
+    if isinstance(G, pcg.CitationGraph):
+        return G.nodes.copy() if G.nodes is not None else pd.DataFrame({'pmid': np.asarray(G.pmids)})
+
     nodes = []
 
     for node in G.nodes(data=True):
@@ -197,10 +679,11 @@ def nodes_to_df(G):
 def links_to_df(G):
     """
     Return a dataframe of links from the edges of the input .gexf graph.
+    If the graph is a CitationGraph, the links are built from its arrays.
 
     Parameters
     ----------
-    G : networkx graph
+    G : networkx graph or CitationGraph
         Graph from which extract the links
 
     Returns
@@ -208,16 +691,10 @@ def links_to_df(G):
     df : pandas dataframe  
         Dataframe of links
     """
-    edges = []
-
-    for edge in G.edges(data=True):
-        edges.append(edge)
+    if isinstance(G, pcg.CitationGraph):
+        return G.edges()
 
-    df = pd.DataFrame(edges)
+    # The edges are read without their attributes, which are not in the csv files
+    df = pd.DataFrame(list(G.edges()), columns=['source', 'target'])
 
-     # Rename the columns and remove the label column to have the same format of the csv files
-    df = df.drop([2], axis=1)
-    df = df.rename(columns={0: 'source', 1: 'target'})
-    
     return df
-
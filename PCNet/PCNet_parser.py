@@ -3,17 +3,51 @@
 
 import os
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from gzip import GzipFile
+from functools import lru_cache
+from contextlib import ExitStack
+import re
+import time
+import queue
+import threading
+import hashlib
+from array import array
+import numpy as np
+import pandas as pd
+from PCNet import PCNet_index as pci
+from PCNet import PCNet_network as pcn
 import xml.etree.ElementTree as ET
+from PCNet import PCNet_utils as utils
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_etree = None
 
 __author__ = "Alessandro Lapi"
 __email__ = "alessandro.lapi@studio.unibo.it"
 
 
 
+# Escaped html tags and quotes left in the text, replaced by a space (the longest sequence first)
+SANITIZE_ENTITIES = re.compile('&lt;/br&gt;&lt;/br&gt;|&lt;/?b&gt;|&lt;br&gt;|&lt;/?sup&gt;|&quot;')
+
+# Runs of spaces, collapsed into one: the literal prefix of the pattern makes its search fast
+SPACES = re.compile('  +')
+
 def sanitize_text(text):
     """
-    Sanitize the text from the xml file to avoid problems with the csv file
+    Sanitize the text from the xml file to avoid problems with the csv file.
+    The brackets are removed, the newlines, the tabs and the escaped html tags are replaced by a space
+    and the runs of spaces are collapsed into one. The escaped tags are searched with a single pattern
+    and only in the texts with an ampersand, the spaces only in the texts with a run of them.
 
     Parameters
     ----------
@@ -25,20 +59,14 @@ def sanitize_text(text):
     text : str
         Sanitized text
     """
-    # clean the text from the brackets and the newlines and tabs to avoid problems with the csv file
-    text = text.replace('[','')
-    text = text.replace(']','')
-    text = text.replace('\n',' ')
-    text = text.replace('\t',' ')
-    text = text.replace('  ',' ')
-    text = text.replace('&lt;b&gt;',' ')
-    text = text.replace('&lt;/b&gt;',' ')
-    text = text.replace('&lt;br&gt;',' ')
-    text = text.replace('&lt;sup&gt;',' ')
-    text = text.replace('&quot;',' ')
-    text = text.replace('&lt;/sup&gt;',' ')
-    text = text.replace('&lt;/br&gt;&lt;/br&gt;',' ')
+    # The replace of a single character is a fast scan of the text, faster than a translation table
+    text = text.replace('[', '').replace(']', '').replace('\n', ' ').replace('\t', ' ').replace('\r', ' ')
 
+    if '&' in text:
+        text = SANITIZE_ENTITIES.sub(' ', text)
+
+    if '  ' in text:
+        text = SPACES.sub(' ', text)
 
     return text
 
@@ -57,122 +85,226 @@ def get_pmid(node):
     pmid : int
         pmid of the article corresponding to the node
     """
-    # pmid_min and pmid_max to check if the pmid is in the correct format
-    pmid_min, pmid_max = 100000, 100000000
-
-    pmid = node.find("./PubmedData/ArticleIdList/ArticleId[@IdType='pubmed']").text
+    if is_lxml(node):
+        pmid = XPATHS['pmid'](node)[0].text
+    else:
+        pmid = node.find("./PubmedData/ArticleIdList/ArticleId[@IdType='pubmed']").text
 
     if pmid is not None:
         pmid = int(pmid)
     
         # Set pmid to None if it is not in the correct format to exclude the article from the parse
-        if pmid < pmid_min or pmid > pmid_max:
-            pmid = None     
+        if pmid < PMID_MIN or pmid > PMID_MAX:
+            pmid = None
 
     return pmid
 
-def get_title(node):
+
+def get_block_pmid(block):
     """
-    While parsing the xml file, return the title of the article corresponding to the node
-    
+    Return the pmid of the article in the raw text of its block (see iter_article_blocks), without parsing it,
+    e.g. to delete the previous versions of an article dropped by the MeSH prefilter
+
     Parameters
     ----------
-    node : int
-        Node of the parsed xml file
-        
+    block : bytes
+        Raw text of a PubmedArticle
+
     Returns
     -------
-    title : str
-        Title of the article corresponding to the node
+    pmid : int
+        pmid of the article, None if it is not found or not in the correct format
     """
-    for child in node.iter('ArticleTitle'):
-        title = "".join(child.itertext())
+    match = ARTICLE_PMID.search(block)
+    if match is None:
+        return None
+    pmid = int(match.group(1))
+    return pmid if PMID_MIN <= pmid <= PMID_MAX else None
+
+
+# Parsers of the xml files: 'auto' is lxml when it is installed, the standard library otherwise
+BACKENDS = ['auto', 'lxml', 'stdlib']
+
+# Paths of the elements of each field in a PubmedArticle, after the PubMed DTD, where the elements collected by
+# extract_fields can be. node()[1][self::text()] is the text before the first child of an element, i.e. its text attribute
+ARTICLE_PATHS = {'pmid': "PubmedData/ArticleIdList/ArticleId[@IdType='pubmed']",
+                 'title': "string(MedlineCitation/Article/ArticleTitle[last()])",
+                 'abstract': "string(MedlineCitation/Article/Abstract[node()[1][self::text()]][last()])",
+                 'date': ["MedlineCitation/Article/ArticleDate[@DateType='Electronic']",
+                          "MedlineCitation/DateRevised",
+                          "PubmedData/History/PubMedPubDate[@PubStatus='accepted']"],
+                 'ymd': "concat(Year, '-', Month, '-', Day)",
+                 'authors': "MedlineCitation/Article/AuthorList/Author/*[self::LastName or self::ForeName or self::Initials] "
+                            "| MedlineCitation/Article/AuthorList/Author",
+                 'journal': "MedlineCitation/Article/Journal[1]/Title[1]/node()[1][self::text()]",
+                 'keywords': "MedlineCitation/KeywordList/Keyword/node()[1][self::text()]",
+                 'descriptors': "MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName/node()[1][self::text()]",
+                 'references': "PubmedData/ReferenceList//Reference/ArticleIdList/ArticleId[@IdType='pubmed']/node()[1][self::text()]",
+                 'mesh': "MedlineCitation/MeshHeadingList/MeshHeading/DescriptorName/@UI",
+                 }
+
+def compile_paths(paths):
+    """
+    Compile the paths with lxml, once instead of for every article. The texts are returned as plain strings,
+    without the reference to their element that lxml adds by default.
+    """
+    if isinstance(paths, list):
+        return [compile_paths(path) for path in paths]
+    return lxml_etree.XPath(paths, smart_strings=False)
 
-        title = sanitize_text(title)
+XPATHS = {name: compile_paths(path) for name, path in ARTICLE_PATHS.items()} if lxml_etree is not None else {}
 
-    return title
-    
-def get_abstract(node):
+def xml_backend(backend='auto'):
     """
-    While parsing the xml file, return the abstract of the article corresponding to the node
+    Return the module that parses the xml files with the backend selected.
 
     Parameters
     ----------
-    node : int
-        Node of the parsed xml file
-        
+    backend : str
+        'lxml', 'stdlib' for xml.etree.ElementTree or 'auto' for lxml when it is installed (default: 'auto')
+
     Returns
     -------
-    abstract : str
-        Abstract of the article corresponding to the node
+    etree : module
+        lxml.etree or xml.etree.ElementTree
     """
-    abstract = ""
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be {' or '.join(repr(name) for name in BACKENDS)}")
+    if backend == 'lxml' and lxml_etree is None:
+        raise ImportError("backend='lxml' needs the lxml package")
 
-    for child in node.iter('Abstract'):
-        if child.text is not None:
-            abstract = "".join(child.itertext())
+    if backend == 'stdlib' or lxml_etree is None:
+        return ET
+    return lxml_etree
 
-            abstract = sanitize_text(abstract)
-    return abstract
+def is_lxml(node):
+    """
+    Check if the node was built by lxml, whose fields are selected with the compiled paths of XPATHS.
+    """
+    return lxml_etree is not None and isinstance(node, lxml_etree._Element)
 
-def get_publication_date(node):
+# Size in bytes of the buffer of the csv files written by the parser
+WRITE_BUFFER = 1024 * 1024
+
+# Size in bytes of the chunks read from the xml files when the articles are scanned as raw bytes
+READ_CHUNK = 1024 * 1024
+
+# Tree numbers of the MeSH (e.g. 'C01.925.782'), as opposed to their unique identifiers (e.g. 'D004724')
+TREE_NUMBER = re.compile(r'^[A-Z]\d{2}(\.\d{3})*$')
+
+# Unique identifiers of the MeSH in the raw text of an article
+MESH_UI = re.compile(rb'UI="([^"]+)"')
+
+# Pmid of an article in its raw text: the ArticleIdList of the article comes before the one of its references
+ARTICLE_PMID = re.compile(rb'<ArticleId IdType="pubmed">\s*(\d+)\s*</ArticleId>')
+
+# Range of the pmids in the correct format, bounds included: the largest one is the last pmid of the bitmaps
+PMID_MIN, PMID_MAX = 100000, utils.MAX_PMID
+
+# Name of the manifest of the parsed files saved in the path_csv folder
+MANIFEST = 'manifest.json'
+
+# Version of the content of the csv files, recorded in the manifest: the files of an older version are parsed again
+PARSE_VERSION = 3
+
+# Name of the inverted index between the pmids and the MeSH saved in the path_csv folder
+MESH_INDEX = 'mesh_index.npz'
+
+# Number of articles in each record batch of the Parquet files and their compression
+PARQUET_BATCH = 65536
+PARQUET_COMPRESSION = 'zstd'
+
+# Informations that can be extracted from the articles, in the order they are written in the csv files
+INFORMATIONS = ['title', 'abstract', 'date', 'authors', 'journal', 'keywords']
+
+# Tags of the elements needed to build each field
+FIELD_TAGS = {'title': ('ArticleTitle',),
+              'abstract': ('Abstract',),
+              'date': ('PubMedPubDate', 'DateRevised', 'ArticleDate'),
+              'authors': ('Author',),
+              'journal': ('Journal',),
+              'keywords': ('Keyword', 'DescriptorName'),
+              'references': ('Reference',),
+              'mesh': ('DescriptorName',),
+              }
+
+
+def get_date(child):
     """
-    While parsing the xml file, return the publication date of the article corresponding to the node
-    
+    Get the date from a date node (e.g. PubMedPubDate, DateRevised, ArticleDate)
+
     Parameters
     ----------
-    node : int
-        Node of the parsed xml file
-        
+    child : xml element
+        Date node with the Year, Month and Day children
+
     Returns
     -------
     date : str
-        Publication date of the article corresponding to the node
+        Date in the format year-month-day, empty if the year, the month or the day is missing or the date is not valid
     """
-    def get_date(child):
-        """
-        Get the date from the child node
-        """
-        year = child.find('Year').text
-        month = child.find('Month').text
-        day = child.find('Day').text
-        date = year + '-' + month + '-' + day
-        return date
+    parts = [child.find(tag) for tag in ('Year', 'Month', 'Day')]
+    if any(part is None or part.text is None for part in parts):
+        return ""
+
+    date = '-'.join(part.text for part in parts)
+    return date if utils.validate_date(date) else ""
+
 
+def format_title(elements, clean=sanitize_text):
+    """
+    Build the title from the ArticleTitle elements
+    """
+    title = ""
+
+    for child in elements['ArticleTitle']:
+        title = "".join(child.itertext())
+
+        title = clean(title)
+
+    return title
+
+def format_abstract(elements, clean=sanitize_text):
+    """
+    Build the abstract from the Abstract elements
+    """
+    abstract = ""
+
+    for child in elements['Abstract']:
+        if child.text is not None:
+            abstract = "".join(child.itertext())
+
+            abstract = clean(abstract)
+    return abstract
+
+def format_publication_date(elements, clean=sanitize_text):
+    """
+    Build the publication date from the PubMedPubDate, DateRevised and ArticleDate elements
+    """
     date = ""
 
     # Get the date of the publication. It is extracted according to the availability,
-    # following this priority: electronic, revised, accepted.
-    for child in node.iter('PubMedPubDate'):
+    # following this priority: electronic, revised, accepted. The dates not valid are skipped.
+    for child in elements['PubMedPubDate']:
         if child.attrib['PubStatus'] == 'accepted':
-            date = get_date(child)
+            date = get_date(child) or date
     
-    for child in node.iter('DateRevised'):
-        date = get_date(child)
+    for child in elements['DateRevised']:
+        date = get_date(child) or date
 
-    for child in node.iter('ArticleDate'):
+    for child in elements['ArticleDate']:
         if child.attrib['DateType'] == 'Electronic':
-            date = get_date(child)
+            date = get_date(child) or date
 
     return date
 
-def get_authors(node):
+def format_authors(elements, clean=sanitize_text):
     """
-    While parsing the xml file, return the authors of the article corresponding to the node
-    
-    Parameters
-    ----------
-    node : int
-        Node of the parsed xml file
-        
-    Returns
-    -------
-    authors : str
-        Authors of the article corresponding to the node
+    Build the authors from the Author elements
     """
-    authors = []
+    names = []
 
-    for child in node.iter('Author'):
+    for child in elements['Author']:
 
         if child.find('LastName') is not None:   
             lastname = child.find('LastName').text
@@ -186,78 +318,51 @@ def get_authors(node):
         else:
             forename = ''
 
-        if lastname != '' and forename != '':
-            authors.append(forename + ' ' + lastname + ', ')
+        names.append((lastname, forename))
+
+    return join_authors(names, clean)
+
+def join_authors(names, clean=sanitize_text):
+    """
+    Join the authors from the pairs of their last name and fore name (or initials), skipping the incomplete ones
+    """
+    authors = [forename + ' ' + lastname for lastname, forename in names if lastname != '' and forename != '']
 
     # clean the authors from newlines and tabs to avoid problems with the csv file
     if len(authors) > 0:
-        authors[-1] = authors[-1][:-2]
-        authors = ''.join(authors)
-        
-        authors = sanitize_text(authors)
-    else:
-        authors = ""
-
-    return authors
+        return clean(', '.join(authors))
+    return ""
 
-def get_journal(node):
+def format_journal(elements, clean=sanitize_text):
     """
-    While parsing the xml file, return the journal of the article corresponding to the node
-    
-    Parameters
-    ----------
-    node : int
-        Node of the parsed xml file
-        
-    Returns
-    -------
-    journal : str
-        Journal of the article corresponding to the node
+    Build the journal from the first Journal element
     """
-    journal = node.find("./MedlineCitation/Article/Journal/Title").text
+    journal = ""
 
-    journal = sanitize_text(journal)
+    if len(elements['Journal']) > 0:
+        title = elements['Journal'][0].find('Title')
+
+        if title is not None and title.text is not None:
+            journal = clean(title.text)
 
     return journal
 
-def get_keywords(node):
+def format_keywords(elements, clean=sanitize_text):
     """
-    While parsing the xml file, return the keywords of the article corresponding to the node
-    
-    Parameters
-    ----------
-    node : int
-        Node of the parsed xml file
-        
-    Returns
-    -------
-    keywords : str
-        Keywords of the article corresponding to the node
+    Build the keywords from the Keyword and DescriptorName elements
     """
-    keywords = []
-
-    # get the keywords from keywords tag
-    for child in node.iter('Keyword'):
-        if child.text is not None:
-            key = child.text
-
-            # clean the keywords from newlines and tabs to avoid problems with the csv file
-            key = sanitize_text(key)
-            keywords.append(key + ', ')
-
-    # get the keywords from the MeSH tag
-    for child in node.iter('DescriptorName'):
-        key = child.text
+    # get the keywords from keywords tag and from the MeSH tag
+    keys = [child.text for child in elements['Keyword'] if child.text is not None]
+    keys += [child.text for child in elements['DescriptorName'] if child.text is not None]
 
-        # clean the keywords from newlines and tabs to avoid problems with the csv file
-        key = sanitize_text(key)
-        keywords.append(key + ', ')
+    return join_keywords(keys, clean)
 
-    if len(keywords) > 0:
-        keywords[-1] = keywords[-1][:-2]
-        keywords = ''.join(keywords)
-    else:
-        keywords = ""
+def join_keywords(keys, clean=sanitize_text):
+    """
+    Join the keywords in lowercase, without the repeated words
+    """
+    # clean the keywords from newlines and tabs to avoid problems with the csv file
+    keywords = ', '.join(clean(key) for key in keys)
 
     # make all the letters lowercase to have less duplicates
     keywords = keywords.lower()
@@ -269,158 +374,1880 @@ def get_keywords(node):
 
     return keywords
 
-def get_references(node):
+def format_references(elements, clean=sanitize_text):
     """
-    While parsing the xml file, return the references of the article corresponding to the node
-    
+    Build the references from the Reference elements
+    """
+    refs = []
+    for child in elements['Reference']:
+        for item in child.iter("ArticleId"):
+            if item.attrib.get("IdType") == "pubmed":
+                refs.append(item.text)
+
+    return join_references(refs)
+
+def join_references(refs):
+    """
+    Join the pmids of the references, skipping the ones that are not in the correct format:
+    from 6 to 8 digits, or the largest pmid (see get_pmid)
+    """
+    return ', '.join(ref for ref in refs if ref is not None and (5 < len(ref) < 9 or ref == str(PMID_MAX)))
+
+def format_mesh(elements, clean=sanitize_text):
+    """
+    Build the unique identifiers of the MeSH, separated by spaces, from the DescriptorName elements
+    """
+    uis = [child.attrib.get('UI') for child in elements['DescriptorName'] if child.attrib.get('UI') is not None]
+
+    return ' '.join(dict.fromkeys(uis))
+
+
+# Functions that build each field from the elements collected by the extractor
+FIELD_FORMATTERS = {'title': format_title,
+                    'abstract': format_abstract,
+                    'date': format_publication_date,
+                    'authors': format_authors,
+                    'journal': format_journal,
+                    'keywords': format_keywords,
+                    'references': format_references,
+                    'mesh': format_mesh,
+                    }
+
+
+def lxml_title(node, clean=sanitize_text):
+    """
+    Build the title of an article parsed by lxml
+    """
+    return clean(XPATHS['title'](node))
+
+def lxml_abstract(node, clean=sanitize_text):
+    """
+    Build the abstract of an article parsed by lxml: the text of the last Abstract element that starts with text
+    """
+    return clean(XPATHS['abstract'](node))
+
+def lxml_publication_date(node, clean=sanitize_text):
+    """
+    Build the publication date of an article parsed by lxml: the last valid date of the first kind found
+    in the order of priority, as format_publication_date
+    """
+    for path in XPATHS['date']:
+        for child in reversed(path(node)):
+            date = XPATHS['ymd'](child)
+            if utils.validate_date(date):
+                return date
+    return ""
+
+def lxml_authors(node, clean=sanitize_text):
+    """
+    Build the authors of an article parsed by lxml. The path returns each Author element followed by its names.
+    """
+    names = []
+
+    for child in XPATHS['authors'](node):
+        tag = child.tag
+        if tag == 'Author':
+            names.append({})
+        elif tag not in names[-1]:
+            names[-1][tag] = child.text
+
+    return join_authors([(name.get('LastName', ''), name.get('ForeName', name.get('Initials', ''))) for name in names], clean)
+
+def lxml_journal(node, clean=sanitize_text):
+    """
+    Build the journal of an article parsed by lxml
+    """
+    title = XPATHS['journal'](node)
+    return clean(title[0]) if len(title) > 0 else ""
+
+def lxml_keywords(node, clean=sanitize_text):
+    """
+    Build the keywords of an article parsed by lxml
+    """
+    return join_keywords(XPATHS['keywords'](node) + XPATHS['descriptors'](node), clean)
+
+def lxml_references(node, clean=sanitize_text):
+    """
+    Build the references of an article parsed by lxml
+    """
+    return join_references(XPATHS['references'](node))
+
+def lxml_mesh(node, clean=sanitize_text):
+    """
+    Build the unique identifiers of the MeSH of an article parsed by lxml
+    """
+    return ' '.join(dict.fromkeys(XPATHS['mesh'](node)))
+
+
+# Functions that build each field of the articles parsed by lxml with the compiled paths
+LXML_FORMATTERS = {'title': lxml_title,
+                   'abstract': lxml_abstract,
+                   'date': lxml_publication_date,
+                   'authors': lxml_authors,
+                   'journal': lxml_journal,
+                   'keywords': lxml_keywords,
+                   'references': lxml_references,
+                   'mesh': lxml_mesh,
+                   }
+
+
+@lru_cache(maxsize=None)
+def compile_extractor(fields):
+    """
+    Compile the extractor of the fields selected: return the tags to collect while visiting an article
+    and the functions to build each field from the collected elements.
+
+    Parameters
+    ----------
+    fields : tuple
+        Fields to extract, among the keys of FIELD_TAGS
+
+    Returns
+    -------
+    tags : tuple
+        Tags of the elements to collect
+    formatters : tuple
+        Pairs (field, function) used to build the fields from the collected elements
+    """
+    fields = [field for field in fields if field in FIELD_TAGS]
+    tags = tuple(dict.fromkeys(tag for field in fields for tag in FIELD_TAGS[field]))
+    formatters = tuple((field, FIELD_FORMATTERS[field]) for field in fields)
+
+    return tags, formatters
+
+def extract_fields(node, fields, sanitize=True):
+    """
+    While parsing the xml file, return the fields selected of the article corresponding to the node.
+    The subtree of the article is visited only once: the elements needed by the fields selected are
+    collected during the visit and then each field is built from them.
+
     Parameters
     ----------
     node : int
         Node of the parsed xml file
-        
+    fields : list
+        Fields to extract, among 'title', 'abstract', 'date', 'authors', 'journal', 'keywords', 'references'
+        and 'mesh' (the unique identifiers of the MeSH of the article, separated by spaces)
+    sanitize : boolean
+        If True, the text of the fields is cleaned with the sanitize_text function to fit in the csv files,
+        otherwise it is kept as it is (default: True)
+
     Returns
     -------
-    references : str
-        References of the article corresponding to the node
+    values : dict
+        Dictionary with the value of each field selected
     """
-    references = []
-    ref = ""
-    for child in node.iter('Reference'):
-        for item in child.iter("ArticleId"):
-            if item.attrib.get("IdType") == "pubmed":
-                ref = item.text
+    clean = sanitize_text if sanitize == True else str
 
-                # check if the reference is in the correct format
-                if ref is not None and 5 < len(ref) < 9:
-                    references.append(ref + ', ')
+    # With lxml each field is selected by its compiled path, without visiting the elements in python
+    if is_lxml(node):
+        return {field: LXML_FORMATTERS[field](node, clean) for field in fields if field in LXML_FORMATTERS}
 
+    tags, formatters = compile_extractor(tuple(fields))
 
-    if len(references) > 0:
-       
-        references[-1] = references[-1][:-2]
-        references = ''.join(references)
-        
-    else:
-        references = ""
+    elements = {tag: [] for tag in tags}
+    for child in node.iter():
+        collected = elements.get(child.tag)
+        if collected is not None:
+            collected.append(child)
 
-    return references
+    values = {field: formatter(elements, clean) for field, formatter in formatters}
 
+    return values
 
-def xml_parser(path_xml, path_csv, MeSH="", informations = ['title', 
-                                                   'abstract',
-                                                   'date', 
-                                                   'authors', 
-                                                   'journal',
-                                                   'keywords'] 
-                                                   ):
+def get_title(node):
     """
-    Parse the xml files and store information of the links and the nodes in csv files. 
-    Each xml file will have its own csv files.
-    The structure of the csv files is the following:
-    - links: PMID of the article, PMID of the reference
-    - nodes: PMID of the article, informations, references; where informations are the informations chosen by the user.
-    The csv files are saved in the path_csv folder.
-    If the MeSH parameter is specified, the parse is performed only over the articles with the MeSH specified.
-    If the informations parameter is specified, the parse is performed only over the informations specified.
+    While parsing the xml file, return the title of the article corresponding to the node
     
     Parameters
     ----------
-    path_xml : str
-        Path of the xml.gz files
-    path_csv : str
-        Path where we want to save the .csv files
-    MeSH : str
-        Mesh corresponding to the area of interest.
-        Default is "", which means that the parse is performed over all the articles.
-    informations : list
-        List of the informations we want to get from the xml files. 
-        Default is ['title', 'abstract', 'date', 'authors', 'journal', 'keywords'].
-        If you need less information you can specify it in the list, keeping the same name.
-        For example, if you want only the title and the abstract, you can write:
-        informations = ['title', 'abstract'].
-        Note: the order of the informations in the list is important.
+    node : int
+        Node of the parsed xml file
         
     Returns
     -------
-    csv_list : list
-        List of the csv files created
+    title : str
+        Title of the article corresponding to the node
     """
-    def get_info(node, net_nodes, net_links, informations):
-        """
-        Get the information from the xml file.
-        """
-        # Extract the pmid
-        pmid = get_pmid(node)
-
-        # If the pmid is not in the correct format, we skip the article
-        if pmid is not None:
+    return extract_fields(node, ['title'])['title']
+    
+def get_abstract(node):
+    """
+    While parsing the xml file, return the abstract of the article corresponding to the node
 
-            net_nodes.write(f"{pmid}\t")
-            
-            # Extract the informations selected
-            if 'title' in informations:
-                title = get_title(node)
-                net_nodes.write(f"{title}\t")
-            
-            if 'abstract' in informations:
-                abstract = get_abstract(node)
-                net_nodes.write(f"{abstract}\t")
-            
-            if 'date' in informations:
-                date = get_publication_date(node)
-                net_nodes.write(f"{date}\t")
-            
-            if 'authors' in informations:
-                authors = get_authors(node)
-                net_nodes.write(f"{authors}\t")
-            
-            if 'journal' in informations:
-                journal = get_journal(node)
-                net_nodes.write(f"{journal}\t")
-            
-            if 'keywords' in informations:
-                keywords = get_keywords(node)
-                net_nodes.write(f"{keywords}\t")
-
-            # Extract the references
-            references = get_references(node)
-            net_nodes.write(f"{references}")
-
-            net_nodes.write("\n")
-
-            # Write the links in the links csv file 
-            if references != "":
-            
-                for ref in references.split(', '): 
-                    net_links.write(f"{pmid}\t{ref}\n")
-
-    csv_list = []
-
-    for file in tqdm([file for file in os.listdir(path_xml) if file.endswith('.gz')], desc='- Processing xml files ...'):
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
         
-        # Unzip the xml.gz file and parse it
-        xml_file = GzipFile(path_xml + file, 'r')
-        parse_file = ET.parse(xml_file)
-
-        # Create 2 csv files for the links and the nodes
-        with open(path_csv + "links_" + os.path.basename(file).split('.')[0] + ".csv", "w", encoding='utf-8') as net_links:
-            with open(path_csv + "nodes_" + os.path.basename(file).split('.')[0] + ".csv", "w", encoding='utf-8') as net_nodes:
-                
-                # Loop over the nodes of the xml file, i.e. the articles
-                for node in parse_file.getroot().iter('PubmedArticle'):
-
-                    if MeSH != "":
-
-                        # Apply the MeSH filter selected
-                        for child in node.iter('DescriptorName'):
-                            if child.attrib['UI'] == MeSH:
-                                get_info(node, net_nodes, net_links, informations)
-
-                    else:
-                        get_info(node, net_nodes, net_links, informations)
+    Returns
+    -------
+    abstract : str
+        Abstract of the article corresponding to the node
+    """
+    return extract_fields(node, ['abstract'])['abstract']
 
-        # Add the csv files to the list
-            csv_list.append(path_csv + "nodes_" + os.path.basename(file).split('.')[0] + ".csv")
-        csv_list.append(path_csv + "links_" + os.path.basename(file).split('.')[0] + ".csv")
+def get_publication_date(node):
+    """
+    While parsing the xml file, return the publication date of the article corresponding to the node
+    
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+        
+    Returns
+    -------
+    date : str
+        Publication date of the article corresponding to the node
+    """
+    return extract_fields(node, ['date'])['date']
+
+def get_authors(node):
+    """
+    While parsing the xml file, return the authors of the article corresponding to the node
+    
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+        
+    Returns
+    -------
+    authors : str
+        Authors of the article corresponding to the node
+    """
+    return extract_fields(node, ['authors'])['authors']
+
+def get_journal(node):
+    """
+    While parsing the xml file, return the journal of the article corresponding to the node
+    
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+        
+    Returns
+    -------
+    journal : str
+        Journal of the article corresponding to the node
+    """
+    return extract_fields(node, ['journal'])['journal']
+
+def get_keywords(node):
+    """
+    While parsing the xml file, return the keywords of the article corresponding to the node
+    
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+        
+    Returns
+    -------
+    keywords : str
+        Keywords of the article corresponding to the node
+    """
+    return extract_fields(node, ['keywords'])['keywords']
+
+def get_references(node):
+    """
+    While parsing the xml file, return the references of the article corresponding to the node
+    
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+        
+    Returns
+    -------
+    references : str
+        References of the article corresponding to the node
+    """
+    return extract_fields(node, ['references'])['references']
+
+
+def iter_articles(xml_file, streaming=True, tags=('PubmedArticle',), backend='auto'):
+    """
+    Yield the PubmedArticle nodes of an xml file one at a time.
+    In streaming mode the file is read with iterparse: each article is yielded as soon as
+    its closing tag is reached and it is cleared right after, so the memory used does not
+    depend on the size of the file. Otherwise the whole tree is built before the loop.
+
+    Parameters
+    ----------
+    xml_file : file object
+        Xml file opened in binary mode (e.g. the GzipFile of a baseline file)
+    streaming : boolean
+        If True, the file is parsed incrementally (default: True)
+    tags : tuple
+        Tags of the records to yield among the children of the root, e.g. ('PubmedArticle', 'DeleteCitation')
+        for the update files (default: ('PubmedArticle',))
+    backend : str
+        Parser of the xml file: 'lxml', 'stdlib' or 'auto' (see xml_backend) (default: 'auto')
+
+    Returns
+    -------
+    node : generator
+        Generator of the PubmedArticle nodes of the xml file
+    """
+    etree = xml_backend(backend)
+
+    if streaming == False:
+        yield from (child for child in etree.parse(xml_file).getroot() if child.tag in tags)
+        return
+
+    if etree is lxml_etree:
+
+        # lxml reports only the end of the records, the other elements are built without events
+        for event, elem in lxml_etree.iterparse(xml_file, events=('end',), tag=tags):
+            parent = elem.getparent()
+            if parent is not None and parent.getparent() is None:
+                yield elem
+
+                # The record and the ones before it, also of other tags, are removed from the root
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+        return
+
+    root = None
+    depth = 0
+
+    for event, elem in ET.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+
+        # Only the children of the root are complete records: the articles are yielded
+        # and every record is then removed from the root to keep the memory flat
+        if depth == 1:
+            if elem.tag in tags:
+                yield elem
+            root.clear()
+
+
+def iter_article_blocks(xml_file, chunk_size=READ_CHUNK, tags=('PubmedArticle',)):
+    """
+    Yield the raw bytes of the PubmedArticle blocks of an xml file one at a time, without parsing them.
+    It is used to test cheap conditions on the text of an article (e.g. the MeSH prefilter)
+    before building its elements.
+
+    Parameters
+    ----------
+    xml_file : file object
+        Xml file opened in binary mode (e.g. the GzipFile of a baseline file)
+    chunk_size : int
+        Number of bytes read from the file at a time
+    tags : tuple
+        Tags of the blocks to yield, e.g. ('PubmedArticle', 'DeleteCitation') for the update files
+        (default: ('PubmedArticle',))
+
+    Returns
+    -------
+    block : generator
+        Generator of the bytes of each PubmedArticle, from its opening to its closing tag
+    """
+    patterns = [(f'<{tag}>'.encode(), f'</{tag}>'.encode()) for tag in tags]
+    tail = max(len(start_tag) for start_tag, end_tag in patterns) - 1
+    buffer = b''
+
+    while True:
+        chunk = xml_file.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+
+        # Position of the next opening tag of each kind of block, searched again only once passed
+        position = 0
+        starts = [buffer.find(start_tag) for start_tag, end_tag in patterns]
+        while True:
+            pending = [(start, k) for k, start in enumerate(starts) if start != -1]
+            if len(pending) == 0:
+                break
+            start, k = min(pending)
+            end = buffer.find(patterns[k][1], start)
+            if end == -1:
+                break
+            position = end + len(patterns[k][1])
+            yield buffer[start:position]
+
+            for j, (start_tag, end_tag) in enumerate(patterns):
+                if starts[j] != -1 and starts[j] < position:
+                    starts[j] = buffer.find(start_tag, position)
+
+        # Keep only the incomplete block, or the tail that may contain a truncated opening tag
+        pending = [start for start in starts if start != -1]
+        if len(pending) > 0:
+            buffer = buffer[min(pending):]
+        else:
+            buffer = buffer[max(position, len(buffer) - tail):]
+
+def has_mesh(node, MeSH):
+    """
+    Check if the article corresponding to the node is indexed with the MeSH
+
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+    MeSH : str
+        Unique identifier of the MeSH (e.g. 'D004724')
+
+    Returns
+    -------
+    boolean
+        True if one of the descriptors of the article is the MeSH, False otherwise
+    """
+    for child in node.iter('DescriptorName'):
+        if child.attrib.get('UI') == MeSH:
+            return True
+    return False
+
+
+def load_mesh_tree(path_mesh):
+    """
+    Load the tree numbers of the MeSH descriptors from a descriptor file of the NLM (e.g. desc2023.xml or desc2023.gz),
+    which can be downloaded from https://nlmpubs.nlm.nih.gov/projects/mesh/MESH_FILES/xmlmesh/.
+    The file is parsed incrementally, one descriptor at a time.
+
+    Parameters
+    ----------
+    path_mesh : str
+        Path of the descriptor file, plain or compressed with gzip
+
+    Returns
+    -------
+    mesh_tree : dict
+        Dictionary with the unique identifier of each MeSH as key and the list of its tree numbers as value
+    """
+    mesh_tree = {}
+
+    if path_mesh.endswith('.gz'):
+        mesh_file = GzipFile(path_mesh, 'r')
+    else:
+        mesh_file = open(path_mesh, 'rb')
+
+    with mesh_file:
+        for event, elem in ET.iterparse(mesh_file, events=('end',)):
+            if elem.tag == 'DescriptorRecord':
+                ui = elem.findtext('DescriptorUI')
+                mesh_tree[ui] = [tree.text for tree in elem.findall('TreeNumberList/TreeNumber')]
+                elem.clear()
+
+    return mesh_tree
+
+def expand_mesh_query(terms, mesh_tree=None):
+    """
+    Return the unique identifiers of the MeSH selected by a query.
+    The terms of the query can be unique identifiers of MeSH (e.g. 'D004724') or tree numbers (e.g. 'C01.925'):
+    a tree number selects all the MeSH of its subtree.
+
+    Parameters
+    ----------
+    terms : str or list
+        Unique identifiers and tree numbers of the query
+    mesh_tree : dict or str
+        Tree numbers of the MeSH (see load_mesh_tree) or path of the descriptor file.
+        It is needed only if the query contains tree numbers (default: None)
+
+    Returns
+    -------
+    uis : set
+        Unique identifiers of the MeSH selected by the query
+    """
+    if isinstance(terms, str):
+        terms = [terms]
+
+    uis = set(term for term in terms if TREE_NUMBER.match(term) is None)
+    prefixes = tuple(term for term in terms if TREE_NUMBER.match(term) is not None)
+
+    if len(prefixes) > 0:
+        if mesh_tree is None:
+            raise ValueError(f"The tree numbers {', '.join(prefixes)} need the mesh_tree to be expanded")
+        if isinstance(mesh_tree, str):
+            mesh_tree = load_mesh_tree(mesh_tree)
+
+        # A tree number selects itself and its descendants, i.e. the tree numbers starting with it followed by a dot
+        descendants = tuple(prefix + '.' for prefix in prefixes)
+        for ui, trees in mesh_tree.items():
+            for tree in trees:
+                if tree in prefixes or tree.startswith(descendants):
+                    uis.add(ui)
+                    break
+
+    return uis
+
+def get_mesh(node):
+    """
+    While parsing the xml file, return the MeSH of the article corresponding to the node
+
+    Parameters
+    ----------
+    node : int
+        Node of the parsed xml file
+
+    Returns
+    -------
+    uis : set
+        Unique identifiers of the MeSH descriptors of the article
+    """
+    if is_lxml(node):
+        return set(XPATHS['mesh'](node))
+    return set(child.attrib.get('UI') for child in node.iter('DescriptorName'))
+
+
+def mesh_queries(MeSH):
+    """
+    Return the MeSH of each query of a parse: a dictionary with the name of each query as key and the set of
+    the unique identifiers of its MeSH as value (None means all the articles). If MeSH is not a dictionary,
+    the parse has a single query named ''.
+    """
+    if isinstance(MeSH, dict):
+        return {query: set(uis) for query, uis in MeSH.items()}
+    if MeSH != "":
+        return {'': {MeSH}}
+    return {'': None}
+
+
+# Filters of the articles, with the field checked by each of them
+FILTER_FIELDS = {'date_from': 'date',
+                 'date_to': 'date',
+                 'journals': 'journal',
+                 'require_abstract': 'abstract',
+                 'require_references': 'references',
+                 }
+
+def date_key(date, end=False):
+    """
+    Return a date as a tuple of integers to compare it with the others: year-month-day, or only the year or
+    year-month, whose missing parts are the first day of the period or the last one if end is True.
+    None if the date is not valid, e.g. the empty date of the articles without a publication date.
+    """
+    try:
+        parts = [int(part) for part in date.split('-')]
+    except ValueError:
+        return None
+    if len(parts) > 3:
+        return None
+
+    return tuple(parts + ([12, 31] if end == True else [1, 1])[len(parts) - 1:])
+
+def journal_key(journal):
+    """
+    Return the journal as it is compared by the filters: sanitized and in lowercase, whatever the output format.
+    """
+    return sanitize_text(journal).strip().lower()
+
+def compile_filters(filters):
+    """
+    Compile the filters of the articles: return the fields they check and the function that checks them on the
+    values of the fields. The fields are extracted first, so that the articles rejected cost only their lookups.
+
+    Parameters
+    ----------
+    filters : dict
+        Filters of the articles, all of them optional:
+        'date_from' and 'date_to' are the first and the last publication date (see get_publication_date), like
+        '2020-03-01', '2020-03' or '2020', and the articles without a date are rejected; 'journals' is the list
+        of the journals allowed, compared in lowercase; 'require_abstract' and 'require_references' reject the
+        articles without an abstract or without references if True
+
+    Returns
+    -------
+    fields : tuple
+        Fields checked by the filters
+    accept : function
+        Function of the values of the fields, True if the article passes the filters (None if there are no filters)
+    """
+    filters = filter_settings(filters)
+
+    unknown = [name for name in filters if name not in FILTER_FIELDS]
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown filters: {', '.join(unknown)}. The filters are {', '.join(FILTER_FIELDS)}")
+    if len(filters) == 0:
+        return (), None
+
+    date_from = date_key(filters['date_from']) if 'date_from' in filters else None
+    date_to = date_key(filters['date_to'], end=True) if 'date_to' in filters else None
+    for name, bound in [('date_from', date_from), ('date_to', date_to)]:
+        if name in filters and bound is None:
+            raise ValueError(f"{name} must be a date like 2020-03-01, 2020-03 or 2020, not {filters[name]!r}")
+
+    journals = filters.get('journals')
+    if journals is not None:
+        journals = set(journal_key(journal) for journal in ([journals] if isinstance(journals, str) else journals))
+
+    require_abstract = filters.get('require_abstract', False) == True
+    require_references = filters.get('require_references', False) == True
+
+    def accept(values):
+        """
+        Check the filters on the values of the fields of an article.
+        """
+        if date_from is not None or date_to is not None:
+            date = date_key(values['date'])
+            if date is None or (date_from is not None and date < date_from) or (date_to is not None and date > date_to):
+                return False
+        if journals is not None and journal_key(values['journal']) not in journals:
+            return False
+        if require_abstract == True and values['abstract'].strip() == "":
+            return False
+        if require_references == True and values['references'] == "":
+            return False
+        return True
+
+    fields = tuple(dict.fromkeys(FILTER_FIELDS[name] for name in filters))
+
+    return fields, accept
+
+def filter_settings(filters):
+    """
+    Return the filters that are set, as they are recorded in the settings of the manifest:
+    the empty ones (None, False, '' or no journals) are dropped and the journals are sorted.
+    """
+    settings = {}
+    for name, value in sorted((filters or {}).items()):
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(value)
+        if value is not None and value is not False and value != '' and value != []:
+            settings[name] = value
+    return settings
+
+def iter_records(xml_file, queries, streaming=True, prefilter=True, update=False, backend='auto'):
+    """
+    Yield the articles of an xml file that match at least one query, each with the list of the queries it matches.
+    The deleted citations of the update files are yielded with None instead of the list. If update is True,
+    also the articles that match no query are yielded, with their pmid instead of the node and an empty list,
+    so that their previous versions can be deleted.
+
+    Parameters
+    ----------
+    xml_file : file object
+        Xml file opened in binary mode (e.g. the GzipFile of a baseline file)
+    queries : dict
+        MeSH of each query, as returned by the mesh_queries function
+    streaming : boolean
+        If True, the file is parsed incrementally (default: True)
+    prefilter : boolean
+        If True and all the queries have a MeSH, only the articles whose raw text contains one of the MeSH
+        are parsed (default: True)
+    update : boolean
+        If True, also the deleted citations and the articles that match no query are yielded (default: False)
+    backend : str
+        Parser of the xml file: 'lxml', 'stdlib' or 'auto' (see xml_backend) (default: 'auto')
+
+    Returns
+    -------
+    record : generator
+        Generator of the node (or the pmid) of each record and the list of the queries it matches
+    """
+    # In the update files the records are also deleted citations
+    tags = ('PubmedArticle', 'DeleteCitation') if update == True else ('PubmedArticle',)
+    etree = xml_backend(backend)
+
+    filtered = all(uis is not None for uis in queries.values())
+    selected = set().union(*[uis for uis in queries.values() if uis is not None])
+
+    def route(node):
+        """
+        Return the queries matched by the article.
+        """
+        if filtered == False:
+            return list(queries)
+        mesh = get_mesh(node)
+        return [query for query, uis in queries.items() if uis is None or not uis.isdisjoint(mesh)]
+
+    if filtered == True and prefilter == True:
+
+        # Build only the articles whose raw text contains the identifier of a MeSH selected,
+        # then check that it is actually one of their descriptors
+        if len(selected) == 1:
+            pattern = f'UI="{next(iter(selected))}"'.encode()
+            match = lambda block: pattern in block
+        else:
+            patterns = set(ui.encode() for ui in selected)
+            match = lambda block: not patterns.isdisjoint(MESH_UI.findall(block))
+
+        for block in iter_article_blocks(xml_file, tags=tags):
+            if block.startswith(b'<DeleteCitation>'):
+                yield etree.fromstring(block), None
+            elif match(block):
+                node = etree.fromstring(block)
+                matched = route(node)
+                if len(matched) > 0:
+                    yield node, matched
+                elif update == True:
+                    yield get_pmid(node), matched
+
+            # The pmid of the article dropped is read from its raw text
+            elif update == True:
+                yield get_block_pmid(block), []
+
+    else:
+
+        # Loop over the nodes of the xml file, i.e. the articles
+        for node in iter_articles(xml_file, streaming, tags=tags, backend=backend):
+
+            if node.tag == 'DeleteCitation':
+                yield node, None
+                continue
+
+            # Apply the MeSH filter selected
+            matched = route(node)
+            if len(matched) > 0:
+                yield node, matched
+            elif update == True:
+                yield get_pmid(node), matched
+
+
+class CsvWriter:
+    """
+    Writer of the nodes and the links of the parsed articles in tab separated csv files.
+    The nodes csv file has a row for each article: pmid, informations, references.
+    The links csv file has a row for each reference: pmid of the article, pmid of the reference.
+    If the bitmap of the known pmids is given, only the links to known articles are written.
+    """
+    extension = '.csv'
+
+    def __init__(self, nodes_file, links_file, columns, known_pmids=None):
+        self.nodes = open(nodes_file, "w", encoding='utf-8', buffering=WRITE_BUFFER)
+        self.links = open(links_file, "w", encoding='utf-8', buffering=WRITE_BUFFER)
+        self.columns = columns
+        self.known_pmids = known_pmids
+        self.nodes_written, self.links_written = 0, 0
+
+    def encode(self, pmid, values):
+        """
+        Build the rows of the nodes and the links csv files of an article.
+        """
+        row = "\t".join([str(pmid)] + [values[column] for column in self.columns]) + "\n"
+
+        references = values['references']
+        links = ""
+        if references != "":
+            references = references.split(', ')
+            if self.known_pmids is not None:
+                references = [ref for ref in references if utils.has_pmid(self.known_pmids, int(ref))]
+            links = "".join(f"{pmid}\t{ref}\n" for ref in references)
+
+        return row, links
+
+    def write(self, record):
+        """
+        Write the rows of an article, built by the encode method.
+        """
+        row, links = record
+        self.nodes.write(row)
+        self.links.write(links)
+        self.nodes_written += 1
+        self.links_written += links.count("\n")
+
+    def close(self):
+        self.nodes.close()
+        self.links.close()
+
+class ParquetWriter:
+    """
+    Writer of the nodes and the links of the parsed articles in Parquet files, in compressed record batches.
+    The nodes have the int64 pmid, the informations as strings (the journal is dictionary encoded) and the
+    references as a list of int64. The links have the int64 source and target.
+    The text is not sanitized, since the format has no separators to protect.
+    If the bitmap of the known pmids is given, only the links to known articles are written.
+    """
+    extension = '.parquet'
+
+    def __init__(self, nodes_file, links_file, columns, known_pmids=None, batch_size=PARQUET_BATCH):
+        if pa is None:
+            raise ImportError("output_format='parquet' needs the pyarrow package")
+
+        self.columns = [column for column in columns if column != 'references']
+        self.known_pmids = known_pmids
+        self.batch_size = batch_size
+        self.nodes_written, self.links_written = 0, 0
+
+        self.nodes_schema = pa.schema([('pmid', pa.int64())] +
+                                      [(column, pa.dictionary(pa.int32(), pa.string()) if column == 'journal' else pa.string())
+                                       for column in self.columns] +
+                                      [('references', pa.list_(pa.int64()))])
+        self.links_schema = pa.schema([('source', pa.int64()), ('target', pa.int64())])
+
+        self.nodes = pq.ParquetWriter(nodes_file, self.nodes_schema, compression=PARQUET_COMPRESSION)
+        self.links = pq.ParquetWriter(links_file, self.links_schema, compression=PARQUET_COMPRESSION)
+        self.reset()
+
+    def reset(self):
+        self.nodes_buffer = {name: [] for name in self.nodes_schema.names}
+        self.links_buffer = {name: [] for name in self.links_schema.names}
+
+    def encode(self, pmid, values):
+        """
+        Build the record of an article, with the references as a list of pmids and the targets of its links.
+        """
+        references = values['references']
+        references = [int(ref) for ref in references.split(', ')] if references != "" else []
+
+        targets = references
+        if self.known_pmids is not None:
+            targets = [ref for ref in references if utils.has_pmid(self.known_pmids, ref)]
+
+        return pmid, [values[column] for column in self.columns], references, targets
+
+    def write(self, record):
+        """
+        Add the record of an article, built by the encode method, to the current batch.
+        """
+        pmid, values, references, targets = record
+
+        self.nodes_buffer['pmid'].append(pmid)
+        for column, value in zip(self.columns, values):
+            self.nodes_buffer[column].append(value)
+        self.nodes_buffer['references'].append(references)
+
+        self.links_buffer['source'].extend([pmid] * len(targets))
+        self.links_buffer['target'].extend(targets)
+        self.nodes_written += 1
+        self.links_written += len(targets)
+
+        if len(self.nodes_buffer['pmid']) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the current batch in the Parquet files.
+        """
+        if len(self.nodes_buffer['pmid']) > 0:
+            self.nodes.write_batch(pa.RecordBatch.from_pydict(self.nodes_buffer, schema=self.nodes_schema))
+        if len(self.links_buffer['source']) > 0:
+            self.links.write_batch(pa.RecordBatch.from_pydict(self.links_buffer, schema=self.links_schema))
+        self.reset()
+
+    def close(self):
+        self.flush()
+        self.nodes.close()
+        self.links.close()
+
+
+class FrameWriter:
+    """
+    Collector of the nodes and the links of the parsed articles in columnar buffers, turned into the same
+    dataframes that csv_to_dataframe reads from the csv files by the frames method: the pmids and the links
+    are kept in arrays of int64 and each information in a list of strings.
+    If the nodes and the links files are given, the articles are also written in csv files (see CsvWriter).
+    If the bitmap of the known pmids is given, only the links to known articles are kept.
+    """
+    extension = '.csv'
+
+    def __init__(self, nodes_file, links_file, columns, known_pmids=None):
+        self.columns = columns
+        self.known_pmids = known_pmids
+        self.csv = CsvWriter(nodes_file, links_file, columns, known_pmids) if nodes_file is not None else None
+        self.nodes_written, self.links_written = 0, 0
+
+        self.pmids = array('q')
+        self.values = {column: [] for column in columns}
+        self.sources, self.targets = array('q'), array('q')
+
+    def encode(self, pmid, values):
+        """
+        Build the record of an article, with the targets of its links, and its csv rows if the files are written.
+        """
+        references = values['references']
+        targets = [int(ref) for ref in references.split(', ')] if references != "" else []
+        if self.known_pmids is not None:
+            targets = [ref for ref in targets if utils.has_pmid(self.known_pmids, ref)]
+
+        rows = self.csv.encode(pmid, values) if self.csv is not None else None
+
+        return pmid, [values[column] for column in self.columns], targets, rows
+
+    def write(self, record):
+        """
+        Add the record of an article, built by the encode method, to the buffers.
+        """
+        pmid, values, targets, rows = record
+
+        self.pmids.append(pmid)
+        for column, value in zip(self.columns, values):
+            self.values[column].append(value)
+        self.sources.extend([pmid] * len(targets))
+        self.targets.extend(targets)
+        self.nodes_written += 1
+        self.links_written += len(targets)
+
+        if rows is not None:
+            self.csv.write(rows)
+
+    def frames(self):
+        """
+        Return the dataframes of the links and of the nodes collected.
+        """
+        df_links = pd.DataFrame({'source': np.array(self.sources, dtype=np.int64),
+                                 'target': np.array(self.targets, dtype=np.int64)})
+        df_nodes = pd.DataFrame({'pmid': np.array(self.pmids, dtype=np.int64), **self.values})
+
+        return df_links, df_nodes
+
+    def close(self):
+        if self.csv is not None:
+            self.csv.close()
+
+
+# Writers of the parsed articles for each output format
+WRITERS = {'csv': CsvWriter, 'parquet': ParquetWriter}
+
+# Number of decompressed chunks, or of batches of records, that the pipeline keeps in each queue
+PIPELINE_QUEUE = 8
+
+# Number of records handed to the writer thread of the pipeline at a time
+PIPELINE_BATCH = 256
+
+
+class PrefetchReader:
+    """
+    Reader of a file that is read in a background thread, a chunk at a time, ahead of its consumer.
+    With a GzipFile the decompression, which releases the GIL, overlaps the parse of the previous chunks.
+    At most PIPELINE_QUEUE chunks are waiting in the queue, so the memory stays bounded.
+    It has the read and tell methods used by the parser.
+    """
+
+    def __init__(self, file, chunk_size=READ_CHUNK, size=PIPELINE_QUEUE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.queue = queue.Queue(maxsize=size)
+        self.stop = threading.Event()
+        self.buffer = b''
+        self.offset = 0
+        self.position = 0
+        self.finished = False
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Read the chunks of the file and put them in the queue, followed by an empty chunk at the end.
+        An error of the reading is put in the queue and raised by the read method.
+        """
+        try:
+            while True:
+                chunk = self.file.read(self.chunk_size)
+                if not self.put(chunk) or chunk == b'':
+                    return
+        except Exception as error:
+            self.put(error)
+
+    def put(self, item):
+        """
+        Put an item in the queue, waiting for a free place unless the reader is closed.
+        """
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def next_chunk(self):
+        if self.finished:
+            return b''
+        chunk = self.queue.get()
+        if isinstance(chunk, Exception):
+            raise chunk
+        if chunk == b'':
+            self.finished = True
+        return chunk
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes, or all the remaining bytes if size is negative.
+        """
+        if size is None or size < 0:
+            chunks = [self.buffer[self.offset:]]
+            while not self.finished:
+                chunks.append(self.next_chunk())
+            data = b''.join(chunks)
+            self.buffer, self.offset = b'', 0
+        else:
+            # The current chunk is consumed from an offset, without copying what remains of it
+            if self.offset >= len(self.buffer):
+                self.buffer, self.offset = self.next_chunk(), 0
+            if self.offset == 0 and size >= len(self.buffer):
+                data = self.buffer
+            else:
+                data = self.buffer[self.offset:self.offset + size]
+            self.offset += len(data)
+
+        self.position += len(data)
+        return data
+
+    def tell(self):
+        return self.position
+
+    def close(self):
+        """
+        Stop the thread, also if the file was not read to the end.
+        """
+        self.stop.set()
+        while self.thread.is_alive():
+            try:
+                self.queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self.thread.join()
+
+class ThreadedWriter:
+    """
+    Wrapper of a writer (e.g. CsvWriter) that writes the records in a background thread, so that the
+    formatting and the writing of the files overlap the parse. The records are handed to the thread
+    in batches of PIPELINE_BATCH, through a queue of at most PIPELINE_QUEUE batches.
+    The other attributes are the ones of the wrapped writer.
+    """
+
+    def __init__(self, writer, batch_size=PIPELINE_BATCH, size=PIPELINE_QUEUE):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.batch = []
+        self.error = None
+        self.queue = queue.Queue(maxsize=size)
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
+
+    def run(self):
+        """
+        Write the batches of the queue until the end, marked by None. After an error the batches are dropped.
+        """
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            if self.error is None:
+                try:
+                    for record in batch:
+                        self.writer.write(record)
+                except Exception as error:
+                    self.error = error
+
+    def encode(self, pmid, values):
+        return self.writer.encode(pmid, values)
+
+    def write(self, record):
+        """
+        Add the record of an article to the current batch, handed to the thread once full.
+        """
+        self.batch.append(record)
+        if len(self.batch) >= self.batch_size:
+            self.queue.put(self.batch)
+            self.batch = []
+
+    def close(self):
+        """
+        Write the last batch, wait for the thread and close the writer.
+        """
+        if len(self.batch) > 0:
+            self.queue.put(self.batch)
+            self.batch = []
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+
+
+def parse_xml_file(file, path_xml, path_csv, MeSH="", informations = ['title', 
+                                                               'abstract',
+                                                               'date', 
+                                                               'authors', 
+                                                               'journal',
+                                                               'keywords'], 
+                                                               streaming=True,
+                                                               prefilter=True,
+                                                               mesh_index=False,
+                                                               update=False,
+                                                               output_format='csv',
+                                                               known_pmids=None,
+                                                               report=False,
+                                                               pipeline=False,
+                                                               backend='auto',
+                                                               filters=None,
+                                                               skip=None
+                                                               ):
+    """
+    Parse a single xml.gz file and store information of the links and the nodes in its own csv files.
+    It is the unit of work of the xml_parser function: each file shares no state with the others,
+    so the files can be parsed in separate processes.
+    The files written have a single version of each article: if the xml file has several versions of an article,
+    it is parsed again without the older ones, so that the links of the last version are not mixed with
+    the links of the others.
+
+    Parameters
+    ----------
+    file : str
+        Name of the xml.gz file in the path_xml folder
+    path_xml : str
+        Path of the xml.gz files
+    path_csv : str
+        Path where we want to save the .csv files
+    MeSH : str or dict
+        Mesh corresponding to the area of interest (default: "", i.e. all the articles).
+        If it is a dictionary, it maps the name of each query to the set of the unique identifiers of its MeSH:
+        the csv files of each query are saved in the subfolder of path_csv with the name of the query.
+    informations : list
+        List of the informations we want to get from the xml file
+    streaming : boolean
+        If True, the xml file is parsed incrementally (default: True)
+    prefilter : boolean
+        If True and the MeSH is specified, only the articles whose raw text contains the MeSH are parsed (default: True)
+    mesh_index : boolean
+        If True, the pmid and the MeSH of each article written are saved in the mesh csv file of the xml file,
+        in the path_csv folder (default: False)
+    update : boolean
+        If True, the xml file is an update file and the pmids of its deleted citations are saved
+        in the deleted csv file, after the nodes and the links csv files. The pmids of the articles out of
+        the MeSH of a query are saved in its deleted csv file too, so that their previous versions are dropped (default: False)
+    output_format : str
+        Format of the nodes and the links files: 'csv' or 'parquet' (default: 'csv').
+        With 'memory' the articles are collected in dataframes (see FrameWriter), and written in csv files
+        only if path_csv is not None
+    known_pmids : numpy array or dict
+        Bitmap of the known pmids (see PCNet_utils.pmid_bitmap): only the links to known articles are written.
+        If MeSH is a dictionary, it can be a dictionary with the bitmap of each query (default: None, i.e. all the links)
+    report : boolean
+        If True, also the record of the parse of the file is returned, for the RunReport of xml_parser (default: False)
+    pipeline : boolean
+        If True, the file is decompressed by a thread ahead of the parse and the records are written by another
+        thread (see PrefetchReader and ThreadedWriter) (default: False)
+    backend : str
+        Parser of the xml file: 'lxml', 'stdlib' or 'auto' (see xml_backend) (default: 'auto')
+    filters : dict
+        Filters of the articles on their date, journal, abstract and references (see compile_filters),
+        checked before the extraction of the other fields (default: None, i.e. all the articles).
+        If update is True, the pmids of the articles rejected are also written in the deleted csv file,
+        so that their previous versions are dropped too
+    skip : dict
+        Number of the first versions of each pmid that are skipped, set when the file is parsed again
+        (default: None)
+
+    Returns
+    -------
+    csv_list : list or dict
+        List with the nodes and the links csv files created.
+        With output_format='memory', tuple with the links and the nodes dataframes and the array of the deleted pmids.
+        If MeSH is a dictionary, dictionary with the list of the csv files (or the tuple) of each query.
+    stats : dict
+        Only if report is True: time, articles, articles rejected by the filters, compressed and uncompressed bytes,
+        rows and links written and peak memory of the process, from its start or the last reset of the peak,
+        at the end of the file
+    """
+    start = time.perf_counter()
+    sanitize = output_format != 'parquet'
+    filter_fields, accept = compile_filters(filters)
+
+    def get_info(node, pmid, outputs, fields, net_mesh):
+        """
+        Get the information from the xml file and write the whole record of the article at once
+        in the files of each output, and its MeSH in the mesh csv file if needed.
+        Return False if the article is rejected by the filters.
+        """
+        # If the pmid is not in the correct format, we skip the article
+        if pmid is not None:
+
+            # The fields of the filters are extracted first: the other ones only if the article passes them
+            values = {}
+            if accept is not None:
+                values = extract_fields(node, filter_fields, sanitize=sanitize)
+                if not accept(values):
+                    return False
+
+            # Extract the informations selected and the references with a single visit of the article
+            values.update(extract_fields(node, [field for field in fields if field not in values], sanitize=sanitize))
+
+            # The record is encoded once for all the outputs with the same known pmids
+            records = {}
+            for writer in outputs:
+                key = id(writer.known_pmids)
+                if key not in records:
+                    records[key] = writer.encode(pmid, values)
+                writer.write(records[key])
+
+            if net_mesh is not None:
+                net_mesh.write(f"{pmid}\t{values['mesh']}\n")
+
+        return True
+
+    # The informations are written in the csv files in a fixed order, followed by the references
+    columns = [info for info in INFORMATIONS if info in informations] + ['references']
+    fields = columns + ['mesh'] if mesh_index == True else columns
+
+    # Each query has its MeSH (None means all the articles) and the folder of its csv files
+    selection = mesh_queries(MeSH)
+    if path_csv is None:
+        queries = {query: (uis, None) for query, uis in selection.items()}
+    else:
+        queries = {query: (uis, path_csv + query + '/' if isinstance(MeSH, dict) else path_csv) for query, uis in selection.items()}
+
+    # The bitmaps of the known pmids are indexed as bytes, which is faster for single pmids
+    known, converted = {}, {}
+    for query in queries:
+        bitmap = known_pmids.get(query) if isinstance(known_pmids, dict) else known_pmids
+        if bitmap is not None and id(bitmap) not in converted:
+            converted[id(bitmap)] = bytes(bitmap)
+        known[query] = None if bitmap is None else converted[id(bitmap)]
+
+    name = os.path.basename(file).split('.')[0]
+    Writer = FrameWriter if output_format == 'memory' else WRITERS[output_format]
+    csv_files = {query: [path + "nodes_" + name + Writer.extension, path + "links_" + name + Writer.extension]
+                 if path is not None else [None, None] for query, (uis, path) in queries.items()}
+
+    # In the update files the records are also deleted citations, whose pmids are written in the deleted csv file
+    if update == True and path_csv is not None:
+        for query, (uis, path) in queries.items():
+            csv_files[query].append(path + "deleted_" + name + ".csv")
+
+    # Unzip the xml.gz file
+    with GzipFile(path_xml + file, 'r') as xml_file, ExitStack() as stack:
+
+        # Create 2 files for the links and the nodes of each query
+        outputs = {}
+        for query in queries:
+            nodes_file, links_file = csv_files[query][:2]
+            writer = Writer(nodes_file, links_file, columns, known_pmids=known[query])
+            if pipeline == True:
+                writer = ThreadedWriter(writer)
+            stack.callback(writer.close)
+            outputs[query] = writer
+
+        # The reader is closed before the writers, so that its thread stops also after an error
+        if pipeline == True:
+            xml_file = PrefetchReader(xml_file)
+            stack.callback(xml_file.close)
+
+        deleted, deleted_pmids = {}, {query: [] for query in queries}
+        if update == True and path_csv is not None:
+            deleted = {query: stack.enter_context(open(csv_files[query][2], "w", encoding='utf-8')) for query in queries}
+
+        def delete(pmids, selected=queries):
+            """
+            Write the pmids of a deleted citation in the deleted csv files of the queries selected.
+            """
+            pmids = [pmid for pmid in pmids if pmid is not None]
+            for query in selected:
+                if query in deleted:
+                    deleted[query].write("".join(f"{pmid}\n" for pmid in pmids))
+                if output_format == 'memory':
+                    deleted_pmids[query].extend(int(pmid) for pmid in pmids)
+
+        net_mesh = None
+        if mesh_index == True and path_csv is not None:
+            net_mesh = stack.enter_context(open(path_csv + "mesh_" + name + ".csv", "w", encoding='utf-8', buffering=WRITE_BUFFER))
+
+        articles, filtered = 0, 0
+        seen, repeated = set(), {}
+        for node, matched in iter_records(xml_file, selection, streaming, prefilter, update, backend):
+            if matched is None:
+                delete([child.text.strip() for child in node.iter('PMID') if child.text is not None])
+                continue
+
+            # The older versions of an article in the file are counted, and skipped when the file is parsed again
+            pmid = node if len(matched) == 0 else get_pmid(node)
+            if skip is not None and skip.get(pmid, 0) > 0:
+                skip[pmid] -= 1
+                continue
+            if pmid in seen:
+                repeated[pmid] = repeated.get(pmid, 0) + 1
+            seen.add(pmid)
+
+            # The article out of every query hides its previous versions, as the latest version must match the MeSH
+            if len(matched) == 0:
+                delete([pmid])
+            else:
+                articles += 1
+                if get_info(node, pmid, [outputs[query] for query in matched], fields, net_mesh) == False:
+                    filtered += 1
+
+                    # The article rejected hides its previous versions, as the latest version must pass the filters
+                    if update == True:
+                        delete([pmid])
+
+                # The same holds for the queries that the article does not match
+                elif update == True and len(matched) < len(queries):
+                    delete([pmid], [query for query in queries if query not in matched])
+
+        uncompressed_bytes = xml_file.tell()
+
+    # The files are written again with only the last version of each article
+    repeated.pop(None, None)
+    if len(repeated) > 0:
+        result = parse_xml_file(file, path_xml, path_csv, MeSH, informations, streaming=streaming, prefilter=prefilter,
+                                mesh_index=mesh_index, update=update, output_format=output_format, known_pmids=known_pmids,
+                                report=report, pipeline=pipeline, backend=backend, filters=filters, skip=repeated)
+        if report == True:
+            result[1]['seconds'] = time.perf_counter() - start
+        return result
+
+    # The dataframes of each query take the place of its csv files
+    if output_format == 'memory':
+        csv_files = {query: writer.frames() + (np.array(deleted_pmids[query], dtype=np.int64),)
+                     for query, writer in outputs.items()}
+
+    if report == True:
+        stats = {'file': file, 'seconds': time.perf_counter() - start, 'articles': articles, 'filtered': filtered,
+                 'compressed_bytes': os.path.getsize(path_xml + file), 'uncompressed_bytes': uncompressed_bytes,
+                 'rows': sum(writer.nodes_written for writer in outputs.values()),
+                 'links': sum(writer.links_written for writer in outputs.values()),
+                 'peak_rss_mb': utils.peak_memory() / 2**20}
+        return (csv_files if isinstance(MeSH, dict) else csv_files['']), stats
+
+    if isinstance(MeSH, dict):
+        return csv_files
+    return csv_files['']
+
+
+# Known pmids of the process of a pool, set once when the process starts (see set_pool_pmids)
+POOL_PMIDS = None
+
+def set_pool_pmids(known_pmids):
+    """
+    Initializer of the processes of the pool of xml_parser and parse_to_frames: the bitmaps of the known pmids
+    are sent once to each process, instead of with each file.
+
+    Parameters
+    ----------
+    known_pmids : numpy array or dict
+        Bitmap of the known pmids, or dictionary with the bitmap of each query (see parse_xml_file)
+    """
+    global POOL_PMIDS
+    POOL_PMIDS = known_pmids
+
+def parse_pool_file(*args, **kwargs):
+    """
+    Parse a single xml.gz file in a process of the pool, with the known pmids of the process (see parse_xml_file).
+    """
+    return parse_xml_file(*args, known_pmids=POOL_PMIDS, **kwargs)
+
+
+def collect_file_pmids(file, path_xml, MeSH="", streaming=True, prefilter=True, update=False, backend='auto', filters=None):
+    """
+    Collect the pmids of the articles of a single xml.gz file selected by the MeSH, and of its deleted citations.
+    It is the unit of work of the collect_pmids function.
+
+    Parameters
+    ----------
+    file : str
+        Name of the xml.gz file in the path_xml folder
+    path_xml : str
+        Path of the xml.gz files
+    MeSH : str or dict
+        Mesh corresponding to the area of interest, or dictionary with the MeSH of each query (see parse_xml_file)
+    streaming : boolean
+        If True, the xml file is parsed incrementally (default: True)
+    prefilter : boolean
+        If True and the MeSH is specified, only the articles whose raw text contains the MeSH are parsed (default: True)
+    update : boolean
+        If True, the xml file is an update file and the pmids of its deleted citations are collected,
+        with the ones of the articles out of the MeSH of each query (default: False)
+    backend : str
+        Parser of the xml file: 'lxml', 'stdlib' or 'auto' (see xml_backend) (default: 'auto')
+    filters : dict
+        Filters of the articles (see compile_filters): only the pmids of the articles that pass them are collected
+        (default: None)
+
+    Returns
+    -------
+    pmids : dict
+        Dictionary with the array of the pmids of the articles of each query
+    deleted : dict
+        Dictionary with the array of the pmids deleted in each query
+    """
+    queries = mesh_queries(MeSH)
+    pmids = {query: [] for query in queries}
+    deleted = {query: [] for query in queries}
+    filter_fields, accept = compile_filters(filters)
+
+    def delete(pmid, selected=queries):
+        """
+        Collect a deleted pmid in the queries selected.
+        """
+        if pmid is not None:
+            for query in selected:
+                deleted[query].append(pmid)
+
+    with GzipFile(path_xml + file, 'r') as xml_file:
+        for node, matched in iter_records(xml_file, queries, streaming, prefilter, update, backend):
+            if matched is None:
+                for child in node.iter('PMID'):
+                    if child.text is not None:
+                        delete(int(child.text))
+                continue
+
+            # The article out of every query hides its previous versions, as in parse_xml_file
+            if len(matched) == 0:
+                delete(node)
+                continue
+
+            pmid = get_pmid(node)
+            if pmid is None:
+                continue
+
+            # The article rejected by the filters hides its previous versions too
+            if accept is not None and not accept(extract_fields(node, filter_fields)):
+                if update == True:
+                    delete(pmid)
+                continue
+
+            for query in matched:
+                pmids[query].append(pmid)
+            if update == True:
+                delete(pmid, [query for query in queries if query not in matched])
+
+    return ({query: np.array(p, dtype=np.int64) for query, p in pmids.items()},
+            {query: np.array(p, dtype=np.int64) for query, p in deleted.items()})
+
+def collect_pmids(path_xml, MeSH="", streaming=True, workers=1, prefilter=True, mesh_tree=None, update=False, backend='auto',
+                  filters=None):
+    """
+    First pass over the xml files: build the bitmap of the pmids of the articles that the parse with the same
+    settings would write. Passed to xml_parser as known_pmids, it drops the links to the articles out of the
+    selection while parsing, as df_to_graph does with unknown_nodes=False.
+    The files are applied in the order of their names, so the articles of the update files that are deleted,
+    or revised out of the MeSH, in the same file or in a following one are not known.
+
+    Parameters
+    ----------
+    path_xml : str
+        Path of the xml.gz files
+    MeSH : str or dict
+        Mesh corresponding to the area of interest, or dictionary of queries (see xml_parser)
+    streaming : boolean
+        If True, each xml file is parsed incrementally (default: True)
+    workers : int
+        Number of processes used to read the xml files (default: 1)
+    prefilter : boolean
+        If True and the MeSH is specified, only the articles whose raw text contains the MeSH are parsed (default: True)
+    mesh_tree : dict or str
+        Tree numbers of the MeSH, or path of the MeSH descriptor file, used to expand the tree numbers in the queries
+        (default: None)
+    update : boolean
+        If True, the xml files can be update files with deleted citations (default: False)
+    backend : str
+        Parser of the xml files: 'lxml', 'stdlib' or 'auto' (see xml_backend) (default: 'auto')
+    filters : dict
+        Filters of the articles, as in xml_parser (default: None)
+
+    Returns
+    -------
+    known_pmids : numpy array or dict
+        Bitmap of the pmids (see PCNet_utils.pmid_bitmap). If MeSH is a dictionary, dictionary with the bitmap of each query.
+    """
+    files = sorted(file for file in os.listdir(path_xml) if file.endswith('.gz'))
+
+    if isinstance(MeSH, dict):
+        if isinstance(mesh_tree, str):
+            mesh_tree = load_mesh_tree(mesh_tree)
+        MeSH = {query: expand_mesh_query(terms, mesh_tree) for query, terms in MeSH.items()}
+
+    results = [None] * len(files)
+    options = {'streaming': streaming, 'prefilter': prefilter, 'update': update, 'backend': backend, 'filters': filters}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(collect_file_pmids, file, path_xml, MeSH, **options): i
+                       for i, file in enumerate(files)}
+            for future in tqdm(as_completed(futures), total=len(futures), desc='- Collecting pmids ...'):
+                results[futures[future]] = future.result()
+    else:
+        for i, file in enumerate(tqdm(files, desc='- Collecting pmids ...')):
+            results[i] = collect_file_pmids(file, path_xml, MeSH, **options)
+
+    bitmaps = {query: utils.pmid_bitmap() for query in mesh_queries(MeSH)}
+    for pmids, deleted in results:
+        for query, bitmap in bitmaps.items():
+            utils.add_pmids(bitmap, pmids[query])
+            utils.remove_pmids(bitmap, deleted[query])
+
+    if isinstance(MeSH, dict):
+        return bitmaps
+    return bitmaps['']
+
+
+def xml_parser(path_xml, path_csv, MeSH="", informations = ['title', 
+                                                   'abstract',
+                                                   'date', 
+                                                   'authors', 
+                                                   'journal',
+                                                   'keywords'], 
+                                                   streaming=True,
+                                                   workers=1,
+                                                   prefilter=True,
+                                                   mesh_tree=None,
+                                                   mesh_index=False,
+                                                   resume=False,
+                                                   update=False,
+                                                   output_format='csv',
+                                                   known_pmids=None,
+                                                   report=None,
+                                                   pipeline=False,
+                                                   backend='auto',
+                                                   filters=None
+                                                   ):
+    """
+    Parse the xml files and store information of the links and the nodes in csv files. 
+    Each xml file will have its own csv files.
+    The structure of the csv files is the following:
+    - links: PMID of the article, PMID of the reference
+    - nodes: PMID of the article, informations, references; where informations are the informations chosen by the user.
+    The csv files are saved in the path_csv folder.
+    If the MeSH parameter is specified, the parse is performed only over the articles with the MeSH specified,
+    and each of them is written once.
+    If the informations parameter is specified, the parse is performed only over the informations specified.
+    If the MeSH parameter is a dictionary of queries, all the queries are built with a single parse of the
+    xml files and each article is written in the csv files of every query it matches.
+    If the workers parameter is greater than 1, the xml files are parsed in parallel by a pool of processes.
+    
+    Parameters
+    ----------
+    path_xml : str
+        Path of the xml.gz files
+    path_csv : str
+        Path where we want to save the .csv files
+    MeSH : str or dict
+        Mesh corresponding to the area of interest.
+        Default is "", which means that the parse is performed over all the articles.
+        It can also be a dictionary that maps the name of each query to its MeSH, given as a unique identifier
+        or a list of them. The MeSH of a query can be also tree numbers (e.g. 'C01.925') to select whole subtrees,
+        in this case the mesh_tree parameter is needed. The csv files of each query are saved in the subfolder
+        of path_csv with the name of the query. For example:
+        MeSH = {'covid': 'D000086382', 'virus_diseases': ['C01.925']}.
+    informations : list
+        List of the informations we want to get from the xml files. 
+        Default is ['title', 'abstract', 'date', 'authors', 'journal', 'keywords'].
+        If you need less information you can specify it in the list, keeping the same name.
+        For example, if you want only the title and the abstract, you can write:
+        informations = ['title', 'abstract'].
+        Note: the order of the informations in the list is important.
+    streaming : boolean
+        If True, each xml file is parsed incrementally with iterparse and every article is
+        cleared once written, so the memory does not grow with the size of the file.
+        If False, the whole tree of each file is built before the parse (default: True)
+    workers : int
+        Number of processes used to parse the xml files (default: 1, i.e. no parallelism)
+    prefilter : boolean
+        If True and the MeSH is specified, the raw bytes of each article are scanned for the MeSH
+        identifier and only the articles that contain it are parsed, skipping all the others
+        before building their elements (default: True)
+    mesh_tree : dict or str
+        Tree numbers of the MeSH, or path of the MeSH descriptor file of the NLM, used to expand
+        the tree numbers in the queries (default: None)
+    mesh_index : boolean
+        If True, the inverted index between the pmids and the MeSH of the articles written is saved
+        in the path_csv folder as mesh_index.npz (see PCNet_index.build_mesh_index), so that the articles of
+        any MeSH can be selected later from the csv files without parsing the xml files again (default: False)
+    resume : boolean
+        If True, the xml files already parsed in the path_csv folder with the same settings are skipped and
+        their csv files are returned in csv_list. A file is skipped if its entry in the manifest.json file of
+        the path_csv folder matches its MD5 (from the .md5 file of the baseline, if present) or its size and
+        modification time, the settings of the parse and the csv files are still there. The manifest is
+        updated after each file, so an interrupted parse restarts from the files not done yet (default: False)
+    update : boolean
+        If True, the xml files can be the daily update files of PubMed (https://ftp.ncbi.nlm.nih.gov/pubmed/updatefiles/),
+        put in the path_xml folder together with the baseline files. For each xml file also a csv file with the pmids
+        of its deleted citations is created and added to csv_list. The csv_to_dataframe function then keeps only the
+        last version of each article, according to the order of the files, and drops the deleted ones (default: False)
+    output_format : str
+        Format of the nodes and the links files: 'csv' for tab separated csv files or 'parquet' for compressed
+        Parquet files, with typed columns and the text kept as it is (it needs the pyarrow package).
+        The csv_to_dataframe function reads both the formats (default: 'csv')
+    known_pmids : numpy array, dict or boolean
+        Bitmap of the known pmids (see PCNet_utils.pmid_bitmap): only the links to known articles are written,
+        so the links that df_to_graph would drop with unknown_nodes=False are never written nor loaded.
+        It can be built from a previous parse (PCNet_network.known_pmids) or from the MeSH index
+        (PCNet_index.mesh_bitmap). If MeSH is a dictionary, it can be a dictionary with the bitmap of each query.
+        If True, the bitmap of the articles selected is built with a first pass over the xml files (see collect_pmids).
+        Default is None, i.e. all the links are written
+    report : PCNet_utils.RunReport
+        Report of the run: if given, the records of the parse and of each xml file parsed are added to it (default: None)
+    pipeline : boolean
+        If True, in each process a thread decompresses the xml file ahead of the parse and another one writes
+        the csv files, through bounded queues, so that the decompression and the writing overlap the parse
+        also with workers=1 (default: False)
+    backend : str
+        Parser of the xml files: 'lxml' for the lxml package, which selects the articles and their elements
+        in C and compiles the paths searched in each article, 'stdlib' for xml.etree.ElementTree, or 'auto'
+        for lxml when it is installed. The csv files are the same with both the parsers (default: 'auto')
+    filters : dict
+        Filters of the articles, checked on a few fields before the extraction of the other ones, so that the
+        articles rejected are not extracted nor written (default: None, i.e. all the articles). The keys are:
+        'date_from' and 'date_to', the first and the last publication date (e.g. '2020-03-01', '2020-03' or '2020'),
+        'journals', the list of the journals allowed (compared in lowercase), 'require_abstract' and
+        'require_references', to keep only the articles with an abstract or with references. For example:
+        filters = {'date_from': '2020', 'date_to': '2022', 'journals': ['Nature', 'Science'], 'require_abstract': True}.
+        
+    Returns
+    -------
+    csv_list : list or dict
+        List of the csv files created, sorted according to the name of the xml files.
+        If MeSH is a dictionary, dictionary with the list of the csv files of each query.
+    """
+    if output_format not in WRITERS:
+        print(f"Error: output_format must be {' or '.join(repr(name) for name in WRITERS)}")
+        return None
+    if output_format == 'parquet' and pa is None:
+        print("Error: output_format='parquet' needs the pyarrow package")
+        return None
+    if backend not in BACKENDS:
+        print(f"Error: backend must be {' or '.join(repr(name) for name in BACKENDS)}")
+        return None
+    if backend == 'lxml' and lxml_etree is None:
+        print("Error: backend='lxml' needs the lxml package")
+        return None
+    try:
+        compile_filters(filters)
+    except ValueError as error:
+        print(f"Error: {error}")
+        return None
+
+    files = sorted(file for file in os.listdir(path_xml) if file.endswith('.gz'))
+    stage = report.begin('xml_parser') if report is not None else None
+
+    # Expand the MeSH of each query and create its folder
+    if isinstance(MeSH, dict):
+        if isinstance(mesh_tree, str):
+            mesh_tree = load_mesh_tree(mesh_tree)
+        MeSH = {query: expand_mesh_query(terms, mesh_tree) for query, terms in MeSH.items()}
+        for query in MeSH:
+            os.makedirs(path_csv + query + '/', exist_ok=True)
+
+    # Build the bitmap of the articles selected with a first pass
+    if known_pmids is True:
+        known_pmids = collect_pmids(path_xml, MeSH, streaming, workers, prefilter, update=update, backend=backend, filters=filters)
+
+    # Settings that change the content of the csv files, recorded in the manifest
+    if isinstance(MeSH, dict):
+        settings = {'MeSH': {query: sorted(uis) for query, uis in MeSH.items()}}
+    else:
+        settings = {'MeSH': MeSH}
+    settings['informations'] = [info for info in INFORMATIONS if info in informations]
+    settings['mesh_index'] = mesh_index
+    settings['update'] = update
+    settings['output_format'] = output_format
+    settings['version'] = PARSE_VERSION
+    if len(filter_settings(filters)) > 0:
+        settings['filters'] = filter_settings(filters)
+    if isinstance(known_pmids, dict):
+        settings['known_pmids'] = {query: hashlib.md5(bytes(bitmap)).hexdigest() for query, bitmap in known_pmids.items()}
+    elif known_pmids is not None:
+        settings['known_pmids'] = hashlib.md5(bytes(known_pmids)).hexdigest()
+
+    # Skip the files already parsed with the same settings, whose csv files are still there
+    path_manifest = path_csv + MANIFEST
+    manifest = utils.read_manifest(path_manifest) if resume == True else {}
+    signatures = {file: utils.file_signature(path_xml + file) for file in files}
+
+    results = [None] * len(files)
+
+    for i, file in enumerate(files):
+        entry = manifest.get(file)
+        if entry is not None and entry['signature'] == signatures[file] and entry['settings'] == settings \
+                and all(os.path.exists(output) for output in entry['files']):
+            results[i] = entry['outputs']
+
+    todo = [i for i in range(len(files)) if results[i] is None]
+    if len(todo) < len(files):
+        print(f"- Skipping {len(files) - len(todo)} xml files already parsed")
+
+    def record(i, result):
+        """
+        Store the result of the parse of a file and record it in the manifest.
+        """
+        if report is not None:
+            result, stats = result
+            report.add_file(stats)
+
+        results[i] = result
+        outputs = [output for query in result for output in result[query]] if isinstance(result, dict) else list(result)
+        if mesh_index == True:
+            outputs.append(path_csv + "mesh_" + os.path.basename(files[i]).split('.')[0] + ".csv")
+
+        manifest[files[i]] = {'signature': signatures[files[i]], 'settings': settings, 'outputs': result, 'files': outputs}
+        utils.write_manifest(path_manifest, manifest)
+
+    # The options of the parse of each file are passed by keyword, the same in the pool and in this process
+    options = {'streaming': streaming, 'prefilter': prefilter, 'mesh_index': mesh_index, 'update': update,
+               'output_format': output_format, 'report': report is not None, 'pipeline': pipeline, 'backend': backend,
+               'filters': filters}
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_pool_pmids, initargs=(known_pmids,)) as executor:
+            futures = {executor.submit(parse_pool_file, files[i], path_xml, path_csv, MeSH, informations, **options): i
+                       for i in todo}
+
+            # The progress bar is updated as soon as any file is done, the order is restored after
+            for future in tqdm(as_completed(futures), total=len(futures), desc='- Processing xml files ...'):
+                record(futures[future], future.result())
+    else:
+        for i in tqdm(todo, desc='- Processing xml files ...'):
+            record(i, parse_xml_file(files[i], path_xml, path_csv, MeSH, informations, known_pmids=known_pmids, **options))
+
+    # Add the csv files to the list
+    if isinstance(MeSH, dict):
+        csv_list = {query: [csv_file for result in results for csv_file in result[query]] for query in MeSH}
+    else:
+        csv_list = [csv_file for result in results for csv_file in result]
+
+    # Merge the MeSH of the latest version of the articles of all the files in the inverted index
+    if mesh_index == True:
+        mesh_files = [path_csv + "mesh_" + os.path.basename(file).split('.')[0] + ".csv" for file in files]
+        csv_files = [csv_file for files_query in csv_list.values() for csv_file in files_query] if isinstance(MeSH, dict) else csv_list
+        deleted_files = [csv_file for csv_file in csv_files if os.path.basename(csv_file).startswith('deleted_')]
+        pci.build_mesh_index(mesh_files, path_csv + MESH_INDEX, deleted_files)
+
+    if report is not None:
+        parsed = report.files[len(report.files) - len(todo):]
+        stage['files'] = len(todo)
+        stage['skipped_files'] = len(files) - len(todo)
+        for counter in ['articles', 'filtered', 'compressed_bytes', 'uncompressed_bytes', 'rows', 'links']:
+            stage[counter] = sum(stats[counter] for stats in parsed)
+        report.end(stage)
 
     return csv_list
+
+
+def parse_to_frames(path_xml, MeSH="", informations = ['title', 
+                                                      'abstract',
+                                                      'date', 
+                                                      'authors', 
+                                                      'journal',
+                                                      'keywords'], 
+                                                      path_csv=None,
+                                                      streaming=True,
+                                                      workers=1,
+                                                      prefilter=True,
+                                                      mesh_tree=None,
+                                                      update=False,
+                                                      known_pmids=None,
+                                                      dtypes=None,
+                                                      pipeline=False,
+                                                      backend='auto',
+                                                      filters=None
+                                                      ):
+    """
+    Parse the xml files and return the links and the nodes dataframes directly, without writing and reading
+    back the csv files: the articles are collected in columnar buffers while they are parsed (see FrameWriter).
+    The dataframes have the same rows as the ones of csv_to_dataframe on the csv files of xml_parser
+    with the same settings, and the text keeps the same sanitization.
+    If path_csv is given, the csv files are also written, as xml_parser does.
+
+    Parameters
+    ----------
+    path_xml : str
+        Path of the xml.gz files
+    MeSH : str or dict
+        Mesh corresponding to the area of interest (default: "", i.e. all the articles).
+        If it is a dictionary of queries, the dataframes of each query are returned (see xml_parser)
+    informations : list
+        List of the informations we want to get from the xml files
+    path_csv : str
+        Path where the csv files are also saved (default: None, i.e. nothing is written)
+    streaming : boolean
+        If True, each xml file is parsed incrementally (default: True)
+    workers : int
+        Number of processes used to parse the xml files (default: 1, i.e. no parallelism)
+    prefilter : boolean
+        If True and the MeSH is specified, only the articles whose raw text contains the MeSH are parsed (default: True)
+    mesh_tree : dict or str
+        Tree numbers of the MeSH, or path of the MeSH descriptor file of the NLM (default: None)
+    update : boolean
+        If True, the xml files can be update files: only the latest version of each article is kept
+        and the deleted articles are dropped, according to the order of the files (default: False)
+    known_pmids : numpy array, dict or boolean
+        Bitmap of the known pmids: only the links to known articles are kept.
+        If True, the bitmap is built with a first pass over the xml files (see collect_pmids) (default: None)
+    dtypes : dict or str
+        Types of the columns, as in csv_to_dataframe (default: None)
+    pipeline : boolean
+        If True, each xml file is decompressed by a thread ahead of the parse, as in xml_parser (default: False)
+    backend : str
+        Parser of the xml files: 'lxml', 'stdlib' or 'auto' (see xml_parser) (default: 'auto')
+    filters : dict
+        Filters of the articles on their date, journal, abstract and references (see xml_parser) (default: None)
+
+    Returns
+    -------
+    df_links : pandas dataframe
+        Dataframe with the links
+    df_nodes : pandas dataframe
+        Dataframe with the nodes.
+        If MeSH is a dictionary, dictionary with the tuple of the dataframes of each query.
+    """
+    files = sorted(file for file in os.listdir(path_xml) if file.endswith('.gz'))
+
+    # Expand the MeSH of each query and create its folder
+    if isinstance(MeSH, dict):
+        if isinstance(mesh_tree, str):
+            mesh_tree = load_mesh_tree(mesh_tree)
+        MeSH = {query: expand_mesh_query(terms, mesh_tree) for query, terms in MeSH.items()}
+        if path_csv is not None:
+            for query in MeSH:
+                os.makedirs(path_csv + query + '/', exist_ok=True)
+
+    if known_pmids is True:
+        known_pmids = collect_pmids(path_xml, MeSH, streaming, workers, prefilter, update=update, backend=backend, filters=filters)
+
+    results = [None] * len(files)
+    arguments = (path_xml, path_csv, MeSH, informations)
+    options = {'streaming': streaming, 'prefilter': prefilter, 'update': update, 'output_format': 'memory',
+               'pipeline': pipeline, 'backend': backend, 'filters': filters}
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_pool_pmids, initargs=(known_pmids,)) as executor:
+            futures = {executor.submit(parse_pool_file, files[i], *arguments, **options): i for i in range(len(files))}
+            for future in tqdm(as_completed(futures), total=len(futures), desc='- Processing xml files ...'):
+                results[futures[future]] = future.result()
+    else:
+        for i in tqdm(range(len(files)), desc='- Processing xml files ...'):
+            results[i] = parse_xml_file(files[i], *arguments, known_pmids=known_pmids, **options)
+
+    if dtypes == 'compact':
+        dtypes = pcn.COMPACT_DTYPES
+
+    if isinstance(MeSH, dict):
+        return {query: merge_frames([result[query] for result in results], dtypes) for query in MeSH}
+    return merge_frames(results, dtypes)
+
+def merge_frames(parts, dtypes=None):
+    """
+    Merge the dataframes of the xml files, returned by parse_xml_file with output_format='memory',
+    as csv_to_dataframe merges the csv files.
+    """
+    # Keep only the latest version of each article, as for the csv files: the parts without
+    # older versions are kept as they are. A part has a single version of each article (see parse_xml_file),
+    # so the links of the version kept are the ones with its pmid as source
+    versions = pcn.resolve_versions([df_nodes['pmid'].to_numpy() for df_links, df_nodes, deleted in parts],
+                                    [deleted for df_links, df_nodes, deleted in parts])
+    latest = [versions.get(k, pd.DataFrame({'pmid': [], 'row': []}, dtype=np.int32)) for k in range(len(parts))]
+    parts = [(df_links, df_nodes, deleted) if len(rows) == len(df_nodes) else
+             (df_links[df_links['source'].isin(rows['pmid'])], df_nodes.iloc[rows['row'].to_numpy()], deleted)
+             for (df_links, df_nodes, deleted), rows in zip(parts, latest)]
+
+    frames = []
+    for type_of_df, k in [('links', 0), ('nodes', 1)]:
+        l = [part[k] for part in parts if len(part[k]) > 0]
+        if len(l) == 0:
+            print(f'Error: no {type_of_df} found with these settings.')
+            frames.append(None)
+            continue
+
+        if dtypes is not None:
+            l = [df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns}) for df in l]
+        frames.append(pcn.concat_frames(l))
+
+    return frames[0], frames[1]
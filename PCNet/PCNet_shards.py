@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import csv
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from PCNet import PCNet_network as pcn
+from PCNet import PCNet_graph as pcg
+from PCNet import PCNet_utils as utils
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+# Default memory budget of the out-of-core build, in bytes
+MEMORY_BUDGET = 8 * 2**30
+
+# Bytes of memory per link of a run or of a shard: the pmids read, the 64-bit keys and the temporary
+# arrays of the sort and of the components
+LINK_BYTES = 64
+
+# Bytes of memory per link of a chunk read from a csv file, with the buffers of the parser
+READ_BYTES = 128
+
+# Bytes of memory per node of the arrays of the whole graph: the degrees or the labels of the components
+# with the temporary arrays of their pointer jumping
+NODE_BYTES = 32
+
+# The links are sorted as 64-bit keys, with the pmid of the source in the high bits and the one of the target
+# in the low bits: the pmids are at most MAX_PMID, so they take 27 bits
+PMID_BITS = int(utils.MAX_PMID).bit_length()
+PMID_MASK = (1 << PMID_BITS) - 1
+
+# Number of links read at a time from a file
+LINKS_CHUNK = 1000000
+
+# Version of the format of the shards folder, written in its graph.json file
+SHARDS_FORMAT = 1
+
+# Files of a shards folder, removed when the graph is built again
+SHARDS_PREFIXES = ['graph.json', 'pmids.npy', 'indptr_', 'indices_', 'out_degree.npy', 'in_degree.npy', 'labels.npy']
+
+
+def iter_links(csv_list, chunk_size=LINKS_CHUNK, versions=None, known_pmids=None):
+    """
+    Read the links of the files of a parse a chunk at a time, selected as in csv_to_dataframe: only the links
+    of the latest versions of the articles and, if the bitmap of the known pmids is given, the links to known
+    articles. The links with a pmid out of the bitmaps of the pmids (see PCNet_utils.MAX_PMID) are dropped.
+
+    Parameters
+    ----------
+    csv_list : list
+        List of the csv or Parquet files created by the xml_parser function
+    chunk_size : int
+        Number of links read at a time (default: LINKS_CHUNK)
+    versions : dict
+        Latest versions of the articles, returned by latest_versions (default: None, i.e. all the links)
+    known_pmids : numpy array
+        Bitmap of the known pmids, e.g. built with the known_pmids function (default: None, i.e. all the links)
+
+    Yields
+    ------
+    source : numpy array
+        Pmids of the sources of the links
+    target : numpy array
+        Pmids of the targets of the links
+    """
+    empty = np.array([], dtype=np.int64)
+
+    for file in csv_list:
+        if not os.path.basename(file).startswith('links_') or pcn.is_empty_file(file) == True:
+            continue
+
+        latest = None
+        if versions is not None:
+            latest = versions[utils.source_name(file)]['pmid'].to_numpy() if utils.source_name(file) in versions else empty
+
+        if file.endswith('.parquet'):
+            chunks = ((batch.column(0).to_numpy(), batch.column(1).to_numpy())
+                      for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_size, columns=['source', 'target']))
+        else:
+            chunks = ((df['source'].to_numpy(), df['target'].to_numpy())
+                      for df in pd.read_csv(file, sep='\t', header=None, names=['source', 'target'], dtype=np.int64,
+                                            quoting=csv.QUOTE_NONE, chunksize=chunk_size))
+
+        for source, target in chunks:
+            source, target = source.astype(np.int64, copy=False), target.astype(np.int64, copy=False)
+            keep = (source >= 0) & (source <= utils.MAX_PMID) & (target >= 0) & (target <= utils.MAX_PMID)
+            if latest is not None:
+                keep &= np.isin(source, latest)
+            if known_pmids is not None:
+                keep &= utils.in_bitmap(known_pmids, target)
+            yield source[keep], target[keep]
+
+def build_shards(csv_list, path_shards, memory=MEMORY_BUDGET, known_pmids=None, dedup=True, report=None,
+                 chunk_size=LINKS_CHUNK):
+    """
+    Build the citation graph of the links files of a parse out of core, as CSR shards saved in a folder, for the graphs
+    whose links do not fit in memory (e.g. the graph of the whole PubMed baseline).
+    The links are sorted on disk: they are read a chunk at a time and each run of links that fits in the memory budget
+    is sorted and saved, while the pmids are added to a bitmap; then the runs are merged in order of source and target.
+    The pmids are numbered from 0 to n-1 in the order of the sorted pmids, by counting the pmids of the bitmap
+    before each of them, and the merged links are cut into shards of consecutive sources that fit in the memory budget.
+    As in the CitationGraph, the self loops and the repeated links are removed. The links are selected as in
+    csv_to_dataframe: only the ones of the latest version of each article and, if the bitmap of the known pmids
+    is given, the ones to known articles (as unknown_nodes=False). All the components are kept.
+    The memory budget is approximate: it bounds the arrays of the links and of the nodes, not the memory of Python.
+
+    Parameters
+    ----------
+    csv_list : list
+        List of the csv or Parquet files created by the xml_parser function
+    path_shards : str
+        Path of the folder of the shards, created if it does not exist
+    memory : int
+        Memory budget in bytes (default: MEMORY_BUDGET, i.e. 8 GB)
+    known_pmids : numpy array
+        Bitmap of the known pmids, e.g. built with the known_pmids function (default: None, i.e. all the links)
+    dedup : bool
+        True to keep only the links of the latest version of each article (default: True)
+    report : PCNet_utils.RunReport
+        Report of the run: if given, the record of the stage is added to it (default: None)
+    chunk_size : int
+        Number of links read at a time (default: LINKS_CHUNK)
+
+    Returns
+    -------
+    G : ShardedGraph
+        Graph of the shards
+    """
+    links_files = [file for file in csv_list if os.path.basename(file).startswith('links_') and pcn.is_empty_file(file) == False]
+    if len(links_files) == 0:
+        print("Error: no links found with these settings.")
+        return None
+    if any(file.endswith('.parquet') for file in links_files) and pq is None:
+        print("Error: reading Parquet files needs the pyarrow package")
+        return None
+
+    stage = report.begin('build_shards') if report is not None else None
+    versions = None
+    if dedup == True and any(os.path.basename(file).startswith('nodes_') for file in csv_list):
+        versions = pcn.latest_versions(csv_list)
+
+    # The bitmaps and the latest versions stay in memory, the rest of the budget goes to the chunks read and to the runs
+    nodes = utils.pmid_bitmap()
+    fixed = len(nodes) + (len(known_pmids) if known_pmids is not None else 0)
+    fixed += sum(int(df.memory_usage(index=False).sum()) for df in versions.values()) if versions is not None else 0
+    chunk_size = min(chunk_size, max((memory - fixed) // 4 // READ_BYTES, 1))
+    run_links = (memory - fixed - chunk_size * READ_BYTES) // 2 // LINK_BYTES
+    if run_links <= 0:
+        print(f"Error: the memory budget must be larger than {fixed / 2**20:.0f} MB")
+        return None
+
+    # The files of a previous build are removed, the runs are saved in a temporary folder
+    os.makedirs(path_shards, exist_ok=True)
+    for file in os.listdir(path_shards):
+        if any(file.startswith(prefix) for prefix in SHARDS_PREFIXES):
+            os.remove(os.path.join(path_shards, file))
+    path_runs = os.path.join(path_shards, 'runs')
+    shutil.rmtree(path_runs, ignore_errors=True)
+    os.makedirs(path_runs)
+
+    # Sort the runs of links, as keys of source and target without the self loops and the repeated links
+    runs, buffer, buffered, rows = [], [], 0, 0
+
+    def save_run():
+        runs.append(os.path.join(path_runs, f'run_{len(runs):04d}.npy'))
+        np.save(runs[-1], np.unique(np.concatenate(buffer)))
+
+    for source, target in tqdm(iter_links(links_files, chunk_size, versions, known_pmids),
+                               desc='- Sorting the links ...'):
+        utils.add_pmids(nodes, source)
+        utils.add_pmids(nodes, target)
+        rows += len(source)
+
+        loop = source == target
+        buffer.append((source[~loop] << PMID_BITS) | target[~loop])
+        buffered += len(buffer[-1])
+        if buffered >= run_links:
+            save_run()
+            buffer, buffered = [], 0
+    if buffered > 0:
+        save_run()
+    del buffer, versions
+
+    # Number the pmids: only the bitmap up to the largest pmid is kept, with the count of the pmids before each byte
+    used = np.flatnonzero(nodes)
+    if len(used) == 0:
+        shutil.rmtree(path_runs)
+        print("Error: no links found with these settings.")
+        return None
+    nodes = nodes[:used[-1] + 1].copy()
+    del used
+    ranks = utils.bitmap_ranks(nodes)
+    n_nodes = int(ranks[-1]) + int(utils.POPCOUNT[nodes[-1]])
+    index_dtype = np.int32 if n_nodes < np.iinfo(np.int32).max else np.int64
+
+    pmids = np.lib.format.open_memmap(os.path.join(path_shards, 'pmids.npy'), mode='w+', dtype=np.int32, shape=(n_nodes,))
+    block = 2**20
+    for start in range(0, len(nodes), block):
+        found = utils.bitmap_pmids(nodes[start:start + block]) + 8 * start
+        pmids[ranks[start]:ranks[start] + len(found)] = found
+    pmids.flush()
+    del pmids
+
+    # Then the bitmaps and the latest versions are replaced by the bitmap of the nodes, their counts and their arrays
+    shard_links = (memory - len(nodes) - ranks.nbytes - n_nodes * NODE_BYTES) // 2 // LINK_BYTES
+    if shard_links <= 0:
+        shutil.rmtree(path_runs)
+        print(f"Error: the memory budget is too small for the {n_nodes} nodes of the graph")
+        return None
+
+    shards = []
+
+    def save_shard(keys, stop):
+        """
+        Save the links of the shard from the end of the previous shard to the node before stop.
+        """
+        start = shards[-1]['stop'] if len(shards) > 0 else 0
+        source = utils.rank_pmids(nodes, ranks, keys >> PMID_BITS)
+        indptr = np.zeros(stop - start + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source - start, minlength=stop - start), out=indptr[1:])
+        del source
+
+        np.save(os.path.join(path_shards, f'indptr_{len(shards):04d}.npy'), indptr)
+        np.save(os.path.join(path_shards, f'indices_{len(shards):04d}.npy'),
+                utils.rank_pmids(nodes, ranks, keys & PMID_MASK).astype(index_dtype))
+        shards.append({'start': start, 'stop': stop, 'edges': len(keys)})
+
+    # Merge the runs a block at a time: the keys up to the smallest last key of the blocks that do not end
+    # their run are all in the blocks, so they are merged and the runs move past them
+    arrays = [np.load(run, mmap_mode='r') for run in runs]
+    positions = [0] * len(arrays)
+    block = max(shard_links // len(arrays), 1)
+    pending, pending_links = [], 0
+
+    with tqdm(total=sum(len(array) for array in arrays), desc='- Merging the links ...') as progress:
+        while any(position < len(array) for position, array in zip(positions, arrays)):
+            live = [k for k in range(len(arrays)) if positions[k] < len(arrays[k])]
+            blocks = {k: arrays[k][positions[k]:positions[k] + block] for k in live}
+            bounded = [blocks[k][-1] for k in live if positions[k] + block < len(arrays[k])]
+            cutoff = min(bounded) if len(bounded) > 0 else None
+
+            taken = []
+            for k in live:
+                stop = len(blocks[k]) if cutoff is None else int(np.searchsorted(blocks[k], cutoff, side='right'))
+                taken.append(blocks[k][:stop])
+                positions[k] += stop
+            merged = np.unique(np.concatenate(taken))
+            progress.update(sum(len(keys) for keys in taken))
+            pending.append(merged)
+            pending_links += len(merged)
+
+            # The links of the last source can go on in the next blocks, so they wait for the next shard
+            if pending_links >= shard_links:
+                keys = np.concatenate(pending)
+                last = (keys[-1] >> PMID_BITS) << PMID_BITS
+                cut = int(np.searchsorted(keys, last))
+                if cut > 0:
+                    save_shard(keys[:cut], int(utils.rank_pmids(nodes, ranks, [keys[cut - 1] >> PMID_BITS])[0]) + 1)
+                    pending = [keys[cut:]]
+                    pending_links = len(pending[0])
+                else:
+                    pending = [keys]
+
+    save_shard(np.concatenate(pending) if len(pending) > 0 else np.array([], dtype=np.int64), n_nodes)
+    del arrays
+    shutil.rmtree(path_runs)
+
+    edges = sum(shard['edges'] for shard in shards)
+    with open(os.path.join(path_shards, 'graph.json'), 'w', encoding='utf-8') as file:
+        json.dump({'format': SHARDS_FORMAT, 'nodes': n_nodes, 'edges': edges, 'memory': memory, 'runs': len(runs),
+                   'shards': shards}, file, indent=1)
+
+    if report is not None:
+        stage['files'] = len(links_files)
+        stage['compressed_bytes'] = sum(os.path.getsize(file) for file in links_files)
+        stage['rows'] = rows
+        stage['nodes'] = n_nodes
+        stage['links'] = edges
+        stage['runs'] = len(runs)
+        stage['shards'] = len(shards)
+        report.end(stage)
+
+    return ShardedGraph(path_shards)
+
+def load_shards(path_shards):
+    """
+    Load the graph of a shards folder built by build_shards. The arrays are memory mapped, so the graph
+    is ready at once and its shards are read from the disk only when they are used.
+
+    Parameters
+    ----------
+    path_shards : str
+        Path of the folder of the shards
+
+    Returns
+    -------
+    G : ShardedGraph
+        Graph of the shards
+    """
+    try:
+        with open(os.path.join(path_shards, 'graph.json'), 'r', encoding='utf-8') as file:
+            info = json.load(file)
+    except FileNotFoundError:
+        print(f"Error: {path_shards} is not a shards folder")
+        return None
+    if info['format'] != SHARDS_FORMAT:
+        print(f"Error: the shards have format {info['format']}, not {SHARDS_FORMAT}")
+        return None
+
+    return ShardedGraph(path_shards)
+
+
+class ShardedGraph:
+    """
+    Directed citation graph stored on disk as CSR shards, built by build_shards. The nodes are numbered as in the
+    CitationGraph: node i is the pmid pmids[i]. The shard k holds the articles cited by the nodes from start to
+    stop-1, as the offsets of each node in indptr and the cited articles in indices, so that only one shard at a time
+    is in memory. The degrees and the labels of the components are computed shard by shard and saved in the folder,
+    so they are computed once.
+    """
+
+    def __init__(self, path_shards):
+        """
+        Parameters
+        ----------
+        path_shards : str
+            Path of the folder of the shards
+        """
+        with open(os.path.join(path_shards, 'graph.json'), 'r', encoding='utf-8') as file:
+            info = json.load(file)
+
+        self.path_shards = path_shards
+        self.shards = info['shards']
+        self.memory = info['memory']
+        self.edges_count = info['edges']
+        self.pmids = np.load(os.path.join(path_shards, 'pmids.npy'), mmap_mode='r')
+
+    def number_of_nodes(self):
+        return len(self.pmids)
+
+    def number_of_edges(self):
+        return self.edges_count
+
+    def __len__(self):
+        return self.number_of_nodes()
+
+    def shard(self, k):
+        """
+        Return the first node, the offsets and the cited articles of the shard k, memory mapped.
+        """
+        indptr = np.load(os.path.join(self.path_shards, f'indptr_{k:04d}.npy'), mmap_mode='r')
+        indices = np.load(os.path.join(self.path_shards, f'indices_{k:04d}.npy'), mmap_mode='r')
+        return self.shards[k]['start'], indptr, indices
+
+    def saved(self, name, compute):
+        """
+        Return the array saved in the folder with the name, computed and saved the first time.
+        """
+        path = os.path.join(self.path_shards, name + '.npy')
+        if not os.path.exists(path):
+            np.save(path, compute())
+        return np.load(path, mmap_mode='r')
+
+    def out_degree(self):
+        """
+        Return the number of articles cited by each node, in the order of pmids.
+        """
+        return self.saved('out_degree', lambda: np.concatenate([np.diff(self.shard(k)[1]).astype(np.int32)
+                                                                for k in range(len(self.shards))]))
+
+    def in_degree(self):
+        """
+        Return the number of articles citing each node, in the order of pmids.
+        """
+        def compute():
+            degree = np.zeros(self.number_of_nodes(), dtype=np.int64)
+            for k in tqdm(range(len(self.shards)), desc='- Counting the citations ...'):
+                degree += np.bincount(self.shard(k)[2], minlength=self.number_of_nodes())
+            return degree.astype(np.int32)
+
+        return self.saved('in_degree', compute)
+
+    def component_labels(self):
+        """
+        Return the label of the weakly connected component of each node, i.e. the smallest node of its component,
+        in the order of pmids. The links of each shard are added to the components of the previous shards.
+        """
+        def compute():
+            labels = None
+            for k in tqdm(range(len(self.shards)), desc='- Labelling the components ...'):
+                start, indptr, indices = self.shard(k)
+                source = np.repeat(np.arange(start, start + len(indptr) - 1), np.diff(indptr))
+                labels = pcg.weakly_connected_labels(self.number_of_nodes(), source, np.asarray(indices), parent=labels)
+            return labels.astype(np.int32 if self.number_of_nodes() < np.iinfo(np.int32).max else np.int64)
+
+        return self.saved('labels', compute)
+
+    def largest_component(self):
+        """
+        Return the pmids of the nodes of the largest weakly connected component.
+        Ties go to the component with the smallest pmid.
+        """
+        labels = np.asarray(self.component_labels())
+        return np.asarray(self.pmids[labels == np.bincount(labels).argmax()])
+
+    def to_citation_graph(self, nodes=None, reverse=True):
+        """
+        Load all the shards in a CitationGraph, e.g. to export the graph when it fits in memory.
+
+        Parameters
+        ----------
+        nodes : pandas dataframe
+            Dataframe with the attributes of the nodes, one row per pmid (default: None)
+        reverse : boolean
+            If True, the reverse CSR of the citing articles is built (default: True)
+
+        Returns
+        -------
+        G : CitationGraph
+            Graph of the shards
+        """
+        indptr = [np.zeros(1, dtype=np.int64)]
+        indices = []
+        for k in range(len(self.shards)):
+            start, shard_indptr, shard_indices = self.shard(k)
+            indptr.append(np.asarray(shard_indptr[1:]) + indptr[-1][-1])
+            indices.append(np.asarray(shard_indices))
+
+        if nodes is not None:
+            nodes = nodes[nodes['pmid'].isin(self.pmids)]
+            nodes = nodes.drop_duplicates(subset='pmid', keep='last').sort_values('pmid').reset_index(drop=True)
+
+        return pcg.CitationGraph(np.asarray(self.pmids), np.concatenate(indptr), np.concatenate(indices),
+                                 nodes=nodes, reverse=reverse)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import random
+from gzip import GzipFile
+from tqdm import tqdm
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+# Version of the generator, changed when the same settings give different files
+GENERATOR_VERSION = 2
+
+# First pmid of the synthetic articles: the references to older pmids point outside the generated files
+FIRST_PMID = 10000000
+
+# MeSH descriptors of the synthetic articles, from the most to the least frequent
+MESH = [('D006801', 'Humans'), ('D008297', 'Male'), ('D005260', 'Female'), ('D000328', 'Adult'),
+        ('D008875', 'Middle Aged'), ('D000368', 'Aged'), ('D009369', 'Neoplasms'), ('D004724', 'Endoscopy'),
+        ('D013274', 'Stomach Neoplasms'), ('D015331', 'Cohort Studies'), ('D012189', 'Retrospective Studies'),
+        ('D011446', 'Prospective Studies'), ('D016896', 'Treatment Outcome'), ('D000086382', 'COVID-19'),
+        ('D003920', 'Diabetes Mellitus'), ('D006973', 'Hypertension'), ('D001943', 'Breast Neoplasms'),
+        ('D008175', 'Lung Neoplasms'), ('D002318', 'Cardiovascular Diseases'), ('D000544', 'Alzheimer Disease'),
+        ('D010300', 'Parkinson Disease'), ('D003863', 'Depression'), ('D001007', 'Anxiety'),
+        ('D009765', 'Obesity'), ('D007239', 'Infections'), ('D014777', 'Virus Diseases'),
+        ('D000069916', 'Endoscopic Mucosal Resection'), ('D005764', 'Gastroesophageal Reflux'),
+        ('D016138', 'Walking'), ('D000072283', 'Machine Learning')]
+
+JOURNALS = ['Clinical endoscopy', 'Nature', 'Science', 'The Lancet', 'PloS one', 'Scientific reports',
+            'BMJ open', 'Cell', 'The New England journal of medicine', 'Journal of clinical oncology',
+            'Gut', 'Gastroenterology', 'Endoscopy', 'Annals of internal medicine', 'Cancers',
+            'Frontiers in oncology', 'Journal of biological chemistry', 'Bioinformatics', 'Medicine',
+            'Journal of Science &amp; Medicine']
+
+WORDS = ['analysis', 'patients', 'treatment', 'clinical', 'study', 'outcome', 'risk', 'disease', 'cell',
+         'expression', 'gene', 'protein', 'response', 'therapy', 'association', 'cohort', 'effect',
+         'model', 'trial', 'data', 'endoscopic', 'surgical', 'resection', 'gastric', 'cancer', 'tumor',
+         'survival', 'mortality', 'infection', 'immune', 'molecular', 'network', 'learning', 'signal',
+         'pathway', 'inflammation', 'diagnosis', 'imaging', 'screening', 'population', 'children',
+         'adults', 'women', 'men', 'chronic', 'acute', 'novel', 'randomized', 'systematic', 'review']
+
+FORENAMES = ['Alessandro', 'Maria', 'John', 'Wei', 'Yuki', 'Seung Woo', 'Anna', 'Muhammad', 'Christopher C',
+             'Elena', 'David', 'Sofia', 'Luca', 'Hiroshi', 'Fatima', 'James', 'Olga', 'Carlos', 'Mei', 'Peter']
+
+LASTNAMES = ['Lapi', 'Rossi', 'Smith', 'Wang', 'Tanaka', 'Lee', 'Kim', 'Haseeb', 'Thompson', 'Garcia',
+             'Muller', 'Ivanova', 'Chen', 'Bianchi', 'Sato', 'Khan', 'Brown', 'Silva', 'Nguyen', 'Novak']
+
+
+def zipf_weights(n, skew):
+    """
+    Return the cumulative weights of a Zipf distribution over n items: the item k has weight 1/(k+1)^skew.
+    """
+    cumulative, total = [], 0.0
+    for k in range(n):
+        total += 1.0 / (k + 1) ** skew
+        cumulative.append(total)
+    return cumulative
+
+def format_date(tag, year, month, day, attribute=''):
+    """
+    Return a date element of the xml (e.g. PubMedPubDate, DateRevised, ArticleDate).
+    """
+    return (f'<{tag}{attribute}><Year>{year}</Year><Month>{month:02d}</Month><Day>{day:02d}</Day></{tag}>')
+
+def generate_article(pmid, rng, references, mesh, mesh_cumulative, mesh_per_article=3):
+    """
+    Return the xml of a synthetic PubmedArticle, with the same elements read by the parser.
+
+    Parameters
+    ----------
+    pmid : int
+        pmid of the article
+    rng : random.Random
+        Random generator
+    references : list
+        pmids of the references of the article
+    mesh : list
+        MeSH of the articles, as (unique identifier, name) pairs
+    mesh_cumulative : list
+        Cumulative weights of the MeSH (see zipf_weights)
+    mesh_per_article : int
+        Average number of MeSH of an article (default: 3)
+
+    Returns
+    -------
+    article : str
+        Xml of the article
+    """
+    year, month, day = rng.randint(1990, 2023), rng.randint(1, 12), rng.randint(1, 28)
+    title = ' '.join(rng.choices(WORDS, k=rng.randint(6, 15))).capitalize() + '.'
+    # The abstracts are indented as in the baseline, whose Abstract elements start with a newline
+    abstract = ''.join(f'\n          <AbstractText>{" ".join(rng.choices(WORDS, k=rng.randint(20, 60))).capitalize()}.</AbstractText>'
+                       for _ in range(rng.randint(0, 3)))
+    authors = ''.join(f'<Author ValidYN="Y"><LastName>{rng.choice(LASTNAMES)}</LastName>'
+                      f'<ForeName>{rng.choice(FORENAMES)}</ForeName></Author>'
+                      for _ in range(rng.randint(0, 8)))
+    keywords = ''.join(f'<Keyword MajorTopicYN="N">{" ".join(rng.choices(WORDS, k=rng.randint(1, 3)))}</Keyword>'
+                       for _ in range(rng.randint(0, 5)))
+    descriptors = dict.fromkeys(rng.choices(range(len(mesh)), cum_weights=mesh_cumulative,
+                                            k=rng.randint(0, 2 * mesh_per_article)))
+    headings = ''.join(f'<MeshHeading><DescriptorName UI="{mesh[k][0]}" MajorTopicYN="N">{mesh[k][1]}</DescriptorName></MeshHeading>'
+                       for k in descriptors)
+    reference_list = ''.join(f'<Reference><Citation>Reference {ref}.</Citation><ArticleIdList>'
+                             f'<ArticleId IdType="pubmed">{ref}</ArticleId></ArticleIdList></Reference>'
+                             for ref in references)
+
+    return ('<PubmedArticle><MedlineCitation Status="MEDLINE" Owner="NLM">'
+            f'<PMID Version="1">{pmid}</PMID>'
+            + format_date('DateRevised', min(year + 1, 2023), month, day) +
+            '<Article PubModel="Print-Electronic"><Journal><JournalIssue CitedMedium="Internet">'
+            f'<PubDate><Year>{year}</Year></PubDate></JournalIssue><Title>{rng.choice(JOURNALS)}</Title></Journal>'
+            f'<ArticleTitle>{title}</ArticleTitle>'
+            + (f'<Abstract>{abstract}\n        </Abstract>' if abstract != '' else '')
+            + (f'<AuthorList CompleteYN="Y">{authors}</AuthorList>' if authors != '' else '')
+            + '<Language>eng</Language>'
+            + (format_date('ArticleDate', year, month, day, ' DateType="Electronic"') if rng.random() < 0.7 else '') +
+            '</Article>'
+            + (f'<MeshHeadingList>{headings}</MeshHeadingList>' if headings != '' else '')
+            + (f'<KeywordList Owner="NOTNLM">{keywords}</KeywordList>' if keywords != '' else '') +
+            '</MedlineCitation><PubmedData><History>'
+            + format_date('PubMedPubDate', year, month, day, ' PubStatus="accepted"') +
+            '</History><PublicationStatus>ppublish</PublicationStatus><ArticleIdList>'
+            f'<ArticleId IdType="pubmed">{pmid}</ArticleId><ArticleId IdType="doi">10.0000/synthetic.{pmid}</ArticleId>'
+            '</ArticleIdList>'
+            + (f'<ReferenceList>{reference_list}</ReferenceList>' if reference_list != '' else '') +
+            '</PubmedData></PubmedArticle>\n')
+
+def generate_baseline(path_xml, n_articles, articles_per_file=30000, references=20, external_references=0.3,
+                      mesh=MESH, mesh_skew=1.0, mesh_per_article=3, seed=0, compresslevel=6, prefix='pubmed00n'):
+    """
+    Write synthetic xml.gz files with the structure of the PubMed baseline, to test and benchmark the parse
+    and the graph at any size. The articles have consecutive pmids from FIRST_PMID and they cite older
+    articles: a fraction of the references points to pmids before FIRST_PMID, i.e. articles not in the files.
+    The number of references of an article is uniform between 0 and twice the average, the MeSH follow
+    a Zipf distribution with the given skew.
+
+    Parameters
+    ----------
+    path_xml : str
+        Path where the xml.gz files are saved
+    n_articles : int
+        Number of articles
+    articles_per_file : int
+        Number of articles of each file, as in the baseline (default: 30000)
+    references : int
+        Average number of references of an article (default: 20)
+    external_references : float
+        Fraction of the references to articles not in the files (default: 0.3)
+    mesh : list
+        MeSH of the articles, as (unique identifier, name) pairs from the most frequent (default: MESH)
+    mesh_skew : float
+        Exponent of the Zipf distribution of the MeSH, 0 for uniform (default: 1.0)
+    mesh_per_article : int
+        Average number of MeSH of an article (default: 3)
+    seed : int
+        Seed of the random generator, the same seed gives the same files (default: 0)
+    compresslevel : int
+        Compression level of the gzip files (default: 6)
+    prefix : str
+        Prefix of the names of the files, followed by the number of the file (default: 'pubmed00n')
+
+    Returns
+    -------
+    files : list
+        Names of the xml.gz files created
+    """
+    rng = random.Random(seed)
+    mesh_cumulative = zipf_weights(len(mesh), mesh_skew)
+    os.makedirs(path_xml, exist_ok=True)
+
+    files = []
+    n_files = (n_articles + articles_per_file - 1) // articles_per_file
+
+    for k in tqdm(range(n_files), desc='- Generating xml files ...'):
+        file = f'{prefix}{k + 1:04d}.xml.gz'
+        start = k * articles_per_file
+
+        with GzipFile(path_xml + file, 'w', compresslevel=compresslevel) as xml_file:
+            xml_file.write(b'<?xml version="1.0" encoding="utf-8"?>\n<PubmedArticleSet>\n')
+
+            for i in range(start, min(start + articles_per_file, n_articles)):
+                pmid = FIRST_PMID + i
+                cited = []
+                for _ in range(rng.randint(0, 2 * references)):
+                    if i == 0 or rng.random() < external_references:
+                        cited.append(rng.randrange(100000, FIRST_PMID))
+                    else:
+                        cited.append(FIRST_PMID + rng.randrange(i))
+
+                xml_file.write(generate_article(pmid, rng, cited, mesh, mesh_cumulative, mesh_per_article).encode('utf-8'))
+
+            xml_file.write(b'</PubmedArticleSet>\n')
+        files.append(file)
+
+    return files
@@ -1,12 +1,23 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import json
 from datetime import datetime
 import csv
+import time
+from contextlib import contextmanager
+import numpy as np
 
 __author__ = "Alessandro Lapi"
 __email__ = "alessandro.lapi@studio.unibo.it"
 
+# The pmids are at most 1e8 (see PCNet_parser.get_pmid), so a bitmap of all the pmids, up to MAX_PMID included,
+# takes 12.5 MB
+MAX_PMID = 100000000
+
+# Number of bits set in each byte, to count the pmids of a bitmap
+POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
 
 def validate_date(date_string):
     """
@@ -31,7 +42,9 @@ def validate_date(date_string):
     
 def is_empty_csv(csv_file):
     """
-    Check if a csv file is empty
+    Check if a csv file is empty.
+    The size of the file is enough for the files of the parse, which are empty or have a row per line:
+    only the small files are read, to find files made of empty lines.
     
     Parameters
     ----------
@@ -43,6 +56,11 @@ def is_empty_csv(csv_file):
     boolean
         True if the csv is empty, False otherwise
     """
+    size = os.stat(csv_file).st_size
+    if size == 0:
+        return True
+    if size > 4096:
+        return False
  
     with open(csv_file, 'r', encoding='utf-8') as file:
         csv_reader = csv.reader(file)
@@ -51,3 +69,312 @@ def is_empty_csv(csv_file):
                 return False
     return True
 
+
+
+def file_signature(path_file):
+    """
+    Return the signature of a file, used to check if it changed since the last time it was parsed.
+    If the file has a .md5 sidecar file, as the ones of the PubMed baseline, the signature is its MD5,
+    otherwise it is made of the size and the time of the last modification of the file.
+
+    Parameters
+    ----------
+    path_file : str
+        Path of the file
+
+    Returns
+    -------
+    signature : dict
+        Signature of the file
+    """
+    path_md5 = path_file + '.md5'
+
+    if os.path.exists(path_md5):
+        # The content of the sidecar is like: MD5(pubmed23n0001.xml.gz)= 7b3c1a...
+        with open(path_md5, 'r', encoding='utf-8') as file:
+            md5 = file.read().strip().split('=')[-1].strip()
+        return {'md5': md5}
+
+    stat = os.stat(path_file)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+def read_manifest(path_manifest):
+    """
+    Read the manifest of a parse, i.e. the json file with the entries of the parsed files.
+
+    Parameters
+    ----------
+    path_manifest : str
+        Path of the manifest
+
+    Returns
+    -------
+    manifest : dict
+        Dictionary with the name of each parsed file as key and its entry as value.
+        It is empty if the manifest does not exist or it cannot be read.
+    """
+    try:
+        with open(path_manifest, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def write_manifest(path_manifest, manifest):
+    """
+    Write the manifest of a parse. The file is replaced at once, so that an interrupted
+    write never leaves a broken manifest.
+
+    Parameters
+    ----------
+    path_manifest : str
+        Path of the manifest
+    manifest : dict
+        Dictionary with the name of each parsed file as key and its entry as value
+    """
+    with open(path_manifest + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(path_manifest + '.tmp', path_manifest)
+
+def source_name(csv_file):
+    """
+    Return the name of the xml file from which a csv file of the parse was created,
+    e.g. 'pubmed23n0001' for 'nodes_pubmed23n0001.csv'.
+
+    Parameters
+    ----------
+    csv_file : str
+        Path of the csv file
+
+    Returns
+    -------
+    name : str
+        Name of the xml file, without extension
+    """
+    return os.path.basename(csv_file).split('.')[0].split('_', 1)[1]
+
+def pmid_bitmap(pmids=(), max_pmid=MAX_PMID):
+    """
+    Create a bitmap of pmids: the bit of each pmid is set if the pmid is in the set.
+
+    Parameters
+    ----------
+    pmids : array-like
+        Pmids to add to the bitmap (default: none)
+    max_pmid : int
+        Largest pmid of the bitmap, included (default: MAX_PMID)
+
+    Returns
+    -------
+    bitmap : numpy array
+        Bitmap of the pmids, as an array of bytes
+    """
+    bitmap = np.zeros(max_pmid // 8 + 1, dtype=np.uint8)
+    add_pmids(bitmap, pmids)
+
+    return bitmap
+
+def add_pmids(bitmap, pmids):
+    """
+    Set the bits of the pmids in the bitmap, in place. The pmids out of the bitmap are ignored.
+    The repeated pmids set the same bit again, which is cheaper than removing them first.
+    """
+    pmids = np.asarray(pmids, dtype=np.int64)
+    pmids = pmids[(pmids >= 0) & (pmids < len(bitmap) * 8)]
+    np.bitwise_or.at(bitmap, pmids >> 3, (1 << (pmids & 7)).astype(np.uint8))
+
+def remove_pmids(bitmap, pmids):
+    """
+    Clear the bits of the pmids in the bitmap, in place. The pmids out of the bitmap are ignored.
+    """
+    pmids = np.asarray(pmids, dtype=np.int64)
+    pmids = pmids[(pmids >= 0) & (pmids < len(bitmap) * 8)]
+    np.bitwise_and.at(bitmap, pmids >> 3, ~(1 << (pmids & 7)).astype(np.uint8))
+
+def in_bitmap(bitmap, pmids):
+    """
+    Check which pmids are in the bitmap.
+
+    Parameters
+    ----------
+    bitmap : numpy array
+        Bitmap of the pmids, created by the pmid_bitmap function
+    pmids : array-like
+        Pmids to check
+
+    Returns
+    -------
+    found : numpy array
+        Boolean array, True for the pmids in the bitmap
+    """
+    pmids = np.asarray(pmids, dtype=np.int64)
+    inside = (pmids >= 0) & (pmids < len(bitmap) * 8)
+
+    found = np.zeros(pmids.shape, dtype=bool)
+    found[inside] = (bitmap[pmids[inside] >> 3] >> (pmids[inside] & 7)) & 1 == 1
+
+    return found
+
+def bitmap_ranks(bitmap):
+    """
+    Count the pmids of the bitmap before each of its bytes, so that rank_pmids finds the position of a pmid
+    among the sorted pmids of the bitmap without storing them.
+
+    Parameters
+    ----------
+    bitmap : numpy array
+        Bitmap of the pmids, created by the pmid_bitmap function
+
+    Returns
+    -------
+    ranks : numpy array
+        Number of pmids of the bitmap before each byte
+    """
+    ranks = np.zeros(len(bitmap), dtype=np.int64 if len(bitmap) * 8 > np.iinfo(np.int32).max else np.int32)
+    np.cumsum(POPCOUNT[bitmap[:-1]], out=ranks[1:])
+    return ranks
+
+def rank_pmids(bitmap, ranks, pmids):
+    """
+    Return the positions of the pmids among the sorted pmids of the bitmap, i.e. the number of pmids of the bitmap
+    smaller than each of them: the pmids of the bitmap are numbered from 0 to n-1 in constant time per pmid.
+
+    Parameters
+    ----------
+    bitmap : numpy array
+        Bitmap of the pmids, created by the pmid_bitmap function
+    ranks : numpy array
+        Number of pmids of the bitmap before each byte, returned by bitmap_ranks
+    pmids : array-like
+        Pmids of the bitmap to number
+
+    Returns
+    -------
+    positions : numpy array
+        Positions of the pmids among the sorted pmids of the bitmap
+    """
+    pmids = np.asarray(pmids, dtype=np.int64)
+    byte = pmids >> 3
+    below = bitmap[byte] & ((1 << (pmids & 7)) - 1).astype(np.uint8)
+    return ranks[byte] + POPCOUNT[below]
+
+def bitmap_pmids(bitmap):
+    """
+    Return the sorted pmids of the bitmap.
+    """
+    return np.flatnonzero(np.unpackbits(bitmap, bitorder='little'))
+
+def has_pmid(bitmap, pmid):
+    """
+    Check if a single pmid is in the bitmap. The bitmap can also be given as bytes, which are faster to index.
+    """
+    return 0 <= pmid < len(bitmap) * 8 and (bitmap[pmid >> 3] >> (pmid & 7)) & 1 == 1
+
+def reset_peak_memory():
+    """
+    Reset the peak of the resident memory of the process, so that peak_memory measures from now on.
+    It works only on Linux, where the peak is cleared by writing in /proc/self/clear_refs.
+
+    Returns
+    -------
+    boolean
+        True if the peak was reset, False otherwise
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_memory():
+    """
+    Return the peak of the resident memory of the process in bytes, since the start or the last reset_peak_memory.
+    It is read from /proc/self/status on Linux; elsewhere the peak since the start is given by the resource module.
+
+    Returns
+    -------
+    peak : int
+        Peak of the resident memory in bytes
+    """
+    try:
+        with open('/proc/self/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    import resource
+    import sys
+
+    # The maximum resident size is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+# Counters of the records of a report whose rate per second is added to the record
+RATES = ['articles', 'compressed_bytes', 'uncompressed_bytes', 'rows', 'links', 'nodes']
+
+class RunReport:
+    """
+    Report of a run of the pipeline, with the wall time, the throughput and the peak memory of each stage
+    and of each parsed xml file. The instrumentation is opt-in: a RunReport is passed as the report parameter
+    of xml_parser, csv_to_dataframe and df_to_graph, which add their records to it, and then saved as json.
+    """
+
+    def __init__(self):
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.stages = []
+        self.files = []
+
+    def begin(self, name):
+        """
+        Start the record of a stage: its peak memory is measured from now on.
+        """
+        reset_peak_memory()
+        return {'stage': name, 'start': time.perf_counter()}
+
+    def end(self, record):
+        """
+        Close the record of a stage, started by the begin method, and add it to the report.
+        The counters of the stage (e.g. articles, rows) can be added to the record before.
+        """
+        record['seconds'] = time.perf_counter() - record.pop('start')
+        record['peak_rss_mb'] = peak_memory() / 2**20
+        self.stages.append(add_rates(record))
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Record the block of code as a stage, e.g. with report.stage('write_gexf') as record: ...
+        """
+        record = self.begin(name)
+        yield record
+        self.end(record)
+
+    def add_file(self, record):
+        """
+        Add the record of a parsed xml file, returned by parse_xml_file with report=True.
+        """
+        self.files.append(add_rates(record))
+
+    def to_dict(self):
+        return {'started': self.started, 'seconds': time.perf_counter() - self.start,
+                'stages': self.stages, 'files': self.files}
+
+    def save(self, path_report):
+        """
+        Save the report in a json file.
+        """
+        with open(path_report, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+def add_rates(record):
+    """
+    Add to a record of a report the rate per second of each of its counters.
+    """
+    for counter in RATES:
+        if counter in record:
+            record[counter + '_per_second'] = record[counter] / record['seconds'] if record['seconds'] > 0 else 0.0
+    return record
@@ -1,2 +1,2 @@
-__all__ = ['PCNet_network', 'PCNet_parser']
+__all__ = ['PCNet_network', 'PCNet_parser', 'PCNet_index', 'PCNet_graph', 'PCNet_export', 'PCNet_shards', 'PCNet_synthetic']
 
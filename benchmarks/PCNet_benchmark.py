@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import json
+import time
+import argparse
+import filecmp
+import numpy as np
+import networkx as nx
+from PCNet import PCNet_parser as pp
+from PCNet import PCNet_network as pcn
+from PCNet import PCNet_synthetic as ps
+from PCNet import PCNet_utils as utils
+from PCNet import PCNet_export as pce
+from PCNet import PCNet_shards as pcs
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+# Stages of the pipeline timed by the benchmark, in order
+STAGES = ['xml_parser', 'parse_stdlib', 'parse_lxml', 'csv_to_dataframe', 'df_to_graph', 'connect_graph', 'add_attributes',
+          'write_gexf', 'export_gexf', 'build_shards']
+
+
+def measure(results, stage, size, items, unit, function, *args, **kwargs):
+    """
+    Run a stage of the pipeline and record its time, throughput and peak memory.
+    """
+    utils.reset_peak_memory()
+    start = time.perf_counter()
+    output = function(*args, **kwargs)
+    seconds = time.perf_counter() - start
+    peak = utils.peak_memory()
+
+    if callable(items):
+        items = items(output)
+
+    results.append({'stage': stage, 'articles': size, 'seconds': seconds, 'items': items, 'unit': unit,
+                    'throughput': items / seconds if seconds > 0 else float('inf'), 'peak_rss_mb': peak / 2**20})
+    print(f"{stage:<18}{size:>10}{seconds:>10.2f} s{items / max(seconds, 1e-9):>14.0f} {unit}/s{peak / 2**20:>10.0f} MB")
+
+    return output
+
+def prepare(path, size, seed):
+    """
+    Generate the synthetic xml files of the size, unless they are already in the folder from the same version of the generator.
+    """
+    path_xml = path + f'xml_{size}/'
+    stamp = path_xml + 'synthetic.json'
+    settings = {'articles': size, 'seed': seed, 'version': ps.GENERATOR_VERSION}
+
+    generated = None
+    if os.path.exists(stamp):
+        with open(stamp, 'r') as file:
+            generated = json.load(file)
+
+    if generated != settings:
+        for file in os.listdir(path_xml) if os.path.exists(path_xml) else []:
+            os.remove(path_xml + file)
+        ps.generate_baseline(path_xml, size, seed=seed)
+        with open(stamp, 'w') as file:
+            json.dump(settings, file)
+
+    return path_xml
+
+def compare_backends(results, path, path_xml, size, stages, workers):
+    """
+    Time the parse with each backend of the xml files and check that their csv files are the same.
+    """
+    backends = [stage.split('_')[1] for stage in stages if stage in ['parse_stdlib', 'parse_lxml']]
+    if 'lxml' in backends and pp.lxml_etree is None:
+        print("parse_lxml skipped: the lxml package is not installed")
+        backends.remove('lxml')
+
+    csv_lists = {}
+    for backend in backends:
+        path_csv = path + f'csv_{size}_{backend}/'
+        os.makedirs(path_csv, exist_ok=True)
+        csv_lists[backend] = measure(results, 'parse_' + backend, size, size, 'articles', pp.xml_parser, path_xml, path_csv,
+                                     workers=workers, resume=False, backend=backend)
+
+    if len(csv_lists) == 2:
+        identical = all(filecmp.cmp(stdlib, lxml, shallow=False) for stdlib, lxml in zip(csv_lists['stdlib'], csv_lists['lxml']))
+        results[-1]['identical'] = identical
+        print(f"{'':<18}csv files of the backends {'identical' if identical else 'DIFFERENT'}")
+
+def shards_stages(results, path, csv_list, size, memory):
+    """
+    Build the graph out of core within the memory budget and compute its degrees and its components,
+    checking that the links are the ones of the CitationGraph.
+    """
+    G = measure(results, 'build_shards', size, lambda G: G.number_of_edges(), 'links', pcs.build_shards, csv_list,
+                path + f'shards_{size}/', memory=memory)
+    if G is None:
+        return
+    measure(results, 'shard_degrees', size, G.number_of_nodes(), 'nodes', lambda: (G.out_degree(), G.in_degree()))
+    measure(results, 'shard_components', size, G.number_of_nodes(), 'nodes', G.component_labels)
+
+    csr = pcn.df_to_graph(pcn.csv_to_dataframe(csv_list, type_of_df='links'), None, connected_graph=False,
+                          unknown_nodes=True, backend='csr')
+    edges, csr_edges = G.to_citation_graph(reverse=False).edges(), csr.edges()
+    identical = all(np.array_equal(edges[column], csr_edges[column]) for column in ['source', 'target'])
+    results[-1]['identical'] = identical
+    print(f"{'':<18}links of the shards {'identical' if identical else 'DIFFERENT'} to the CitationGraph")
+
+def run(path, size, stages, workers, seed, pipeline=False, backend='auto', memory=pcs.MEMORY_BUDGET):
+    """
+    Run the stages of the pipeline on the synthetic files of the size and return the results.
+    """
+    results = []
+    path_xml = prepare(path, size, seed)
+    path_csv = path + f'csv_{size}/'
+    os.makedirs(path_csv, exist_ok=True)
+
+    xml_bytes = sum(os.path.getsize(path_xml + file) for file in os.listdir(path_xml) if file.endswith('.gz'))
+
+    if 'xml_parser' in stages:
+        csv_list = measure(results, 'xml_parser', size, size, 'articles', pp.xml_parser, path_xml, path_csv,
+                           workers=workers, resume=False, pipeline=pipeline, backend=backend)
+        results[-1]['mb_per_second'] = xml_bytes / 2**20 / results[-1]['seconds']
+    else:
+        csv_list = pp.xml_parser(path_xml, path_csv, workers=workers, backend=backend)
+
+    compare_backends(results, path, path_xml, size, stages, workers)
+
+    df_links = measure(results, 'csv_to_dataframe', size, len, 'links', pcn.csv_to_dataframe, csv_list, type_of_df='links')
+    df_nodes = measure(results, 'csv_to_dataframe', size, len, 'nodes', pcn.csv_to_dataframe, csv_list, type_of_df='nodes')
+
+    if 'df_to_graph' in stages:
+        graph = measure(results, 'df_to_graph', size, len(df_links), 'links', pcn.df_to_graph, df_links, df_nodes)
+    else:
+        graph = pcn.df_to_graph(df_links, df_nodes)
+
+    if 'connect_graph' in stages or 'add_attributes' in stages:
+        G = nx.from_pandas_edgelist(df_links, source='source', target='target', create_using=nx.DiGraph())
+        if 'connect_graph' in stages:
+            measure(results, 'connect_graph', size, G.number_of_edges(), 'links', pcn.connect_graph, G)
+        if 'add_attributes' in stages:
+            measure(results, 'add_attributes', size, len(df_nodes), 'nodes', pcn.add_attributes, G, df_nodes)
+        del G
+
+    if 'write_gexf' in stages:
+        measure(results, 'write_gexf', size, graph.number_of_nodes(), 'nodes', nx.write_gexf, graph, path + f'graph_{size}.gexf')
+
+    if 'export_gexf' in stages:
+        csr = pcn.df_to_graph(df_links, df_nodes, backend='csr')
+        measure(results, 'export_gexf', size, csr.number_of_nodes(), 'nodes', pce.export_graph, csr, path + f'graph_{size}_csr')
+
+    if 'build_shards' in stages:
+        del df_links, df_nodes, graph
+        shards_stages(results, path, csv_list, size, memory)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the stages of PCNet on synthetic PubMed files.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000], help='Numbers of articles')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES, help='Stages to time')
+    parser.add_argument('--workers', type=int, default=1, help='Processes of the xml_parser')
+    parser.add_argument('--path', type=str, default='../data/benchmark/', help='Folder of the synthetic files')
+    parser.add_argument('--pipeline', action='store_true', help='Decompress and write in threads while parsing')
+    parser.add_argument('--backend', type=str, default='auto', choices=pp.BACKENDS, help='Parser of the xml files of the xml_parser stage')
+    parser.add_argument('--memory', type=int, default=pcs.MEMORY_BUDGET // 2**20, help='Memory budget of the build_shards stage in MB')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic files')
+    parser.add_argument('--output', type=str, default='', help='Json file where the results are saved')
+    args = parser.parse_args()
+
+    if not args.path.endswith('/'):
+        args.path += '/'
+    os.makedirs(args.path, exist_ok=True)
+
+    print(f"{'stage':<18}{'articles':>10}{'time':>12}{'throughput':>21}{'peak':>13}")
+    results = []
+    for size in args.sizes:
+        results += run(args.path, size, args.stages, args.workers, args.seed, args.pipeline, args.backend, args.memory * 2**20)
+
+    if args.output != '':
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=1)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import time
+import argparse
+from gzip import GzipFile
+from PCNet import PCNet_parser as pp
+
+__author__ = "Alessandro Lapi"
+__email__ = "alessandro.lapi@studio.unibo.it"
+
+
+def sanitize_replace(text):
+    """
+    Previous version of sanitize_text, with a replace for each substitution, kept as the reference of the benchmark.
+    """
+    text = text.replace('[','')
+    text = text.replace(']','')
+    text = text.replace('\n',' ')
+    text = text.replace('\t',' ')
+    text = text.replace('  ',' ')
+    text = text.replace('&lt;b&gt;',' ')
+    text = text.replace('&lt;/b&gt;',' ')
+    text = text.replace('&lt;br&gt;',' ')
+    text = text.replace('&lt;sup&gt;',' ')
+    text = text.replace('&quot;',' ')
+    text = text.replace('&lt;/sup&gt;',' ')
+    text = text.replace('&lt;/br&gt;&lt;/br&gt;',' ')
+    return text
+
+def read_texts(path_xml, max_articles):
+    """
+    Return the raw text of the informations of the articles of the xml files, before the sanitization.
+    """
+    fields = [info for info in pp.INFORMATIONS if info != 'date']
+    texts = {field: [] for field in fields}
+    articles = 0
+
+    for file in sorted(file for file in os.listdir(path_xml) if file.endswith('.gz')):
+        with GzipFile(path_xml + file, 'r') as xml_file:
+            for node in pp.iter_articles(xml_file):
+                values = pp.extract_fields(node, fields, sanitize=False)
+                for field in fields:
+                    texts[field].append(values[field])
+                articles += 1
+                if articles >= max_articles:
+                    return texts
+    return texts
+
+def measure(function, texts, seconds):
+    """
+    Return the best time of the function over all the texts, repeated for at least the given seconds.
+    """
+    best, total = float('inf'), 0.0
+    while total < seconds:
+        start = time.perf_counter()
+        for text in texts:
+            function(text)
+        elapsed = time.perf_counter() - start
+        best, total = min(best, elapsed), total + elapsed
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time sanitize_text against the previous version on the text of PubMed articles.')
+    parser.add_argument('--path', type=str, default='../data/pubmed/', help='Folder of the xml.gz files')
+    parser.add_argument('--articles', type=int, default=100000, help='Maximum number of articles read')
+    parser.add_argument('--seconds', type=float, default=1.0, help='Minimum time of each measure')
+    args = parser.parse_args()
+
+    if not args.path.endswith('/'):
+        args.path += '/'
+    texts = read_texts(args.path, args.articles)
+
+    print(f"{'field':<12}{'texts':>10}{'MB':>8}{'replace':>16}{'sanitize_text':>16}{'speedup':>10}")
+    for field, values in texts.items():
+        size = sum(len(text) for text in values) / 2**20
+        old = measure(sanitize_replace, values, args.seconds)
+        new = measure(pp.sanitize_text, values, args.seconds)
+        per_text = 1e6 / max(len(values), 1)
+        print(f"{field:<12}{len(values):>10}{size:>8.2f}{old * per_text:>9.2f} us/text{new * per_text:>8.2f} us/text{old / new:>9.1f}x")
@@ -5,7 +5,9 @@ import argparse
 import configparser
 from PCNet import PCNet_parser as pp
 from PCNet import PCNet_network as pcn
-import networkx as nx
+from PCNet import PCNet_utils as utils
+from PCNet import PCNet_export as pce
+from PCNet import PCNet_shards as pcs
 
 __author__ = "Alessandro Lapi"
 __email__ = "alessandro.lapi@studio.unibo.it"
@@ -49,20 +51,71 @@ term_mesh = config.get('mesh settings', 'term_mesh')
 
 info = list(config.get('informations settings', 'info').split(', '))
 
-connected = config.getboolean('graph settings', 'connected')
-keep_unknown_nodes = config.getboolean('graph settings', 'keep_unknown_nodes')
+workers = config.getint('parser settings', 'workers')
+output_format = config.get('parser settings', 'output_format')
+pipeline = config.getboolean('parser settings', 'pipeline')
+backend = config.get('parser settings', 'backend')
+resume = config.getboolean('parser settings', 'resume')
 
-# PARSE
-csv_list = pp.xml_parser(path_xml=pubmed_path, path_csv=csv_path, MeSH=mesh, informations=info)
+# The journals are one per line, since their names can contain commas
+filters = {'date_from': config.get('filter settings', 'date_from'),
+           'date_to': config.get('filter settings', 'date_to'),
+           'journals': [journal.strip() for journal in config.get('filter settings', 'journals').splitlines() if journal.strip() != ''],
+           'require_abstract': config.getboolean('filter settings', 'require_abstract'),
+           'require_references': config.getboolean('filter settings', 'require_references')}
 
-# DATAFRAMES
-df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
-df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=info)
+report_run = config.getboolean('report settings', 'report')
 
-# GRAPH
-graph = pcn.df_to_graph(df_links, df_nodes, connected_graph=connected, unknown_nodes=keep_unknown_nodes)
+connected = config.getboolean('graph settings', 'connected')
+keep_unknown_nodes = config.getboolean('graph settings', 'keep_unknown_nodes')
+export_format = config.get('graph settings', 'export_format')
+build = config.get('graph settings', 'build')
+memory_budget = int(config.getfloat('graph settings', 'memory_budget') * 2**30)
 
-# SAVE THE GRAPH
 if term_mesh == '':
     term_mesh = 'pubmed'
-nx.write_gexf(graph, graph_path + term_mesh + '.gexf') 
+
+# REPORT
+# Time, throughput and peak memory of each stage and each file, saved next to the graph
+report = utils.RunReport() if report_run == True else None
+
+# PARSE
+csv_list = pp.xml_parser(path_xml=pubmed_path, path_csv=csv_path, MeSH=mesh, informations=info, workers=workers, output_format=output_format, report=report, pipeline=pipeline, backend=backend, filters=filters, resume=resume)
+
+# Without the unknown nodes, the links to articles not in the nodes files are dropped while loading
+known_pmids = None if keep_unknown_nodes == True else pcn.known_pmids(csv_list)
+
+if build == 'shards':
+    # OUT-OF-CORE GRAPH
+    # The links are sorted on disk in CSR shards, saved with the degrees and the components computed shard by shard
+    graph = pcs.build_shards(csv_list, graph_path + term_mesh + '_shards/', memory=memory_budget, known_pmids=known_pmids, report=report)
+    if report is None:
+        graph.out_degree(), graph.in_degree(), graph.component_labels()
+    else:
+        with report.stage('shard_degrees') as record:
+            graph.out_degree(), graph.in_degree()
+            record['nodes'] = graph.number_of_nodes()
+        with report.stage('shard_components') as record:
+            graph.component_labels()
+            record['nodes'] = graph.number_of_nodes()
+
+else:
+    # DATAFRAMES
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links', known_pmids=known_pmids, report=report)
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=info, report=report)
+
+    # GRAPH
+    # The compact graph is written without building a networkx graph
+    graph = pcn.df_to_graph(df_links, df_nodes, connected_graph=connected, unknown_nodes=keep_unknown_nodes, backend='csr', report=report)
+
+    # SAVE THE GRAPH
+    if report is None:
+        pce.export_graph(graph, graph_path + term_mesh, export_format=export_format)
+    else:
+        with report.stage('write_' + export_format) as record:
+            pce.export_graph(graph, graph_path + term_mesh, export_format=export_format)
+            record['nodes'] = graph.number_of_nodes()
+            record['links'] = graph.number_of_edges()
+
+if report is not None:
+    report.save(graph_path + term_mesh + '_report.json')
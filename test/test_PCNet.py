@@ -2,15 +2,25 @@
 # -*- coding: utf-8 -*-
 
 import os
+import io
+import re
 import xml.etree.ElementTree as ET
+import numpy as np
 import pandas as pd
 import networkx as nx
 from PCNet import PCNet_parser as pp
 from PCNet import PCNet_network as pcn
 from PCNet import PCNet_utils as utils
+from PCNet import PCNet_index as pci
+from PCNet import PCNet_graph as pcg
+from PCNet import PCNet_synthetic as ps
+from PCNet import PCNet_export as pce
+from PCNet import PCNet_shards as pcs
 import pytest
 from gzip import GzipFile
 import csv
+import json
+import shutil
 
 __author__ = "Alessandro Lapi"
 __email__ = "alessandro.lapi@studio.unibo.it"
@@ -34,8 +44,15 @@ def parse_file():
     return parse_file
 
 @pytest.fixture
-def csv_file():
-    csv_list = pp.xml_parser(path_test, path_test)
+def path_csv(tmp_path):
+    """
+    Folder of the csv files of the test xml file, so that the parse does not write in the data folder.
+    """
+    return str(tmp_path) + '/'
+
+@pytest.fixture
+def csv_file(path_csv):
+    csv_list = pp.xml_parser(path_test, path_csv)
     return csv_list
 
 @pytest.fixture
@@ -54,6 +71,20 @@ def graph():
     return G
 
 
+def test_sanitize_text():
+    """
+    Test the sanitize_text function.
+    It checks if the brackets, the newlines, the tabs and the escaped html tags are removed and if the runs
+    of spaces are collapsed into one.
+    """
+    assert pp.sanitize_text('[Title]\twith\ntabs') == 'Title with tabs'
+    assert pp.sanitize_text('a &lt;b&gt;bold&lt;/b&gt; and &quot;quoted&quot; text') == 'a bold and quoted text'
+    assert pp.sanitize_text('x&lt;sup&gt;2&lt;/sup&gt;&lt;br&gt;y&lt;/br&gt;&lt;/br&gt;z') == 'x 2 y z'
+    assert pp.sanitize_text('      many \n\n   spaces     ') == ' many spaces '
+    assert pp.sanitize_text('Fish &amp; chips') == 'Fish &amp; chips'
+    assert pp.sanitize_text('') == ''
+
+
 def test_get_pmid(parse_file):
     """
     Test the get_pmid function.
@@ -92,7 +123,7 @@ def test_get_abstract(parse_file):
         assert '\n' not in pp.get_abstract(node)
         assert '\t' not in pp.get_abstract(node)
 
-    assert pp.get_abstract(parse_file.getroot()[2]) == '      Abstract for testing.     '
+    assert pp.get_abstract(parse_file.getroot()[2]) == ' Abstract for testing. '
     assert pp.get_abstract(parse_file.getroot()[3]) == ''
 
 def test_validate_date():
@@ -176,21 +207,21 @@ def test_get_references(parse_file):
     assert pp.get_references(parse_file.getroot()[3]) == ''
 
 
-def test_xml_parser(csv_file):
+def test_xml_parser(csv_file, path_csv):
     """
     Test the xml_parser function.
     It checks if the xml_parser function creates the right files.
     """
-    assert os.path.exists(path_test + 'links_test.csv')
-    assert os.path.exists(path_test + 'nodes_test.csv')
+    assert os.path.exists(path_csv + 'links_test.csv')
+    assert os.path.exists(path_csv + 'nodes_test.csv')
 
-    with open(path_test + 'links_test.csv', 'r') as file:
+    with open(path_csv + 'links_test.csv', 'r') as file:
         csv_reader = csv.reader(file)
         for row in csv_reader:
             assert row == ['36464820\t36464821']
             break
 
-    with open(path_test + 'nodes_test.csv', 'r') as file:
+    with open(path_csv + 'nodes_test.csv', 'r') as file:
         csv_reader = csv.reader(file)
         next(csv_reader)
         next(csv_reader)
@@ -213,7 +244,7 @@ def test_csv_to_dataframe(csv_file):
     assert df_links.iloc[0, 1] == 36464821
     assert df_nodes.iloc[0, 0] == 36464820
     assert df_nodes.iloc[1, 1] == 'Assessing implementation strategy and learning curve for transoral incisionless fundoplication as a new technique.'
-    assert df_nodes.iloc[1, 2] == '      Abstract for testing.     '
+    assert df_nodes.iloc[1, 2] == ' Abstract for testing. '
     assert df_nodes.iloc[0, 3] == '2022-10-05'
     assert df_nodes.iloc[1, 4] == 'Muhammad Haseeb, Christopher C Thompson'
     assert df_nodes.iloc[1, 5] == 'Clinical endoscopy'
@@ -227,146 +258,146 @@ def test_csv_to_dataframe(csv_file):
     assert df_nodes.iloc[2, 7] == ''
 
 
-def test_mesh_selection():
+def test_mesh_selection(path_csv):
     """
     Test the mesh selection in the xml_parser function and csv_to_dataframe function.
     It checks if the xml_parser function creates the right files and if the keywords column contains the mesh_word.
     """
-    csv_list = pp.xml_parser(path_test, path_test, MeSH=mesh)
+    csv_list = pp.xml_parser(path_test, path_csv, MeSH=mesh)
     df = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
 
-    assert os.path.exists(path_test + 'links_test.csv')
-    assert os.path.exists(path_test + 'nodes_test.csv') 
+    assert os.path.exists(path_csv + 'links_test.csv')
+    assert os.path.exists(path_csv + 'nodes_test.csv') 
     assert df['keywords'].str.contains(mesh_word).all() == True
   
 
-def test_title_selecion():
+def test_title_selecion(path_csv):
     """
     Test the title selection. It checks the shape of the dataframe and if the title column is in the dataframe.
     """
     title = ['title']
-    csv_list = pp.xml_parser(path_test, path_test, informations=title)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=title)
     title_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=title)
 
     assert 'title' in title_df_nodes.columns
     assert title_df_nodes.shape[1] == 3
 
-def test_no_title_selecion():
+def test_no_title_selecion(path_csv):
     """
     Test the title not selection. It checks the shape of the dataframe and if the title column is not in the dataframe.
     """
     no_title = ['abstract', 'date', 'authors', 'journal', 'keywords']
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_title)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_title)
     no_title_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_title)
 
     assert 'title' not in no_title_df_nodes.columns
     assert no_title_df_nodes.shape[1] == 7
 
-def test_abstract_selecion():
+def test_abstract_selecion(path_csv):
     """
     Test the abstract selection. It checks the shape of the dataframe and if the abstract column is in the dataframe.
     """
     abstract = ['abstract']
-    csv_list = pp.xml_parser(path_test, path_test, informations=abstract)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=abstract)
     abstract_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=abstract)
 
     assert 'abstract' in abstract_df_nodes.columns
     assert abstract_df_nodes.shape[1] == 3
 
-def test_no_abstract_selecion():
+def test_no_abstract_selecion(path_csv):
     """
     Test the abstract not selection. It checks the shape of the dataframe and if the abstract column is not in the dataframe.
     """
     no_abstract = ['title', 'date', 'authors', 'journal', 'keywords']
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_abstract)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_abstract)
     no_abstract_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_abstract)
 
     assert 'abstract' not in no_abstract_df_nodes.columns
     assert no_abstract_df_nodes.shape[1] == 7
 
-def test_date_selecion():
+def test_date_selecion(path_csv):
     """
     Test the date selection. It checks the shape of the dataframe and if the date column is in the dataframe.
     """
     date = ['date']
-    csv_list = pp.xml_parser(path_test, path_test, informations=date)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=date)
     date_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=date)
 
     assert 'date' in date_df_nodes.columns
     assert date_df_nodes.shape[1] == 3
 
-def test_no_date_selecion():
+def test_no_date_selecion(path_csv):
     """
     Test the date not selection. It checks the shape of the dataframe and if the date column is not in the dataframe.
     """
     no_date = ['title', 'abstract', 'authors', 'journal', 'keywords']
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_date)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_date)
     no_date_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_date)
 
     assert 'date' not in no_date_df_nodes.columns
     assert no_date_df_nodes.shape[1] == 7
 
-def test_authors_selecion():
+def test_authors_selecion(path_csv):
     """
     Test the authors selection. It checks the shape of the dataframe and if the authors column is in the dataframe.
     """
     authors = ['authors']
-    csv_list = pp.xml_parser(path_test, path_test, informations=authors)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=authors)
     authors_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=authors)
 
     assert 'authors' in authors_df_nodes.columns
     assert authors_df_nodes.shape[1] == 3
 
-def test_no_authors_selecion():
+def test_no_authors_selecion(path_csv):
     """
     Test the authors not selection. It checks the shape of the dataframe and if the authors column is not in the dataframe.
     """
     no_authors = ['title', 'abstract', 'date', 'journal', 'keywords']
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_authors)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_authors)
     no_authors_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_authors)
 
     assert 'authors' not in no_authors_df_nodes.columns
     assert no_authors_df_nodes.shape[1] == 7
 
-def test_journal_selecion():
+def test_journal_selecion(path_csv):
     """
     Test the journal selection. It checks the shape of the dataframe and if the journal column is in the dataframe.
     """
     journal = ['journal']
-    csv_list = pp.xml_parser(path_test, path_test, informations=journal)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=journal)
     journal_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=journal)
 
     assert 'journal' in journal_df_nodes.columns
     assert journal_df_nodes.shape[1] == 3
 
-def test_no_journal_selecion():
+def test_no_journal_selecion(path_csv):
     """
     Test the journal not selection. It checks the shape of the dataframe and if the journal column is not in the dataframe.
     """
     no_journal = ['title', 'abstract', 'date', 'authors', 'keywords']
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_journal)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_journal)
     no_journal_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_journal)
 
     assert 'journal' not in no_journal_df_nodes.columns
     assert no_journal_df_nodes.shape[1] == 7
 
-def test_keywords_selecion():
+def test_keywords_selecion(path_csv):
     """
     Test the keywords selection. It checks the shape of the dataframe and if the keywords column is in the dataframe.
     """
     keywords = ['keywords']
-    csv_list = pp.xml_parser(path_test, path_test, informations=keywords)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=keywords)
     keywords_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=keywords)
 
     assert 'keywords' in keywords_df_nodes.columns
     assert keywords_df_nodes.shape[1] == 3
 
-def test_no_keywords_selecion():
+def test_no_keywords_selecion(path_csv):
     """
     Test the keywords not selection. It checks the shape of the dataframe and if the keywords column is not in the dataframe.
     """
     no_keywords = ['title', 'abstract', 'date', 'authors', 'journal']
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_keywords)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_keywords)
     no_keywords_df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_keywords)
 
     assert 'keywords' not in no_keywords_df_nodes.columns
@@ -383,12 +414,12 @@ def test_all_selecion(df_nodes):
     
     assert df_nodes.shape[1] == 8
 
-def test_no_selecion():
+def test_no_selecion(path_csv):
     """
     Test the no selection. It checks the shape of the dataframe.
     """
     no_info = []
-    csv_list = pp.xml_parser(path_test, path_test, informations=no_info)
+    csv_list = pp.xml_parser(path_test, path_csv, informations=no_info)
     df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', columns=no_info)
 
     assert df_nodes.shape[1] == 2  
@@ -411,6 +442,36 @@ def test_df_to_graph(df_links, df_nodes):
 
     assert type(graph) == nx.classes.digraph.DiGraph
 
+def test_typed_loading(csv_file, df_links, df_nodes):
+    """
+    Test the usecols, dtypes and threads parameters of the csv_to_dataframe function and the concat_frames function.
+    It checks if the columns and the types are the ones requested and if the values do not change.
+    """
+    df_compact = pcn.csv_to_dataframe(csv_file, type_of_df='nodes', dtypes='compact')
+    assert df_compact['pmid'].dtype == 'int32'
+    assert df_compact['journal'].dtype == 'category'
+    for column in df_nodes.columns:
+        assert list(df_compact[column]) == list(df_nodes[column])
+
+    df_titles = pcn.csv_to_dataframe(csv_file, type_of_df='nodes', usecols=['pmid', 'title'], dtypes={'pmid': 'int64'})
+    assert list(df_titles.columns) == ['pmid', 'title']
+    assert df_titles.equals(df_nodes[['pmid', 'title']])
+
+    df_targets = pcn.csv_to_dataframe(csv_file, type_of_df='links', usecols=['target'], known_pmids=utils.pmid_bitmap([36464821]))
+    assert list(df_targets.columns) == ['target']
+    assert list(df_targets['target']) == [36464821] * (df_links['target'] == 36464821).sum()
+
+    assert pcn.csv_to_dataframe(csv_file + csv_file, type_of_df='links', threads=2).equals(pd.concat([df_links, df_links], ignore_index=True))
+
+    frames = [pd.DataFrame({'pmid': [1, 2], 'journal': pd.Categorical(['a', 'b']), 'title': ['x', 'y']}),
+              pd.DataFrame({'pmid': [3], 'journal': pd.Categorical(['c']), 'title': ['z']})]
+    df = pcn.concat_frames(frames)
+    assert frames == [None, None]
+    assert list(df['pmid']) == [1, 2, 3]
+    assert list(df['journal']) == ['a', 'b', 'c']
+    assert df['journal'].dtype == 'category'
+    assert list(df['title']) == ['x', 'y', 'z']
+
 def test_connected_graph_selection(df_links, df_nodes):
     """
     Test the connected graph selection of the df_to_graph function.
@@ -449,6 +510,65 @@ def test_connect_graph(df_links, df_nodes):
     assert nx.is_weakly_connected(G_connected) == True
     assert list(G_connected.edges(data=False)) == edge_list
 
+def test_component_sizes(df_links, df_nodes):
+    """
+    Test the component_labels, component_sizes and largest_component_links functions.
+    It checks if the components are the ones of the graph and if the connected graph is not a view.
+    """
+    G = pcn.df_to_graph(df_links, df_nodes, connected_graph=False, unknown_nodes=True)
+    df_components = pcn.component_labels(df_links)
+    sizes = pcn.component_sizes(df_links)
+
+    assert sorted(sizes.tolist(), reverse=True) == sorted([len(c) for c in nx.weakly_connected_components(G)], reverse=True)
+    assert sizes.iloc[0] == len(max(nx.weakly_connected_components(G), key=len))
+    assert df_components.loc[df_components['pmid'] == 36464824, 'component'].iloc[0] == 36464820
+
+    df_largest = pcn.largest_component_links(df_links)
+    assert set(df_largest['source']) | set(df_largest['target']) == set(pcn.connect_graph(G).nodes())
+    assert nx.is_frozen(pcn.connect_graph(G)) == False
+    assert nx.is_frozen(pcn.df_to_graph(df_links, df_nodes)) == False
+
+def test_weakly_connected_labels():
+    """
+    Test the weakly_connected_labels function.
+    It checks if the labels are the same components found by networkx.
+    """
+    source, target = [0, 2, 4, 5, 6], [1, 3, 3, 6, 5]
+    labels = pcg.weakly_connected_labels(8, source, target)
+
+    assert list(labels) == [0, 0, 2, 2, 2, 5, 5, 7]
+
+    G = nx.DiGraph(zip(source, target))
+    G.add_nodes_from(range(8))
+    for component in nx.weakly_connected_components(G):
+        assert len(set(labels[list(component)])) == 1
+
+def test_csr_graph(df_links, df_nodes):
+    """
+    Test the csr backend of the df_to_graph function.
+    It checks if the CitationGraph has the same nodes, links and attributes of the networkx graph.
+    """
+    for connected_graph in [True, False]:
+        for unknown_nodes in [True, False]:
+            G = pcn.df_to_graph(df_links, df_nodes, connected_graph=connected_graph, unknown_nodes=unknown_nodes)
+            C = pcn.df_to_graph(df_links, df_nodes, connected_graph=connected_graph, unknown_nodes=unknown_nodes,
+                                backend='csr')
+
+            assert type(C) == pcg.CitationGraph
+            assert C.number_of_nodes() == G.number_of_nodes()
+            assert C.number_of_edges() == G.number_of_edges()
+            assert set(C.to_networkx().edges()) == set(G.edges())
+            assert dict(C.to_networkx().nodes(data=True)) == dict(G.nodes(data=True))
+
+    G = pcn.df_to_graph(df_links, df_nodes, connected_graph=False, unknown_nodes=True)
+    C = pcn.df_to_graph(df_links, df_nodes, connected_graph=False, unknown_nodes=True, backend='csr')
+
+    assert list(C.successors(36464820)) == sorted(G.successors(36464820))
+    assert 36464820 in C.predecessors(36464821)
+    assert C.index([36464820, 1]).tolist() == [C.index(36464820), -1]
+    assert list(C.to_networkx([36464820, 36464821]).edges()) == [(36464820, 36464821)]
+    assert pcn.df_to_graph(df_links, df_nodes, backend='igraph') == None
+
 def test_add_attributes(df_links, df_nodes):
     """
     Test the add_attributes function.
@@ -458,7 +578,7 @@ def test_add_attributes(df_links, df_nodes):
     G = pcn.add_attributes(G, df_nodes)
 
     assert G.nodes[36464821]['title'] == 'Assessing implementation strategy and learning curve for transoral incisionless fundoplication as a new technique.'
-    assert G.nodes[36464821]['abstract'] == '      Abstract for testing.     '
+    assert G.nodes[36464821]['abstract'] == ' Abstract for testing. '
     assert G.nodes[36464820]['date'] == '2022-10-05'
     assert G.nodes[36464821]['authors'] == 'Muhammad Haseeb, Christopher C Thompson'
     assert G.nodes[36464821]['journal'] == 'Clinical endoscopy'
@@ -477,6 +597,20 @@ def test_add_attributes(df_links, df_nodes):
             assert node[1] == {}
 
 
+def test_add_attributes_duplicates():
+    """
+    Test the add_attributes function with repeated nodes.
+    It checks if the last row of a node wins and if the rows of nodes not in the graph are skipped.
+    """
+    G = nx.DiGraph([(1, 2)])
+    df_nodes = pd.DataFrame({'pmid': [1, 2, 1, 3], 'title': ['first', 'second', 'last', 'missing']})
+    G = pcn.add_attributes(G, df_nodes)
+
+    assert G.nodes[1] == {'title': 'last'}
+    assert G.nodes[2] == {'title': 'second'}
+    assert 3 not in G.nodes
+
+
 def test_nodes_to_df(graph):
     """
     Test the nodes_to_df function. 
@@ -522,3 +656,931 @@ def test_links_to_df(graph):
 
     assert df_links_graph.iloc[0, 0] == '36464820'
     assert df_links_graph.iloc[0, 1] == '36464821'
+
+
+def test_iter_articles(parse_file):
+    """
+    Test the iter_articles function.
+    It checks if the streaming and the non streaming modes yield the same articles.
+    """
+    pmids = [pp.get_pmid(node) for node in parse_file.getroot().iter('PubmedArticle')]
+
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        streamed_pmids = [pp.get_pmid(node) for node in pp.iter_articles(xml_file, streaming=True)]
+    
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        parsed_pmids = [pp.get_pmid(node) for node in pp.iter_articles(xml_file, streaming=False)]
+
+    assert streamed_pmids == pmids
+    assert parsed_pmids == pmids
+
+def test_streaming_selection(tmp_path):
+    """
+    Test the streaming selection of the xml_parser function.
+    It checks if the csv files created with and without streaming are the same.
+    """
+    path_streaming = str(tmp_path / 'streaming') + '/'
+    path_no_streaming = str(tmp_path / 'no_streaming') + '/'
+    os.makedirs(path_streaming)
+    os.makedirs(path_no_streaming)
+
+    csv_streaming = pp.xml_parser(path_test, path_streaming, streaming=True)
+    csv_no_streaming = pp.xml_parser(path_test, path_no_streaming, streaming=False)
+
+    for file_streaming, file_no_streaming in zip(csv_streaming, csv_no_streaming):
+        with open(file_streaming, 'r') as f1, open(file_no_streaming, 'r') as f2:
+            assert f1.read() == f2.read()
+
+@pytest.mark.parametrize('known_pmids', [None, True])
+def test_workers_selection(tmp_path, known_pmids):
+    """
+    Test the workers selection of the xml_parser and the parse_to_frames functions.
+    It checks if the parallel parse creates the same csv files, in the same order, of the sequential parse,
+    also with the known pmids sent once to each process of the pool.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_sequential = str(tmp_path / 'sequential') + '/'
+    path_parallel = str(tmp_path / 'parallel') + '/'
+    for path in [path_xml, path_sequential, path_parallel]:
+        os.makedirs(path)
+
+    for i in range(4):
+        shutil.copy(path_test + 'test.xml.gz', path_xml + f'test{i}.xml.gz')
+
+    csv_sequential = pp.xml_parser(path_xml, path_sequential, workers=1, known_pmids=known_pmids)
+    csv_parallel = pp.xml_parser(path_xml, path_parallel, workers=2, known_pmids=known_pmids)
+
+    assert [os.path.basename(file) for file in csv_parallel] == [os.path.basename(file) for file in csv_sequential]
+    assert os.path.basename(csv_parallel[0]) == 'nodes_test0.csv'
+
+    for file_sequential, file_parallel in zip(csv_sequential, csv_parallel):
+        with open(file_sequential, 'r') as f1, open(file_parallel, 'r') as f2:
+            assert f1.read() == f2.read()
+
+    frames_sequential = pp.parse_to_frames(path_xml, workers=1, known_pmids=known_pmids)
+    frames_parallel = pp.parse_to_frames(path_xml, workers=2, known_pmids=known_pmids)
+    for df_sequential, df_parallel in zip(frames_sequential, frames_parallel):
+        assert df_parallel.equals(df_sequential)
+
+def test_extract_fields(parse_file):
+    """
+    Test the extract_fields function.
+    It checks if only the fields selected are extracted and if all the fields of an article are extracted at once
+    with the values of the test file.
+    """
+    root = parse_file.getroot()
+
+    values = pp.extract_fields(root[2], ['title', 'references'])
+    assert list(values.keys()) == ['title', 'references']
+    assert values['title'] == 'Assessing implementation strategy and learning curve for transoral incisionless fundoplication as a new technique.'
+    assert values['references'] == '36464824'
+
+    fields = pp.INFORMATIONS + ['references']
+    assert pp.extract_fields(root[2], fields) == {'title': 'Assessing implementation strategy and learning curve for transoral incisionless fundoplication as a new technique.',
+                                                  'abstract': ' Abstract for testing. ',
+                                                  'date': '2022-11-08',
+                                                  'authors': 'Muhammad Haseeb, Christopher C Thompson',
+                                                  'journal': 'Clinical endoscopy',
+                                                  'keywords': '',
+                                                  'references': '36464824'}
+    assert pp.extract_fields(root[3], fields) == {'title': '', 'abstract': '', 'date': '2022-11-16', 'authors': 'Seung Woo Lee',
+                                                  'journal': 'Clinical endoscopy', 'keywords': '', 'references': ''}
+
+    values = pp.extract_fields(root[1], fields)
+    assert values['title'].startswith('Endoscopic ultrasound-directed transgastric endoscopic retrograde cholangiopancreatography')
+    assert values['abstract'].startswith(' Endoscopic retrograde cholangiopancreatography (ERCP) in patients with Roux-en-Y')
+    assert values['date'] == '2022-10-05'
+    assert values['authors'] == 'Hirokazu Honda, Jeffrey D Mosko, Ryosuke Kobayashi, Andras Fecso, Bong Sik Kim, Schoeman Scott, Gary R May'
+    assert values['keywords'] == 'endoscopic retrograde cholangiopancreatography, ultrasound-directed transgastric gastric bypass, submucosal dissection, endoscopy'
+    assert values['references'] == '36464821, 36464824'
+
+    values = pp.extract_fields(root[6], fields)
+    assert values['title'] == 'Underestimation of endoscopic size in large gastric epithelial neoplasms.'
+    assert values['abstract'].startswith(' Endoscopic submucosal dissection (ESD) is an effective method')
+    assert values['date'] == '2022-05-19'
+    assert values['authors'] == ''
+    assert values['keywords'] == 'endoscopic submucosal dissection, endoscopy, stomach neoplasms'
+    assert values['references'] == '36464821, 36464828, 36464825'
+
+def test_iter_article_blocks(parse_file):
+    """
+    Test the iter_article_blocks function.
+    It checks if the raw blocks are the same articles of the parsed file, even when the chunks are smaller than the articles.
+    """
+    pmids = [pp.get_pmid(node) for node in parse_file.getroot().iter('PubmedArticle')]
+
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        blocks = list(pp.iter_article_blocks(xml_file, chunk_size=100))
+
+    assert all(block.startswith(b'<PubmedArticle>') and block.endswith(b'</PubmedArticle>') for block in blocks)
+    assert [pp.get_pmid(ET.fromstring(block)) for block in blocks] == pmids
+
+def test_prefilter_selection(tmp_path):
+    """
+    Test the prefilter selection of the xml_parser function.
+    It checks if the csv files created with and without the prefilter are the same and
+    if an article with the MeSH repeated is written only once.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_prefilter = str(tmp_path / 'prefilter') + '/'
+    path_no_prefilter = str(tmp_path / 'no_prefilter') + '/'
+    for path in [path_xml, path_prefilter, path_no_prefilter]:
+        os.makedirs(path)
+
+    # Repeat the descriptor of the MeSH in the articles indexed with it
+    descriptor = f'<DescriptorName UI="{mesh}" MajorTopicYN="Y">Endoscopy</DescriptorName>'.encode()
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        text = xml_file.read().replace(descriptor, descriptor + descriptor)
+    with GzipFile(path_xml + "test.xml.gz", 'w') as xml_file:
+        xml_file.write(text)
+
+    csv_prefilter = pp.xml_parser(path_xml, path_prefilter, MeSH=mesh, prefilter=True)
+    csv_no_prefilter = pp.xml_parser(path_xml, path_no_prefilter, MeSH=mesh, prefilter=False)
+
+    for file_prefilter, file_no_prefilter in zip(csv_prefilter, csv_no_prefilter):
+        with open(file_prefilter, 'r') as f1, open(file_no_prefilter, 'r') as f2:
+            assert f1.read() == f2.read()
+
+    df = pcn.csv_to_dataframe(csv_prefilter, type_of_df='nodes')
+    assert list(df['pmid']) == [36464820, 36464824]
+
+def test_expand_mesh_query(tmp_path):
+    """
+    Test the load_mesh_tree and expand_mesh_query functions.
+    It checks if the tree numbers select the MeSH of their subtree and if the unique identifiers are kept.
+    """
+    path_mesh = str(tmp_path / 'desc.xml')
+    with open(path_mesh, 'w') as mesh_file:
+        mesh_file.write('<DescriptorRecordSet>'
+                        '<DescriptorRecord><DescriptorUI>D004724</DescriptorUI>'
+                        '<TreeNumberList><TreeNumber>E01.370.388.250</TreeNumber></TreeNumberList></DescriptorRecord>'
+                        '<DescriptorRecord><DescriptorUI>D000069916</DescriptorUI>'
+                        '<TreeNumberList><TreeNumber>E04.502.382</TreeNumber><TreeNumber>E01.370.388.250.500</TreeNumber></TreeNumberList></DescriptorRecord>'
+                        '<DescriptorRecord><DescriptorUI>D000001</DescriptorUI>'
+                        '<TreeNumberList><TreeNumber>E04.5020</TreeNumber></TreeNumberList></DescriptorRecord>'
+                        '</DescriptorRecordSet>')
+
+    mesh_tree = pp.load_mesh_tree(path_mesh)
+
+    assert mesh_tree['D000069916'] == ['E04.502.382', 'E01.370.388.250.500']
+    assert pp.expand_mesh_query('D004724') == {'D004724'}
+    assert pp.expand_mesh_query(['E01.370.388.250'], mesh_tree) == {'D004724', 'D000069916'}
+    assert pp.expand_mesh_query(['E04.502', 'D000001'], path_mesh) == {'D000069916', 'D000001'}
+
+def test_multi_query_selection(tmp_path):
+    """
+    Test the selection of many MeSH queries in the xml_parser function.
+    It checks if each query has its own csv files, equal to the ones of the parse with its MeSH only.
+    """
+    path_single = str(tmp_path / 'single') + '/'
+    path_multi = str(tmp_path / 'multi') + '/'
+    os.makedirs(path_single)
+    os.makedirs(path_multi)
+
+    mesh_tree = {'D004724': ['E01.370.388.250'], 'D000069916': ['E04.502.382']}
+    queries = {'endoscopy': mesh, 'dissection': ['E04'], 'none': ['D000001']}
+
+    csv_single = pp.xml_parser(path_test, path_single, MeSH=mesh)
+    csv_multi = pp.xml_parser(path_test, path_multi, MeSH=queries, mesh_tree=mesh_tree)
+
+    assert list(csv_multi.keys()) == ['endoscopy', 'dissection', 'none']
+    assert csv_multi['endoscopy'] == [path_multi + 'endoscopy/nodes_test.csv', path_multi + 'endoscopy/links_test.csv']
+
+    for file_single, file_multi in zip(csv_single, csv_multi['endoscopy']):
+        with open(file_single, 'r') as f1, open(file_multi, 'r') as f2:
+            assert f1.read() == f2.read()
+
+    df = pcn.csv_to_dataframe(csv_multi['dissection'], type_of_df='nodes')
+    assert df['keywords'].str.contains('submucosal dissection').all() == True
+    assert utils.is_empty_csv(csv_multi['none'][0]) == True
+
+def test_mesh_index(tmp_path):
+    """
+    Test the inverted index between the pmids and the MeSH built by the xml_parser function.
+    It checks the pmids of a MeSH, the MeSH of a pmid and if select_by_mesh gives the same
+    dataframes of the parse with the MeSH.
+    """
+    path_all = str(tmp_path / 'all') + '/'
+    path_mesh = str(tmp_path / 'mesh') + '/'
+    os.makedirs(path_all)
+    os.makedirs(path_mesh)
+
+    csv_all = pp.xml_parser(path_test, path_all, mesh_index=True)
+    csv_mesh = pp.xml_parser(path_test, path_mesh, MeSH=mesh)
+
+    assert os.path.exists(path_all + 'mesh_index.npz')
+    index = pci.load_mesh_index(path_all + 'mesh_index.npz')
+
+    assert list(pci.mesh_pmids(index, mesh)) == [36464820, 36464824]
+    assert list(pci.mesh_pmids(index, 'D000001')) == []
+    assert pci.pmid_mesh(index, 36464824) == ['D000069916', mesh]
+    assert pci.pmid_mesh(index, 36464821) == []
+
+    df_links, df_nodes = pci.select_by_mesh(index, mesh, csv_all)
+    df_links_mesh = pcn.csv_to_dataframe(csv_mesh, type_of_df='links')
+    df_nodes_mesh = pcn.csv_to_dataframe(csv_mesh, type_of_df='nodes')
+
+    assert df_links.equals(df_links_mesh)
+    assert df_nodes.equals(df_nodes_mesh)
+
+def test_known_pmids(tmp_path):
+    """
+    Test the bitmap of the known pmids.
+    It checks if the links to unknown articles are dropped while parsing and while loading the csv files,
+    as df_to_graph does with unknown_nodes=False, and if the bitmap from the MeSH index is the same.
+    """
+    bitmap = utils.pmid_bitmap([36464820, 36464824])
+    assert list(utils.in_bitmap(bitmap, [36464820, 36464821, 36464824, -1, 10**9])) == [True, False, True, False, False]
+    assert utils.has_pmid(bytes(bitmap), 36464824) == True
+
+    # The largest pmid accepted by the parser is in the bitmaps, with its links
+    bitmap = utils.pmid_bitmap([pp.PMID_MAX])
+    assert list(utils.in_bitmap(bitmap, [pp.PMID_MAX, pp.PMID_MAX + 1])) == [True, False]
+    assert utils.has_pmid(bytes(bitmap), pp.PMID_MAX) == True
+
+    path_mesh = str(tmp_path / 'mesh') + '/'
+    path_known = str(tmp_path / 'known') + '/'
+    path_all = str(tmp_path / 'all') + '/'
+    for path in [path_mesh, path_known, path_all]:
+        os.makedirs(path)
+
+    csv_mesh = pp.xml_parser(path_test, path_mesh, MeSH=mesh)
+    csv_known = pp.xml_parser(path_test, path_known, MeSH=mesh, known_pmids=True)
+    pp.xml_parser(path_test, path_all, mesh_index=True)
+
+    df_links = pcn.csv_to_dataframe(csv_mesh, type_of_df='links')
+    df_nodes = pcn.csv_to_dataframe(csv_mesh, type_of_df='nodes')
+    df_links_known = df_links[df_links['target'].isin(df_nodes['pmid'])].reset_index(drop=True)
+
+    assert len(df_links_known) < len(df_links)
+    assert pcn.csv_to_dataframe(csv_known, type_of_df='links').equals(df_links_known)
+
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_largest = str(tmp_path / 'largest') + '/'
+    for path in [path_xml, path_largest]:
+        os.makedirs(path)
+    with GzipFile(path_xml + 'pubmed0001.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + pubmed_article(pp.PMID_MAX, mesh, [1000001])
+                       + pubmed_article(1000001, mesh, [pp.PMID_MAX, 1000002]) + b'</PubmedArticleSet>')
+    csv_largest = pp.xml_parser(path_xml, path_largest, known_pmids=True)
+    df_largest = pcn.csv_to_dataframe(csv_largest, type_of_df='links')
+    assert list(zip(df_largest['source'], df_largest['target'])) == [(pp.PMID_MAX, 1000001), (1000001, pp.PMID_MAX)]
+    assert pcn.csv_to_dataframe(csv_known, type_of_df='nodes').equals(df_nodes)
+
+    bitmap = pcn.known_pmids(csv_mesh)
+    assert pcn.csv_to_dataframe(csv_mesh, type_of_df='links', known_pmids=bitmap).equals(df_links_known)
+    assert (pci.mesh_bitmap(path_all + 'mesh_index.npz', mesh) == bitmap).all()
+
+def test_resume_selection(tmp_path):
+    """
+    Test the resume selection of the xml_parser function.
+    It checks if the files already parsed with the same settings are skipped, and if they are parsed again
+    when the settings or the xml files change.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    os.makedirs(path_xml)
+    os.makedirs(path_csv)
+
+    for i in range(2):
+        shutil.copy(path_test + 'test.xml.gz', path_xml + f'test{i}.xml.gz')
+
+    def mark(file):
+        """
+        Overwrite a csv file to know if it is written again by the parse.
+        """
+        with open(file, 'w') as f:
+            f.write('marked\n')
+
+    def is_marked(file):
+        with open(file, 'r') as f:
+            return f.read() == 'marked\n'
+
+    csv_list = pp.xml_parser(path_xml, path_csv, resume=True)
+    assert os.path.exists(path_csv + 'manifest.json')
+    
+    # Same settings: both the files are skipped
+    mark(csv_list[0])
+    mark(csv_list[2])
+    assert pp.xml_parser(path_xml, path_csv, resume=True) == csv_list
+    assert is_marked(csv_list[0]) and is_marked(csv_list[2])
+
+    # A changed file is parsed again, the other one is skipped
+    with open(path_xml + 'test1.xml.gz.md5', 'w') as f:
+        f.write('MD5(test1.xml.gz)= 0123456789abcdef\n')
+    pp.xml_parser(path_xml, path_csv, resume=True)
+    assert is_marked(csv_list[0]) and not is_marked(csv_list[2])
+
+    # Different settings: all the files are parsed again
+    pp.xml_parser(path_xml, path_csv, informations=['title'], resume=True)
+    assert not is_marked(csv_list[0])
+
+    # Without resume, the default, all the files are parsed again
+    mark(csv_list[0])
+    pp.xml_parser(path_xml, path_csv, informations=['title'])
+    assert not is_marked(csv_list[0])
+
+def test_update_selection(tmp_path):
+    """
+    Test the update selection of the xml_parser function and the latest_versions function.
+    It checks if the revised articles of an update file replace the old ones and if the deleted articles are dropped.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    path_mesh = str(tmp_path / 'mesh') + '/'
+    for path in [path_xml, path_csv, path_mesh]:
+        os.makedirs(path)
+
+    # The update file revises the article 36464821 and deletes the article 36464822
+    shutil.copy(path_test + 'test.xml.gz', path_xml + 'pubmed0001.xml.gz')
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        blocks = list(pp.iter_article_blocks(xml_file))
+    revised = blocks[2].replace(b'Assessing implementation strategy', b'Revised implementation strategy')
+    with GzipFile(path_xml + 'pubmed0002.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + revised +
+                       b'<DeleteCitation><PMID Version="1">36464822</PMID></DeleteCitation></PubmedArticleSet>')
+
+    csv_list = pp.xml_parser(path_xml, path_csv, update=True)
+    assert path_csv + 'deleted_pubmed0002.csv' in csv_list
+
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+
+    assert df_nodes['pmid'].is_unique
+    assert 36464822 not in list(df_nodes['pmid'])
+    assert 36464822 not in list(df_links['source'])
+    assert df_nodes.loc[df_nodes['pmid'] == 36464821, 'title'].iloc[0].startswith('Revised implementation strategy')
+    assert len(df_links[df_links['source'] == 36464821]) == 1
+
+    # The deleted citations are found also by the MeSH prefilter, after the revised article out of the MeSH
+    csv_mesh = pp.xml_parser(path_xml, path_mesh, MeSH=mesh, update=True)
+    with open(path_mesh + 'deleted_pubmed0002.csv', 'r') as f:
+        assert f.read() == '36464821\n36464822\n'
+    assert len(csv_mesh) == 6
+
+def pubmed_article(pmid, ui, references=()):
+    """
+    Return the xml of a minimal article with a single MeSH, for the tests of the update files.
+    """
+    headings = f'<MeshHeadingList><MeshHeading><DescriptorName UI="{ui}">Term</DescriptorName></MeshHeading></MeshHeadingList>'
+    reference_list = ''.join(f'<Reference><ArticleIdList><ArticleId IdType="pubmed">{ref}</ArticleId></ArticleIdList></Reference>'
+                             for ref in references)
+    return (f'<PubmedArticle><MedlineCitation><PMID Version="1">{pmid}</PMID><Article><ArticleTitle>Title {pmid}.</ArticleTitle>'
+            f'</Article>{headings}</MedlineCitation><PubmedData><ArticleIdList><ArticleId IdType="pubmed">{pmid}</ArticleId>'
+            f'</ArticleIdList><ReferenceList>{reference_list}</ReferenceList></PubmedData></PubmedArticle>').encode()
+
+@pytest.mark.parametrize('prefilter', [True, False])
+def test_update_mesh_revision(tmp_path, prefilter):
+    """
+    Test the update selection of the xml_parser and the parse_to_frames functions for a revised article that loses the MeSH.
+    It checks if its old version and its links are dropped, with a single query and with many queries.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    os.makedirs(path_xml)
+
+    # The second file revises the article 1000001 without the MeSH
+    files = {'pubmed0001.xml.gz': pubmed_article(1000001, mesh, [1000002]) + pubmed_article(1000002, mesh, [1000003]),
+             'pubmed0002.xml.gz': pubmed_article(1000001, 'D000001', [1000002])}
+    for file, articles in files.items():
+        with GzipFile(path_xml + file, 'w') as xml_file:
+            xml_file.write(b'<PubmedArticleSet>' + articles + b'</PubmedArticleSet>')
+
+    path_csv = str(tmp_path / 'csv') + '/'
+    os.makedirs(path_csv)
+    csv_list = pp.xml_parser(path_xml, path_csv, MeSH=mesh, prefilter=prefilter, update=True)
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+    assert list(df_nodes['pmid']) == [1000002]
+    assert list(df_links['source']) == [1000002]
+
+    df_links, df_nodes = pp.parse_to_frames(path_xml, MeSH=mesh, prefilter=prefilter, update=True)
+    assert list(df_nodes['pmid']) == [1000002]
+    assert list(df_links['source']) == [1000002]
+
+    # The revised article leaves only the query of the MeSH it lost
+    queries = {'endoscopy': mesh, 'none': ['D000001']}
+    path_multi = str(tmp_path / 'multi') + '/'
+    os.makedirs(path_multi)
+    csv_multi = pp.xml_parser(path_xml, path_multi, MeSH=queries, prefilter=prefilter, update=True)
+    df_nodes = pcn.csv_to_dataframe(csv_multi['endoscopy'], type_of_df='nodes')
+    assert list(df_nodes['pmid']) == [1000002]
+    df_nodes = pcn.csv_to_dataframe(csv_multi['none'], type_of_df='nodes')
+    df_links = pcn.csv_to_dataframe(csv_multi['none'], type_of_df='links')
+    assert list(df_nodes['pmid']) == [1000001]
+    assert list(df_links['target']) == [1000002]
+
+def test_update_mesh_index(tmp_path):
+    """
+    Test the MeSH index of the xml_parser function with the update files, and the select_by_mesh function.
+    It checks if only the MeSH of the latest version of an article are indexed and if the articles deleted
+    in a file without the MeSH are not selected.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    for path in [path_xml, path_csv]:
+        os.makedirs(path)
+
+    # The second file revises the article 1000001 without the MeSH, the third one deletes the article 1000002
+    files = {'pubmed0001.xml.gz': pubmed_article(1000001, mesh, [1000002]) + pubmed_article(1000002, mesh, [1000003])
+                                  + pubmed_article(1000003, mesh, [1000001]),
+             'pubmed0002.xml.gz': pubmed_article(1000001, 'D000001', [1000002]),
+             'pubmed0003.xml.gz': b'<DeleteCitation><PMID Version="1">1000002</PMID></DeleteCitation>'}
+    for file, articles in files.items():
+        with GzipFile(path_xml + file, 'w') as xml_file:
+            xml_file.write(b'<PubmedArticleSet>' + articles + b'</PubmedArticleSet>')
+
+    csv_list = pp.xml_parser(path_xml, path_csv, mesh_index=True, update=True)
+    index = pci.load_mesh_index(path_csv + 'mesh_index.npz')
+
+    assert list(pci.mesh_pmids(index, mesh)) == [1000003]
+    assert pci.pmid_mesh(index, 1000001) == ['D000001']
+    assert pci.pmid_mesh(index, 1000002) == []
+    assert list(index['sources'][index['pmid_source']]) == ['pubmed0002', 'pubmed0001']
+
+    df_links, df_nodes = pci.select_by_mesh(index, mesh, csv_list)
+    assert list(df_nodes['pmid']) == [1000003]
+    assert list(df_links['target']) == [1000001]
+
+def test_baseline_duplicates(tmp_path):
+    """
+    Test the deduplication of the articles in several baseline files, with csv_to_dataframe and parse_to_frames.
+    It checks if the newest version of an article wins, with its links, also among the versions in the same file,
+    and if dedup=False keeps all the rows of the files.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    for path in [path_xml, path_csv]:
+        os.makedirs(path)
+
+    # The second baseline file has a newer version of the article 36464821, without its references
+    shutil.copy(path_test + 'test.xml.gz', path_xml + 'pubmed0001.xml.gz')
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        blocks = list(pp.iter_article_blocks(xml_file))
+    revised = blocks[2].replace(b'Assessing implementation strategy', b'Revised implementation strategy')
+    revised = re.sub(rb'<ReferenceList>.*</ReferenceList>', b'', revised, flags=re.S)
+    with GzipFile(path_xml + 'pubmed0002.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + revised + b'</PubmedArticleSet>')
+
+    # The third file has two versions of the article 1000001, with different links, and of the article 1000002,
+    # whose last version has no links
+    with GzipFile(path_xml + 'pubmed0003.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + pubmed_article(1000002, mesh, [1000030]) + pubmed_article(1000001, mesh, [1000010])
+                       + pubmed_article(1000001, 'D000001', [1000020]) + pubmed_article(1000002, mesh) + b'</PubmedArticleSet>')
+
+    csv_list = pp.xml_parser(path_xml, path_csv)
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+    all_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', dedup=False)
+    all_links = pcn.csv_to_dataframe(csv_list, type_of_df='links', dedup=False)
+
+    assert df_nodes['pmid'].is_unique
+    assert len(all_nodes) == len(df_nodes) + 1
+    assert df_nodes.loc[df_nodes['pmid'] == 36464821, 'title'].iloc[0].startswith('Revised implementation strategy')
+    assert 36464821 in list(all_links['source'])
+    assert 36464821 not in list(df_links['source'])
+    assert not df_links.duplicated().any()
+    assert list(df_links.loc[df_links['source'].isin([1000001, 1000002]), 'target']) == [1000020]
+    assert list(df_nodes.loc[df_nodes['pmid'].isin([1000001, 1000002]), 'pmid']) == [1000001, 1000002]
+
+    # The same articles are kept in memory and in the Parquet files
+    links, nodes = pp.parse_to_frames(path_xml)
+    assert sorted(nodes['pmid']) == sorted(df_nodes['pmid'])
+    assert links.equals(df_links)
+
+    path_parquet = str(tmp_path / 'parquet') + '/'
+    os.makedirs(path_parquet)
+    parquet_list = pp.xml_parser(path_xml, path_parquet, output_format='parquet')
+    assert pcn.csv_to_dataframe(parquet_list, type_of_df='links').equals(df_links)
+
+    # The index of the latest versions: the last row of a file wins and the deleted articles are dropped
+    versions = pcn.resolve_versions([np.array([1, 2, 3, 2]), np.array([3, 4]), None], [None, None, np.array([4])])
+    assert list(versions[0]['pmid']) == [1, 2] and list(versions[0]['row']) == [0, 3]
+    assert list(versions[1]['pmid']) == [3] and list(versions[1]['row']) == [0]
+    assert 2 not in versions
+
+def test_latest_versions_loaded(tmp_path, monkeypatch):
+    """
+    Test the latest_versions function with the pmids of the nodes files already loaded.
+    It checks if only the other files are read, also after a deleted file is read.
+    """
+    files = {'deleted_pubmed0001.csv': '3\n', 'nodes_pubmed0001.csv': '1\t\n2\t\n3\t\n', 'nodes_pubmed0002.csv': '2\t\n4\t\n'}
+    for file, content in files.items():
+        with open(tmp_path / file, 'w') as f:
+            f.write(content)
+    csv_list = [str(tmp_path / file) for file in files]
+
+    read = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, 'read_csv', lambda file, *args, **kwargs: read.append(os.path.basename(file)) or read_csv(file, *args, **kwargs))
+
+    versions = pcn.latest_versions(csv_list, pmids={'pubmed0001': np.array([1, 2, 3]), 'pubmed0002': np.array([2, 4])})
+    assert read == ['deleted_pubmed0001.csv']
+    assert list(versions['pubmed0001']['pmid']) == [1]
+    assert list(versions['pubmed0002']['pmid']) == [2, 4]
+
+def test_parquet_selection(tmp_path):
+    """
+    Test the parquet output format of the xml_parser function and the parquet_to_dataframe function.
+    It checks if the dataframes are the same of the csv files and if only the columns selected are read.
+    """
+    pytest.importorskip('pyarrow')
+
+    path_csv = str(tmp_path / 'csv') + '/'
+    path_parquet = str(tmp_path / 'parquet') + '/'
+    os.makedirs(path_csv)
+    os.makedirs(path_parquet)
+
+    csv_list = pp.xml_parser(path_test, path_csv)
+    parquet_list = pp.xml_parser(path_test, path_parquet, output_format='parquet')
+
+    assert parquet_list == [path_parquet + 'nodes_test.parquet', path_parquet + 'links_test.parquet']
+
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    parquet_links = pcn.csv_to_dataframe(parquet_list, type_of_df='links')
+    parquet_nodes = pcn.csv_to_dataframe(parquet_list, type_of_df='nodes')
+
+    assert parquet_links['source'].dtype == 'int64'
+    assert parquet_links.equals(df_links)
+    assert list(parquet_nodes.columns) == list(df_nodes.columns)
+    for column in ['pmid', 'date', 'authors', 'journal', 'keywords', 'references']:
+        assert list(parquet_nodes[column]) == list(df_nodes[column])
+
+    # The text is not sanitized in the parquet files
+    assert parquet_nodes.iloc[1, 2] != df_nodes.iloc[1, 2]
+    assert parquet_nodes.iloc[1, 2].split() == df_nodes.iloc[1, 2].split()
+
+    title_nodes = pcn.csv_to_dataframe(parquet_list, type_of_df='nodes', columns=['title'])
+    assert list(title_nodes.columns) == ['pmid', 'title', 'references']
+
+def test_synthetic_baseline(tmp_path):
+    """
+    Test the generator of synthetic xml files.
+    It checks if the files are parsed with the number of articles requested, if the articles cite only older
+    articles, if the MeSH filter selects a part of them and if the same seed gives the same files.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    path_mesh = str(tmp_path / 'mesh') + '/'
+    os.makedirs(path_csv)
+    os.makedirs(path_mesh)
+
+    files = ps.generate_baseline(path_xml, 250, articles_per_file=100, references=5, seed=1)
+    assert files == ['pubmed00n0001.xml.gz', 'pubmed00n0002.xml.gz', 'pubmed00n0003.xml.gz']
+
+    csv_list = pp.xml_parser(path_xml, path_csv)
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+
+    assert list(df_nodes['pmid']) == list(range(ps.FIRST_PMID, ps.FIRST_PMID + 250))
+    assert (df_links['target'] < df_links['source']).all()
+    assert (df_links['target'] < ps.FIRST_PMID).any()
+    assert (df_nodes['title'] != '').all()
+    assert (df_nodes['abstract'] != '').any()
+
+    # The abstracts of the files are the ones parsed
+    with GzipFile(path_xml + files[0], 'r') as file:
+        abstracts = [b'<AbstractText>' in block for block in pp.iter_article_blocks(file)]
+    assert abstracts == list(df_nodes['abstract'][:100] != '')
+
+    df_mesh = pcn.csv_to_dataframe(pp.xml_parser(path_xml, path_mesh, MeSH=mesh), type_of_df='nodes')
+    assert 0 < len(df_mesh) < len(df_nodes)
+
+    with GzipFile(path_xml + files[0], 'r') as file:
+        content = file.read()
+    ps.generate_baseline(path_xml, 250, articles_per_file=100, references=5, seed=1)
+    with GzipFile(path_xml + files[0], 'r') as file:
+        assert file.read() == content
+
+def test_build_shards(tmp_path, monkeypatch):
+    """
+    Test the out-of-core build of the graph in CSR shards, on a synthetic baseline.
+    It checks if the shards, the degrees and the components are the ones of the CitationGraph, when the memory budget
+    splits the links in several runs and shards, and if a budget too small is refused.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    path_shards = str(tmp_path / 'shards') + '/'
+    os.makedirs(path_csv)
+
+    ps.generate_baseline(path_xml, 1000, articles_per_file=250, references=10, seed=2)
+    csv_list = pp.xml_parser(path_xml, path_csv)
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+
+    # Each link counts as 8 KB, so that a budget of 64 MB holds a few thousands of links
+    monkeypatch.setattr(pcs, 'LINK_BYTES', 8192)
+    for known, df in [(None, None), (pcn.known_pmids(csv_list), df_nodes)]:
+        G = pcs.build_shards(csv_list, path_shards, memory=64 * 2**20, known_pmids=known)
+        C = pcg.CitationGraph.from_links(df_links, df, connected_graph=False, unknown_nodes=known is None)
+        with open(path_shards + 'graph.json', 'r') as file:
+            info = json.load(file)
+        assert info['runs'] > 1 and len(info['shards']) > 1
+        assert not os.path.exists(path_shards + 'runs')
+
+        S = pcs.load_shards(path_shards).to_citation_graph()
+        assert np.array_equal(S.pmids, C.pmids)
+        assert np.array_equal(S.indptr, C.indptr)
+        assert np.array_equal(S.indices, C.indices)
+        assert np.array_equal(G.out_degree(), C.out_degree())
+        assert np.array_equal(G.in_degree(), C.in_degree())
+
+        source = np.repeat(np.arange(C.number_of_nodes()), np.diff(C.indptr))
+        assert np.array_equal(G.component_labels(), pcg.weakly_connected_labels(C.number_of_nodes(), source, C.indices))
+        assert os.path.exists(path_shards + 'labels.npy')
+    assert len(G.largest_component()) == pcg.CitationGraph.from_links(df_links, df_nodes).number_of_nodes()
+
+    assert pcs.build_shards(csv_list, path_shards, memory=2**20) is None
+    assert pcs.load_shards(str(tmp_path / 'missing')) is None
+
+    # The links of the largest pmid accepted by the parser are in the shards
+    path_largest = str(tmp_path / 'largest') + '/'
+    os.makedirs(path_largest + 'xml')
+    with GzipFile(path_largest + 'xml/pubmed0001.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + pubmed_article(pp.PMID_MAX, mesh, [1000001])
+                       + pubmed_article(1000001, mesh, [pp.PMID_MAX]) + b'</PubmedArticleSet>')
+    csv_largest = pp.xml_parser(path_largest + 'xml/', path_largest)
+    G = pcs.build_shards(csv_largest, path_largest + 'shards/', memory=64 * 2**20)
+    assert list(G.to_citation_graph().pmids) == [1000001, pp.PMID_MAX]
+    assert list(G.out_degree()) == [1, 1]
+
+def test_run_report(tmp_path):
+    """
+    Test the RunReport of a run of the pipeline.
+    It checks the records of the parse of each file and of each stage, and the json file of the report.
+    """
+    path_csv = str(tmp_path / 'csv') + '/'
+    os.makedirs(path_csv)
+
+    report = utils.RunReport()
+    csv_list = pp.xml_parser(path_test, path_csv, report=report, resume=False)
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links', report=report)
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes', report=report)
+    G = pcn.df_to_graph(df_links, df_nodes, report=report)
+
+    assert csv_list == [path_csv + 'nodes_test.csv', path_csv + 'links_test.csv']
+    assert [stage['stage'] for stage in report.stages] == ['xml_parser', 'csv_to_dataframe links', 'csv_to_dataframe nodes', 'df_to_graph']
+
+    stats = report.files[0]
+    assert stats['file'] == 'test.xml.gz'
+    assert stats['rows'] == len(df_nodes)
+    assert stats['links'] == len(df_links)
+    assert stats['compressed_bytes'] == os.path.getsize(path_test + 'test.xml.gz')
+    assert stats['uncompressed_bytes'] > stats['compressed_bytes']
+    assert stats['articles_per_second'] > 0
+
+    assert report.stages[0]['rows'] == len(df_nodes)
+    assert report.stages[3]['nodes'] == G.number_of_nodes()
+    assert all(stage['peak_rss_mb'] > 0 for stage in report.stages)
+
+    with report.stage('write_gexf') as record:
+        nx.write_gexf(G, str(tmp_path / 'graph.gexf'))
+    report.save(str(tmp_path / 'report.json'))
+
+    with open(str(tmp_path / 'report.json'), 'r') as file:
+        saved = json.load(file)
+    assert [stage['stage'] for stage in saved['stages']][-1] == 'write_gexf'
+    assert len(saved['files']) == 1
+
+def test_parse_to_frames(tmp_path):
+    """
+    Test the parse_to_frames function.
+    It checks if the dataframes are the same of the csv files of the xml_parser function, also with update
+    files and the MeSH filter, and if the csv files are written only when path_csv is given.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    path_csv = str(tmp_path / 'csv') + '/'
+    path_tee = str(tmp_path / 'tee') + '/'
+    for path in [path_xml, path_csv, path_tee]:
+        os.makedirs(path)
+
+    # The update file revises the article 36464821 and deletes the article 36464822
+    shutil.copy(path_test + 'test.xml.gz', path_xml + 'pubmed0001.xml.gz')
+    with GzipFile(path_test + "test.xml.gz", 'r') as xml_file:
+        blocks = list(pp.iter_article_blocks(xml_file))
+    revised = blocks[2].replace(b'Assessing implementation strategy', b'Revised implementation strategy')
+    with GzipFile(path_xml + 'pubmed0002.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + revised +
+                       b'<DeleteCitation><PMID Version="1">36464822</PMID></DeleteCitation></PubmedArticleSet>')
+
+    csv_list = pp.xml_parser(path_xml, path_csv, update=True)
+    df_links = pcn.csv_to_dataframe(csv_list, type_of_df='links')
+    df_nodes = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+
+    # The references are always strings, while read_csv infers integers in a file with single references
+    links, nodes = pp.parse_to_frames(path_xml, update=True)
+    assert links.equals(df_links)
+    assert list(nodes.columns) == list(df_nodes.columns)
+    for column in nodes.columns:
+        assert list(nodes[column].astype(str)) == list(df_nodes[column].astype(str))
+    assert len(os.listdir(path_tee)) == 0
+
+    # With path_csv the same csv files are also written
+    pp.parse_to_frames(path_xml, update=True, path_csv=path_tee)
+    for csv_file in csv_list:
+        with open(csv_file, 'r') as f, open(csv_file.replace(path_csv, path_tee), 'r') as g:
+            assert f.read() == g.read()
+
+    mesh_links, mesh_nodes = pp.parse_to_frames(path_test, MeSH=mesh)
+    df_mesh = pcn.csv_to_dataframe(pp.xml_parser(path_test, path_csv, MeSH=mesh), type_of_df='nodes')
+    assert list(mesh_nodes['pmid']) == list(df_mesh['pmid'])
+
+def test_export_graph(tmp_path, df_links, df_nodes):
+    """
+    Test the export_graph function and the writers of PCNet_export.
+    It checks if the GEXF and the GraphML files are read by networkx as the graph of df_to_graph,
+    and if the links of the binary edge list are read back.
+    """
+    G = pcn.df_to_graph(df_links, df_nodes, connected_graph=False)
+    csr = pcn.df_to_graph(df_links, df_nodes, connected_graph=False, backend='csr')
+
+    path_gexf = pce.export_graph(csr, str(tmp_path / 'graph'))
+    assert path_gexf == str(tmp_path / 'graph.gexf')
+    nx.write_gexf(G, str(tmp_path / 'networkx.gexf'))
+    gexf = nx.read_gexf(path_gexf)
+    reference = nx.read_gexf(str(tmp_path / 'networkx.gexf'))
+    assert dict(gexf.nodes(data=True)) == dict(reference.nodes(data=True))
+    assert set(gexf.edges()) == set(reference.edges())
+
+    graphml = nx.read_graphml(pce.export_graph(csr, str(tmp_path / 'graph'), export_format='graphml'), node_type=int)
+    assert dict(graphml.nodes(data=True)) == dict(G.nodes(data=True))
+    assert set(graphml.edges()) == set(G.edges())
+
+    edgelist = pce.read_edgelist(pce.export_graph(csr, str(tmp_path / 'graph'), export_format='edgelist'))
+    assert edgelist.equals(csr.edges())
+
+    # The text is escaped and the chunks give the same file
+    nodes = pd.DataFrame({'pmid': [1, 2], 'title': ['a & "b" <c>', 'd\te\nf']})
+    links = pd.DataFrame({'source': [1, 2, 1], 'target': [2, 3, 3]})
+    pce.write_gexf(links, nodes, str(tmp_path / 'small.gexf'), chunk_size=1)
+    small = nx.read_gexf(str(tmp_path / 'small.gexf'))
+    assert small.nodes['1']['title'] == 'a & "b" <c>'
+    assert small.nodes['2']['title'] == 'd\te\nf'
+    assert 'title' not in small.nodes['3']
+    assert set(small.edges()) == {('1', '2'), ('2', '3'), ('1', '3')}
+
+def test_snapshot(tmp_path, df_links, df_nodes):
+    """
+    Test the save_snapshot and load_snapshot functions and the nodes_to_df and links_to_df functions on a CitationGraph.
+    It checks if the graph loaded from the snapshot has the same links, nodes and attributes of the saved one.
+    """
+    pytest.importorskip('pyarrow')
+
+    G = pcn.df_to_graph(df_links, df_nodes, connected_graph=False, backend='csr')
+    path_snapshot = str(tmp_path / 'snapshot')
+    assert pce.save_snapshot(G, path_snapshot) == path_snapshot
+
+    loaded = pce.load_snapshot(path_snapshot)
+    assert isinstance(loaded.indices, np.memmap)
+    assert loaded.number_of_nodes() == G.number_of_nodes()
+    assert loaded.edges().equals(G.edges())
+    assert loaded.nodes.equals(G.nodes)
+    assert list(loaded.predecessors(36464824)) == list(G.predecessors(36464824))
+
+    snapshot_links, snapshot_nodes = pce.load_snapshot(path_snapshot, mmap=False, frames=True)
+    assert snapshot_links.equals(pcn.links_to_df(G))
+    assert snapshot_nodes.equals(pcn.nodes_to_df(G))
+    assert pce.load_snapshot(str(tmp_path / 'missing')) is None
+
+def test_pipeline_selection(tmp_path):
+    """
+    Test the pipeline option of the xml_parser function and the PrefetchReader class.
+    It checks if the csv files are the same without the pipeline, if the reader gives the bytes of the file
+    and if it can be closed before the end of the file.
+    """
+    path_csv = str(tmp_path / 'csv') + '/'
+    path_pipeline = str(tmp_path / 'pipeline') + '/'
+    os.makedirs(path_csv)
+    os.makedirs(path_pipeline)
+
+    csv_list = pp.xml_parser(path_test, path_csv, resume=False)
+    pipeline_list = pp.xml_parser(path_test, path_pipeline, resume=False, pipeline=True)
+    for csv_file, pipeline_file in zip(csv_list, pipeline_list):
+        with open(csv_file, 'r') as f, open(pipeline_file, 'r') as g:
+            assert f.read() == g.read()
+
+    with GzipFile(path_test + 'test.xml.gz', 'r') as xml_file:
+        content = xml_file.read()
+
+    with GzipFile(path_test + 'test.xml.gz', 'r') as xml_file:
+        reader = pp.PrefetchReader(xml_file, chunk_size=1000, size=2)
+        data = reader.read(10) + reader.read(5000)
+        while True:
+            chunk = reader.read(777)
+            if not chunk:
+                break
+            data += chunk
+        reader.close()
+    assert data == content
+    assert reader.tell() == len(content)
+
+    with GzipFile(path_test + 'test.xml.gz', 'r') as xml_file:
+        reader = pp.PrefetchReader(xml_file, chunk_size=100, size=1)
+        assert reader.read(100) == content[:100]
+        reader.close()
+    assert not reader.thread.is_alive()
+
+
+def test_parser_backend(tmp_path):
+    """
+    Test the backend option of the xml_parser function.
+    It checks if the csv files are the same with lxml and with the standard library, also for the update files
+    and the MeSH prefilter, if the fields of an article are the same with both the parsers and if the
+    unknown backends are refused.
+    """
+    pytest.importorskip('lxml')
+
+    path_xml = str(tmp_path / 'xml') + '/'
+    ps.generate_baseline(path_xml, 300, articles_per_file=100, seed=1)
+    shutil.copy(path_test + 'test.xml.gz', path_xml + 'test.xml.gz')
+
+    for settings in [{}, {'MeSH': 'D004724'}, {'update': True, 'streaming': False}]:
+        csv_lists = {}
+        for backend in ['stdlib', 'lxml']:
+            path_csv = str(tmp_path / (backend + str(len(settings)))) + '/'
+            os.makedirs(path_csv, exist_ok=True)
+            csv_lists[backend] = pp.xml_parser(path_xml, path_csv, resume=False, backend=backend, **settings)
+        for stdlib_file, lxml_file in zip(csv_lists['stdlib'], csv_lists['lxml']):
+            with open(stdlib_file, 'r') as f, open(lxml_file, 'r') as g:
+                assert f.read() == g.read()
+
+    fields = ['title', 'abstract', 'date', 'authors', 'journal', 'keywords', 'references', 'mesh']
+    with GzipFile(path_test + 'test.xml.gz', 'r') as xml_file:
+        content = xml_file.read()
+    block = next(pp.iter_article_blocks(io.BytesIO(content)))
+    node = pp.xml_backend('lxml').fromstring(block)
+    assert pp.is_lxml(node)
+    assert not pp.is_lxml(ET.fromstring(block))
+    assert pp.get_pmid(node) == pp.get_pmid(ET.fromstring(block))
+    for sanitize in [True, False]:
+        assert pp.extract_fields(node, fields, sanitize) == pp.extract_fields(ET.fromstring(block), fields, sanitize)
+
+    # The dates without the day are skipped by both the parsers, for the next date in the order of priority
+    dates = (b'<PubmedArticle><MedlineCitation><PMID Version="1">1000001</PMID>'
+             b'<DateRevised><Year>2021</Year><Month>05</Month><Day>04</Day></DateRevised>'
+             b'<Article><ArticleDate DateType="Electronic"><Year>2020</Year><Month>03</Month></ArticleDate></Article>'
+             b'</MedlineCitation><PubmedData><History><PubMedPubDate PubStatus="accepted"><Year>2019</Year><Month>02</Month>'
+             b'</PubMedPubDate></History></PubmedData></PubmedArticle>')
+    for block, date in [(dates, '2021-05-04'), (dates.replace(b'<Day>04</Day>', b''), '')]:
+        assert pp.get_publication_date(pp.xml_backend('lxml').fromstring(block)) == date
+        assert pp.get_publication_date(ET.fromstring(block)) == date
+
+    assert pp.xml_backend('stdlib') is ET
+    assert pp.xml_parser(path_xml, str(tmp_path) + '/', backend='sax') is None
+
+
+def test_filters(tmp_path):
+    """
+    Test the filters option of the xml_parser function.
+    It checks if the articles parsed with the filters are the ones selected by filtering the dataframe of all the
+    articles, if the filters are recorded in the manifest, if a new version of an article rejected by the filters
+    drops the previous one in the update files and if the unknown filters are refused.
+    """
+    path_xml = str(tmp_path / 'xml') + '/'
+    ps.generate_baseline(path_xml, 500, articles_per_file=250, seed=2)
+
+    path_all = str(tmp_path / 'all') + '/'
+    os.makedirs(path_all)
+    df_nodes = pcn.csv_to_dataframe(pp.xml_parser(path_xml, path_all), type_of_df='nodes')
+
+    filters = {'date_from': '2000-06', 'date_to': '2015', 'journals': ['nature', 'The Lancet', 'Journal of Science & Medicine'],
+               'require_abstract': True, 'require_references': True}
+    dates = df_nodes['date'].map(pp.date_key)
+    expected = df_nodes[(dates >= (2000, 6, 1)) & (dates <= (2015, 12, 31))
+                        & df_nodes['journal'].str.lower().isin(['nature', 'the lancet', 'journal of science & medicine'])
+                        & (df_nodes['abstract'].str.strip() != '') & (df_nodes['references'].astype(str) != '')]
+    assert 0 < len(expected) < len(df_nodes)
+
+    path_csv = str(tmp_path / 'filtered') + '/'
+    os.makedirs(path_csv)
+    csv_list = pp.xml_parser(path_xml, path_csv, filters=filters)
+    df_filtered = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    assert df_filtered.reset_index(drop=True).equals(expected.reset_index(drop=True))
+    assert utils.read_manifest(path_csv + pp.MANIFEST)['pubmed00n0001.xml.gz']['settings']['filters'] == pp.filter_settings(filters)
+
+    df_links, df_nodes_frames = pp.parse_to_frames(path_xml, filters=filters)
+    assert sorted(df_nodes_frames['pmid']) == sorted(expected['pmid'])
+    assert set(df_links['source']) <= set(expected['pmid'])
+
+    # The new version of the first article is out of the dates
+    with GzipFile(path_xml + 'pubmed00n0001.xml.gz', 'r') as xml_file:
+        block = next(pp.iter_article_blocks(xml_file))
+    pmid = pp.get_pmid(ET.fromstring(block))
+    date = pp.get_publication_date(ET.fromstring(block))
+    block = re.sub(rb'<Year>\d+</Year>', b'<Year>2099</Year>', block)
+    with GzipFile(path_xml + 'pubmed00n0003.xml.gz', 'w') as xml_file:
+        xml_file.write(b'<PubmedArticleSet>' + block + b'</PubmedArticleSet>')
+
+    path_update = str(tmp_path / 'update') + '/'
+    os.makedirs(path_update)
+    filters = {'date_from': date[:4], 'date_to': date[:4]}
+    csv_list = pp.xml_parser(path_xml, path_update, filters=filters, update=True)
+    df_update = pcn.csv_to_dataframe(csv_list, type_of_df='nodes')
+    assert len(df_update) > 0
+    assert pmid not in set(df_update['pmid'])
+    assert utils.in_bitmap(pp.collect_pmids(path_xml, filters=filters, update=True), df_update['pmid']).all()
+
+    assert pp.xml_parser(path_xml, path_csv, filters={'year': '2020'}) is None
+    assert pp.xml_parser(path_xml, path_csv, filters={'date_from': 'March'}) is None
+    assert pp.date_key('2020-03', end=True) == (2020, 3, 31)
+    assert pp.date_key('') is None